@@ -0,0 +1,86 @@
+from AppPaths import DataPath
+from logging.handlers import RotatingFileHandler
+from collections import deque
+from typing import Protocol
+import threading
+import logging
+import sys
+
+LOG_FILE = "fnb.log"
+LOG_MAX_BYTES = 2 * 1024 * 1024
+LOG_BACKUPS = 5
+
+class Logger(Protocol):
+    """Anything processing functions can report progress to, e.g. the GUI Console or PrintLogger."""
+
+    def Log(self, text: str) -> None: ...
+
+    def Error(self, text: str) -> None: ...
+
+def FileLog() -> logging.Logger:
+    """The rotating log file in the data directory, shared by every console."""
+    fileLog = logging.getLogger("fnb")
+    if not fileLog.handlers:
+        handler = RotatingFileHandler(DataPath(LOG_FILE), maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUPS,
+                                      encoding='utf-8', delay=True)
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s [%(threadName)s] %(message)s"))
+        fileLog.addHandler(handler)
+        fileLog.setLevel(logging.INFO)
+        fileLog.propagate = False
+    return fileLog
+
+class LogChannel:
+    """
+    Thread-safe buffer between processing code and a display.
+    Log and Error may be called from any thread; the display takes what
+    was buffered in batches with Drain(). onPending is called when the
+    buffer stops being empty, so the display knows to schedule a drain.
+    At most maxPending records wait; beyond that the oldest are dropped
+    and counted. Every record also goes to the rotating log file.
+    """
+
+    def __init__(self, maxPending: int = 10000, onPending=None):
+        self.records = deque(maxlen=maxPending)
+        self.dropped = 0
+        self.onPending = onPending
+        self.lock = threading.Lock()
+        self.fileLog = FileLog()
+
+    def Write(self, isError: bool, text: str) -> None:
+        (self.fileLog.error if isError else self.fileLog.info)(text)
+        with self.lock:
+            wasEmpty = not self.records
+            if len(self.records) == self.records.maxlen:
+                self.dropped += 1
+            self.records.append((isError, text))
+        if wasEmpty and self.onPending:
+            self.onPending()
+
+    def Log(self, text: str) -> None:
+        self.Write(False, text)
+
+    def Error(self, text: str) -> None:
+        self.Write(True, text)
+
+    def Drain(self) -> tuple:
+        """Take every buffered record. Returns ([(isError, text)], number dropped since the last drain)."""
+        with self.lock:
+            records = list(self.records)
+            self.records.clear()
+            dropped = self.dropped
+            self.dropped = 0
+        return records, dropped
+
+class PrintLogger:
+    """Logger for the command line: normal output to stdout, errors to stderr, both to the log file."""
+
+    def __init__(self):
+        self.fileLog = FileLog()
+
+    def Log(self, text: str) -> None:
+        self.fileLog.info(text)
+        print(text, flush=True)
+
+    def Error(self, text: str) -> None:
+        self.fileLog.error(text)
+        print(text, file=sys.stderr, flush=True)
@@ -0,0 +1,11 @@
+import os
+
+def DataDirectory() -> str:
+    """Return the per-user directory for local state, creating it if needed. FNB_DATA_DIR overrides it."""
+    path = os.getenv("FNB_DATA_DIR") or os.path.join(os.path.expanduser("~"), ".fnb_helper")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+def DataPath(*parts: str) -> str:
+    """Return a path inside the data directory."""
+    return os.path.join(DataDirectory(), *parts)
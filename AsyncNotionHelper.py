@@ -0,0 +1,230 @@
+from NotionHelper import *
+import importlib.util
+import contextvars
+import asyncio
+import httpx
+
+# HTTP/2 carries every request over one connection. It needs h2 (see requirements.txt);
+# without it the pool falls back to HTTP/1.1 connections
+HTTP2 = importlib.util.find_spec("h2") is not None
+
+class AsyncNotionClient:
+    """
+    asyncio counterpart of NotionClient, on httpx: the same methods, awaited,
+    so many requests can wait on one thread. Requests go through the
+    RequestScheduler of the synchronous client unless given another, so
+    both together stay under Notion's rate limit and share its priority
+    lanes, and are retried the same way.
+    Create it inside the event loop: async with AsyncNotionClient() as notion.
+    """
+
+    RETRY_STATUSES = NotionClient.RETRY_STATUSES
+
+    def __init__(self, token: str = notionToken, base_url: str = NOTION_API_URL, timeout: tuple = (5, 30),
+                 scheduler: RequestScheduler = None, max_retries: int = 5, max_connections: int = 16):
+        """
+        timeout: (connect, read) seconds passed to every request.
+        max_connections: size of the connection pool (one connection is enough with HTTP/2).
+        """
+        self.base_url = base_url.rstrip("/")
+        self.max_retries = max_retries
+        self.scheduler = scheduler if scheduler else client.scheduler
+        self.sessionArgs = {
+            "headers": {
+                "Authorization": f"Bearer {token}",
+                "Notion-Version": NOTION_VERSION,
+                "Content-Type": "application/json"
+            },
+            "timeout": httpx.Timeout(timeout[1], connect=timeout[0]),
+            "limits": httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            "http2": HTTP2,
+        }
+        # Opened by the first request: setting up TLS takes a noticeable
+        # fraction of a second, wasted when everything is read from the mirror
+        self.session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, excType, excValue, traceback) -> None:
+        await self.Close()
+
+    async def Request(self, method: str, path: str, **kwargs) -> httpx.Response:
+        """
+        Send a request, retrying rate-limited and transient failures. Returns the final response.
+        Recorded in Metrics and cancelled with the current job like NotionClient.Request.
+        """
+        url = f"{self.base_url}/{path.lstrip('/')}"
+        attempts = RequestAttempts(self)
+        try:
+            while True:
+                CheckCancelled()
+                attempts.Admitted(await self.scheduler.AcquireAsync())
+                if self.session is None:
+                    self.session = httpx.AsyncClient(**self.sessionArgs)
+                try:
+                    response = await self.session.request(method, url, **kwargs)
+                except httpx.TransportError:
+                    delay = attempts.Failed()
+                    if delay is None:
+                        raise
+                    await asyncio.sleep(delay)
+                    continue
+                except BaseException:
+                    attempts.Aborted()
+                    raise
+                delay = attempts.Received(response)
+                if delay is None:
+                    return response
+                await asyncio.sleep(delay)
+        finally:
+            attempts.Record(method, path, len(attempts.response.request.content) if attempts.response is not None else 0)
+
+    async def CreatePage(self, database_id: str, properties: dict) -> dict:
+        """Create a page in a database. Raises NotionError on failure."""
+        payload = {
+            "parent": {"database_id": database_id},
+            "properties": properties
+        }
+        response = await self.Request("POST", "pages", json=payload)
+        if response.status_code != 200:
+            raise NotionError("Failed to create page", response.status_code, response.text)
+        return response.json()
+
+    async def QueryDatabase(self, database_id: str, filter: dict = None, sorts: list = None, page_size: int = 100,
+                            filter_properties: list = None):
+        """
+        Query a database and yield its results one response page at a time
+        (async for). See NotionClient.QueryDatabase.
+        """
+        payload = {"page_size": min(max(page_size, 1), 100)}
+        if filter:
+            payload["filter"] = filter
+        if sorts:
+            payload["sorts"] = sorts
+        while True:
+            response = await self.Request("POST", f"databases/{database_id}/query", json=payload,
+                                          params=NotionClient.Projection(filter_properties))
+            if response.status_code != 200:
+                raise NotionError("Failed to read database", response.status_code, response.text)
+            data = response.json()
+            yield data.get("results", [])
+            if not data.get("has_more") or not data.get("next_cursor"):
+                return
+            payload["start_cursor"] = data["next_cursor"]
+
+    async def ReadDatabase(self, database_id: str) -> dict:
+        """Read a database object, including its property schema. Raises NotionError on failure."""
+        response = await self.Request("GET", f"databases/{database_id}")
+        if response.status_code != 200:
+            raise NotionError("Failed to read database", response.status_code, response.text)
+        return response.json()
+
+    async def ReadPage(self, page_id: str, filter_properties: list = None) -> dict:
+        """Read a page object, only with the given property ids if any. Raises NotionError on failure."""
+        response = await self.Request("GET", f"pages/{page_id}", params=NotionClient.Projection(filter_properties))
+        if response.status_code != 200:
+            raise NotionError("Failed to read page", response.status_code, response.text)
+        return response.json()
+
+    async def ReadPropertyItems(self, page_id: str, property_id: str) -> list:
+        """Read every item of a page property. See NotionClient.ReadPropertyItems."""
+        items = []
+        params = {"page_size": 100}
+        while True:
+            response = await self.Request("GET", f"pages/{page_id}/properties/{property_id}", params=params)
+            if response.status_code != 200:
+                raise NotionError("Failed to read page property", response.status_code, response.text)
+            data = response.json()
+            if data.get("object") != "list":
+                return [data]
+            items.extend(data.get("results", []))
+            if not data.get("has_more") or not data.get("next_cursor"):
+                return items
+            params["start_cursor"] = data["next_cursor"]
+
+    async def CompleteRelations(self, page: dict) -> dict:
+        """Read the relations of a page that were cut short at 25 items in full. See CompleteRelations."""
+        for value in TruncatedRelations(page):
+            SetRelation(value, await self.ReadPropertyItems(page["id"], value["id"]))
+        return page
+
+    async def QueryNotionDatabase(self, database_id: str, filter: dict = None, sorts: list = None, page_size: int = 100,
+                                  filter_properties: list = None):
+        """Yield a database's results with complete relations, priming the page cache. See QueryNotionDatabase."""
+        async for results in self.QueryDatabase(database_id, filter, sorts, page_size, filter_properties):
+            for page in results:
+                pageCache.Put(await self.CompleteRelations(page), filter_properties)
+            yield results
+
+    async def FetchPage(self, page_id: str, filter_properties: list = None) -> dict:
+        """Read a page with complete relations and put it in the page cache."""
+        page = await self.CompleteRelations(await self.ReadPage(page_id, filter_properties))
+        pageCache.Put(page, filter_properties)
+        return page
+
+    async def Close(self) -> None:
+        """Close the pooled connections."""
+        if self.session is not None:
+            await self.session.aclose()
+
+def RunAhead(items, depth: int = 2):
+    """
+    Iterate the async generator items on an event loop in a background
+    thread and yield its values here, in order. The two sides are joined by
+    a queue of depth values, so the generator runs at most that far ahead
+    of the consumer. An exception raised by the generator is raised here;
+    closing the returned generator cancels it.
+    """
+    DONE = object()
+    started = threading.Event()
+    state = {}
+
+    async def Produce():
+        queue = asyncio.Queue(maxsize=depth)
+        state.update(loop=asyncio.get_running_loop(), queue=queue, task=asyncio.current_task())
+        started.set()
+        try:
+            try:
+                async for value in items:
+                    await queue.put((value, None))
+                await queue.put((DONE, None))
+            except Exception as e:
+                await queue.put((DONE, e))
+            # Keep the loop running until the consumer has taken everything
+            await queue.join()
+        finally:
+            await items.aclose()
+
+    async def Next():
+        item = await state["queue"].get()
+        state["queue"].task_done()
+        return item
+
+    def Run() -> None:
+        try:
+            asyncio.run(Produce())
+        except asyncio.CancelledError:
+            # Closed before the generator was exhausted
+            pass
+
+    # The producer sends its requests with the caller's priority
+    thread = threading.Thread(target=contextvars.copy_context().run, args=(Run,), name="notion-async", daemon=True)
+    thread.start()
+    started.wait()
+    try:
+        while True:
+            value, error = asyncio.run_coroutine_threadsafe(Next(), state["loop"]).result()
+            if error is not None:
+                raise error
+            if value is DONE:
+                return
+            yield value
+    finally:
+        if thread.is_alive():
+            try:
+                state["loop"].call_soon_threadsafe(state["task"].cancel)
+            except RuntimeError:
+                # The loop closed in the meantime
+                pass
+        thread.join()
@@ -0,0 +1,42 @@
+from NotionHelper import *
+from NotionReplica import NotionReplica
+from AppLog import Logger, PrintLogger
+import requests
+
+ALBUMS_DATABASE = "4ce7b4cefa8d4478b197dd9e50e69421"
+TRACKS_DATABASE = "12bcc95908f4804b8486cb3c4272fa17"
+VERSIONS_DATABASE = "200cc95908f480429e51d92a661a9102"
+# Track relations whose target databases are mirrored alongside the catalog
+RELATED_TRACK_PROPERTIES = ["Composer 1", "Composer 2", "Content Provider 1", "Content Provider 2"]
+
+# Local mirror of the catalog databases, read instead of the network
+replica = NotionReplica()
+
+def SyncDatabase(database_id: str):
+    """Pull recent changes of a database into the local mirror. Returns the error on failure, else None."""
+    try:
+        replica.Sync(database_id)
+    except (NotionError, requests.RequestException) as e:
+        return e
+    return None
+
+def CatalogDatabases(console: Logger = None) -> list:
+    """Return the ids of every database mirrored locally, including the composer and content provider databases."""
+    databases = [ALBUMS_DATABASE, TRACKS_DATABASE, VERSIONS_DATABASE]
+    try:
+        databases += replica.RelatedDatabases(TRACKS_DATABASE, RELATED_TRACK_PROPERTIES)
+    except (NotionError, requests.RequestException) as e:
+        (console if console else PrintLogger()).Error(f"Could not look up related databases: {e}")
+    return databases
+
+def GetPageTitle(page: dict, propertyName: str) -> str:
+    """Return the plain text of a page's title property, or "(No Title)"."""
+    titleProp = page.get("properties", {}).get(propertyName, {})
+    if titleProp.get("type") != "title":
+        return "(No Title)"
+    titleItems = titleProp.get("title", [])
+    if titleItems and "plain_text" in titleItems[0]:
+        return titleItems[0]["plain_text"]
+    elif titleItems:
+        return titleItems[0].get("text", {}).get("content", "")
+    return "(No Title)"
@@ -0,0 +1,347 @@
+from datetime import datetime, timezone
+import hashlib
+import json
+import csv
+import os
+if os.name == "nt":
+    import msvcrt
+else:
+    import fcntl
+
+# File name and header of every CSV the Filemaker Importer writes, in write order
+EXPORT_FILES = {
+    "albums": ("albums.csv", ["AlbumTitle", "AlbumID", "UpdateID"]),
+    "tracks": ("tracks.csv", [
+        "TrackTitle", "UniqueTitleID", "AlbumID", "Track Description",
+        "Key", "BPM",
+        "Composer 1", "Composer 2", "Content Provider 1", "Content Provider 2",
+        "InstGroup Rhythm", "InstGroup Bass", "InstGroup Guitar",
+        "InstGroup Keys", "InstGroup Strings", "InstGroup Woodwinds",
+        "InstGroup Brass", "InstGroup Misc"
+    ]),
+    "versions": ("versions.csv", ["UniqueTitleID", "Mixout", "Version", "Duration"]),
+    "moods": ("moods.csv", ["UniqueTitleID", "Moods"]),
+    "genres": ("genres.csv", ["UniqueTitleID", "TrackGenre"]),
+    "misc": ("misc.csv", ["UniqueTitleID", "Misc"]),
+    "composers": ("composers.csv", ["ComposerID", "UniqueTitleID"]),
+    "contentProviders": ("contentProviders.csv", ["CPID", "UniqueTitleID"]),
+}
+
+# Columns that identify a row across exports, so a changed row replaces its old hash.
+# A key can cover several rows (e.g. two versions of a track with the same name),
+# so the hashes of a key are kept as a multiset
+ROW_KEYS = {
+    "albums": lambda row: row[1] or row[0],
+    "tracks": lambda row: row[1],
+    "versions": lambda row: f"{row[0]}|{row[2]}",
+    "moods": lambda row: row[0],
+    "genres": lambda row: row[0],
+    "misc": lambda row: row[0],
+    "composers": lambda row: f"{row[0]}|{row[1]}",
+    "contentProviders": lambda row: f"{row[0]}|{row[1]}",
+}
+
+STATE_FILE = "export_state.json"
+# Folder inside the output directory that holds an export until it completes
+STAGING_DIR = ".fnb_staging"
+JOURNAL_FILE = "journal.jsonl"
+# Held locked by the export writing to the staging folder
+LOCK_FILE = "export.lock"
+
+def UpdateFileName(fileName: str) -> str:
+    """albums.csv -> albums_update.csv"""
+    base, ext = os.path.splitext(fileName)
+    return f"{base}_update{ext}"
+
+class DeltaTracker:
+    """
+    Remembers the content hashes of the rows exported to a directory, by
+    row key, plus the time of the last export (the watermark), so an
+    incremental export can emit only rows that were added or changed since then.
+    """
+
+    def __init__(self, dirPath: str):
+        self.path = os.path.join(dirPath, STATE_FILE)
+        self.watermark = None
+        self.hashes = {kind: {} for kind in EXPORT_FILES}
+        # Hashes recorded by this export, checkpointed so a resumed export keeps them
+        self.pending = {kind: {} for kind in EXPORT_FILES}
+        # Those recorded since the last checkpoint
+        self.unsaved = {}
+        if os.path.exists(self.path):
+            with open(self.path, encoding='utf-8') as stateFile:
+                state = json.load(stateFile)
+            self.watermark = state.get("watermark")
+            for kind, hashes in state.get("hashes", {}).items():
+                # Older state files kept a single hash per key
+                self.hashes.setdefault(kind, {}).update(
+                    (key, [rowHashes] if isinstance(rowHashes, str) else rowHashes)
+                    for key, rowHashes in hashes.items()
+                )
+        self.startedAt = datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+    @staticmethod
+    def RowHash(row: list) -> str:
+        return hashlib.sha1(json.dumps(row, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+    def Changed(self, kind: str, row: list) -> bool:
+        """
+        Record the row's hash and return True if it is new or differs from the
+        last export, i.e. this export has more rows with its key and content
+        than the last one had.
+        """
+        key = ROW_KEYS[kind](row)
+        rowHash = self.RowHash(row)
+        seen = self.pending[kind].setdefault(key, [])
+        changed = self.hashes[kind].get(key, []).count(rowHash) <= seen.count(rowHash)
+        seen.append(rowHash)
+        self.unsaved.setdefault(kind, {}).setdefault(key, []).append(rowHash)
+        return changed
+
+    def TakeUnsaved(self) -> dict:
+        """The hashes recorded since the last call, as {kind: {key: [hash]}}."""
+        unsaved = self.unsaved
+        self.unsaved = {}
+        return unsaved
+
+    def Restore(self, pending: dict) -> None:
+        """Re-apply the hashes recorded by an interrupted run of this export."""
+        for kind, hashes in pending.items():
+            self.pending[kind].update(hashes)
+
+    def Save(self) -> None:
+        """Write the new hashes and watermark. Call only after the export succeeded."""
+        # The rows of a key exported now replace the ones it had before
+        for kind, hashes in self.pending.items():
+            self.hashes[kind].update(hashes)
+        tmpPath = self.path + ".tmp"
+        with open(tmpPath, "w", encoding='utf-8') as stateFile:
+            json.dump({"watermark": self.startedAt, "hashes": self.hashes}, stateFile)
+        os.replace(tmpPath, self.path)
+
+class ExportInProgress(Exception):
+    """Raised when another export is already writing to the same directory."""
+
+class ExportLock:
+    """
+    Exclusive lock on an export's staging folder, held by the process
+    writing to it. The operating system releases it if that process dies,
+    so a crashed export never blocks the next one.
+    """
+
+    def __init__(self, stagingPath: str):
+        self.path = os.path.join(stagingPath, LOCK_FILE)
+        self.file = open(self.path, "a+")
+        try:
+            self.Lock()
+            # A finished export may have removed the file we opened while we waited
+            if os.stat(self.path).st_ino != os.fstat(self.file.fileno()).st_ino:
+                raise OSError("lock file replaced")
+        except OSError:
+            self.file.close()
+            raise ExportInProgress(f"Another export is writing to {os.path.dirname(stagingPath)}")
+
+    def Lock(self) -> None:
+        if os.name == "nt":
+            self.file.seek(0)
+            msvcrt.locking(self.file.fileno(), msvcrt.LK_NBLCK, 1)
+        else:
+            fcntl.flock(self.file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+    def Release(self, remove: bool = False) -> None:
+        """Unlock, and delete the lock file if remove, e.g. to remove the staging folder."""
+        if self.file.closed:
+            return
+        if os.name == "nt":
+            self.file.seek(0)
+            msvcrt.locking(self.file.fileno(), msvcrt.LK_UNLCK, 1)
+            self.file.close()
+            if remove:
+                try:
+                    os.remove(self.path)
+                except OSError:
+                    # Another export opened it in the meantime
+                    pass
+        else:
+            if remove:
+                # Removed while still locked, so no other export can lock the old file
+                os.remove(self.path)
+            self.file.close()
+
+class ExportJournal:
+    """
+    Progress record of an export, kept next to its staged files.
+    A line is appended per checkpoint: the album or track just written, the
+    size of every staged file at that point and, in incremental mode, the
+    row hashes recorded since the previous checkpoint. Replaying it lets an
+    interrupted export resume from the last checkpoint instead of starting
+    over, and a checkpoint costs the same however far the export has got.
+    """
+
+    def __init__(self, stagingPath: str, selection: list, incremental: bool):
+        self.path = os.path.join(stagingPath, JOURNAL_FILE)
+        self.selection = list(selection)
+        self.incremental = incremental
+        self.albums = set()
+        self.tracks = set()
+        self.offsets = {}
+        self.pending = {}
+        self.file = None
+
+    def Load(self) -> bool:
+        """Replay a journal left by an interrupted run of the same export and append to it. Returns True if one was found."""
+        try:
+            with open(self.path, "rb") as journalFile:
+                data = journalFile.read()
+        except OSError:
+            return False
+        entries = []
+        end = 0
+        # A line without its newline was cut short by a crash
+        for line in data.split(b"\n")[:-1]:
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                break
+            end += len(line) + 1
+        if not entries or entries[0].get("selection") != self.selection or entries[0].get("incremental") != self.incremental:
+            return False
+        for entry in entries[1:]:
+            self.Apply(entry)
+            for kind, hashes in entry.get("pending", {}).items():
+                for key, rowHashes in hashes.items():
+                    self.pending.setdefault(kind, {}).setdefault(key, []).extend(rowHashes)
+        os.truncate(self.path, end)
+        self.file = open(self.path, "a", encoding='utf-8')
+        return True
+
+    def Start(self) -> None:
+        """Begin a new journal for this export."""
+        self.file = open(self.path, "w", encoding='utf-8')
+        self.Append({"selection": self.selection, "incremental": self.incremental})
+
+    def Record(self, offsets: dict, albumId: str = None, trackId: str = None, pending: dict = None) -> None:
+        """Append a checkpoint. pending: the row hashes recorded since the previous one."""
+        entry = {"offsets": offsets}
+        if albumId:
+            entry["album"] = albumId
+        if trackId:
+            entry["track"] = trackId
+        if pending:
+            entry["pending"] = pending
+        self.Apply(entry)
+        self.Append(entry)
+
+    def Apply(self, entry: dict) -> None:
+        if "album" in entry:
+            self.albums.add(entry["album"])
+        if "track" in entry:
+            self.tracks.add(entry["track"])
+        self.offsets = entry["offsets"]
+
+    def Append(self, entry: dict) -> None:
+        self.file.write(json.dumps(entry) + "\n")
+        self.file.flush()
+
+    def Close(self) -> None:
+        if self.file:
+            self.file.close()
+            self.file = None
+
+class ExportWriter:
+    """
+    Opens the export CSVs and writes rows to them by kind.
+    Files are written to a staging folder inside dirPath and moved into
+    place only when the export completes. Checkpoint() records progress so
+    a failed export, re-run with the same selection, resumes where it
+    stopped. In incremental mode only changed rows are written, to
+    <name>_update.csv files, and the change state is saved on success.
+    Raises ExportInProgress if another export is writing to dirPath.
+    """
+
+    def __init__(self, dirPath: str, incremental: bool = False, selection: list = ()):
+        """selection: ids identifying the export (e.g. the selected albums); a journal only resumes the same selection."""
+        self.dirPath = dirPath
+        self.stagingPath = os.path.join(dirPath, STAGING_DIR)
+        self.files = {}
+        self.writers = {}
+        self.fileNames = {}
+        self.counts = {kind: 0 for kind in EXPORT_FILES}
+        os.makedirs(self.stagingPath, exist_ok=True)
+        # Taken before reading any state, which another export may be writing
+        self.lock = ExportLock(self.stagingPath)
+        self.journal = ExportJournal(self.stagingPath, selection, incremental)
+        try:
+            self.delta = DeltaTracker(dirPath) if incremental else None
+            self.resumed = self.journal.Load()
+            if self.resumed and self.delta:
+                self.delta.Restore(self.journal.pending)
+            for kind, (fileName, header) in EXPORT_FILES.items():
+                self.fileNames[kind] = UpdateFileName(fileName) if incremental else fileName
+                stagedPath = os.path.join(self.stagingPath, self.fileNames[kind])
+                if self.resumed and kind in self.journal.offsets and os.path.exists(stagedPath):
+                    # Drop anything written after the last checkpoint
+                    os.truncate(stagedPath, self.journal.offsets[kind])
+                    self.files[kind] = open(stagedPath, "a", newline='', encoding='utf-8')
+                    self.writers[kind] = csv.writer(self.files[kind])
+                else:
+                    self.files[kind] = open(stagedPath, "w", newline='', encoding='utf-8')
+                    self.writers[kind] = csv.writer(self.files[kind])
+                    self.writers[kind].writerow(header)
+            if not self.resumed:
+                self.journal.Start()
+        except BaseException:
+            self.Close(success=False)
+            raise
+        if not self.resumed:
+            self.Checkpoint()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, excValue, traceback) -> None:
+        self.Close(success=excType is None)
+
+    def Write(self, kind: str, row: list) -> None:
+        if self.delta and not self.delta.Changed(kind, row):
+            return
+        self.writers[kind].writerow(row)
+        self.counts[kind] += 1
+
+    def IsAlbumStarted(self, albumId: str) -> bool:
+        return albumId in self.journal.albums
+
+    def IsTrackDone(self, trackId: str) -> bool:
+        return trackId in self.journal.tracks
+
+    def Checkpoint(self, albumId: str = None, trackId: str = None) -> None:
+        """Flush every file and record that the given album row or track rows are fully written."""
+        offsets = {}
+        for kind, exportFile in self.files.items():
+            exportFile.flush()
+            offsets[kind] = exportFile.tell()
+        self.journal.Record(offsets, albumId, trackId, self.delta.TakeUnsaved() if self.delta else None)
+
+    def Close(self, success: bool = True) -> None:
+        """
+        Close every file. On success the staged files replace the ones in
+        dirPath and the incremental state is saved; on failure the staging
+        folder is kept so the next run can resume.
+        """
+        for exportFile in self.files.values():
+            exportFile.close()
+        self.files = {}
+        self.journal.Close()
+        if not success:
+            self.lock.Release()
+            return
+        for fileName in self.fileNames.values():
+            os.replace(os.path.join(self.stagingPath, fileName), os.path.join(self.dirPath, fileName))
+        if self.delta:
+            self.delta.Save()
+        os.remove(self.journal.path)
+        self.lock.Release(remove=True)
+        try:
+            os.rmdir(self.stagingPath)
+        except OSError:
+            pass
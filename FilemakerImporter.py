@@ -0,0 +1,274 @@
+from Catalog import *
+from AppLog import Logger
+from ExportFiles import ExportWriter, ExportInProgress
+from AsyncNotionHelper import AsyncNotionClient, RunAhead
+from Metrics import metrics, CacheDelta
+from Jobs import JobCancelled, CheckCancelled, ReportProgress
+from contextlib import closing
+import requests
+import asyncio
+
+# Albums planned and held in memory at a time; composers and content providers
+# shared across batches come from the mirror or the page cache after the first
+PLAN_ALBUMS = 25
+# Planned batches waiting for the writer; planning runs this far ahead of it,
+# each one held in memory
+PLANS_AHEAD = 1
+
+# Properties the export reads, per kind of page; pages fetched from Notion
+# outside the mirror are read with only these
+TRACK_PROPERTIES = [
+    "TrackTitle", "Unique Title Id", "Track Description", "key", "Tempo", "Track Duration",
+    "Content Provider 1", "Content Provider 2", "Composer 1", "Composer 2", "Song Versions",
+    "Moods", "TrackGenre", "Misc",
+    "InstGroup Rhythm", "InstGroup Bass", "InstGroup Guitar", "InstGroup Keys",
+    "InstGroup Strings", "InstGroup Woodwinds", "InstGroup Brass", "InstGroup Misc",
+]
+VERSION_PROPERTIES = ["Mixout", "Version"]
+# Track relation -> the property read from the pages it points to
+RELATED_PROPERTIES = {
+    "Content Provider 1": "CPID",
+    "Content Provider 2": "CPID",
+    "Composer 1": "ComposerID",
+    "Composer 2": "ComposerID",
+}
+
+@Priority(BULK)
+def ProcessImport(dirPath: str, console: Logger, selectedAlums : list[tuple], incremental: bool = False) -> bool:
+    """Gets data from Notion and exports it to CSV files, only changed rows if incremental. Returns True on success."""
+
+    def GetListValue(properties, propertyName):
+        values = [v["name"] for v in properties[propertyName]["multi_select"]]
+        return "\n".join(values) if values else ""
+
+    mark = metrics.Mark()
+    cacheBefore = (replica.Stats(), pageCache.Stats())
+
+    def Report() -> None:
+        """Log where the time went and write the run's trace."""
+        cacheStats = {
+            "Mirror": CacheDelta(cacheBefore[0], replica.Stats()),
+            "Page cache": CacheDelta(cacheBefore[1], pageCache.Stats()),
+        }
+        metrics.Report("export", mark, console, cacheStats)
+
+    # Bring the mirror up to date so the export reads current data from disk
+    try:
+        with metrics.Span("sync"):
+            updated = replica.SyncAll(CatalogDatabases(console))
+        console.Log(f"Synced {updated} changed pages from Notion")
+    except (NotionError, requests.RequestException) as e:
+        console.Error(f"Could not sync with Notion, exporting from the local copy: {e}")
+
+    async def FetchPages(notion: AsyncNotionClient, pageIds: list, database_id: str = None, properties: list = None, related: tuple = None) -> dict:
+        """Read the properties of every distinct page id in bulk (see NotionReplica.ReadPages). Returns {id: properties}."""
+        pages = await replica.ReadPagesAsync(notion, pageIds, database_id, properties, related)
+        return {pageId: page["properties"] for pageId, page in pages.items()}
+
+    def RelatedDatabase(propertyName: str):
+        """The database a track relation points to, or None if it cannot be looked up."""
+        try:
+            databases = replica.RelatedDatabases(TRACKS_DATABASE, [propertyName])
+        except (NotionError, requests.RequestException):
+            return None
+        return databases[0] if databases else None
+
+    def FirstRelationId(properties: dict, propertyName: str):
+        relation = properties[propertyName]["relation"]
+        return relation[0]["id"] if relation else None
+
+    async def Plan(notion: AsyncNotionClient, export: ExportWriter, albums: list) -> tuple:
+        """
+        Resolve every page a batch of albums refers to before any of it is
+        written: the ids are collected, deduplicated and read in bulk, so the
+        number of requests grows with distinct pages rather than with
+        references to them. Missing tracks and versions are queried by the
+        album and track they belong to, and the pages of each database are
+        fetched concurrently.
+        Returns ({album id: album page}, {album id: [tracks to write]},
+        {track id: properties}, {related page id: properties}).
+        """
+        with metrics.Span("plan", albums=len(albums)):
+            storedAlbums = replica.GetPages([albumData["id"] for _, albumData in albums])
+            albumPages = {albumData["id"]: storedAlbums.get(albumData["id"]) for _, albumData in albums}
+            # An album page not in the mirror may list only its first 25 tracks
+            for albumPage in await asyncio.gather(*(notion.CompleteRelations(albumData) for _, albumData in albums if not albumPages[albumData["id"]])):
+                albumPages[albumPage["id"]] = albumPage
+            # Tracks written before an interruption are skipped, not fetched again
+            tracksToWrite = {
+                albumId: [
+                    track for track in albumPage["properties"]["Track Submission Form"]["relation"]
+                    if not export.IsTrackDone(f"{albumId}/{track['id']}")
+                ]
+                for albumId, albumPage in albumPages.items()
+            }
+            trackAlbums = {track["id"]: albumId for albumId, tracks in tracksToWrite.items() for track in tracks}
+            trackPages = await FetchPages(notion, list(trackAlbums), TRACKS_DATABASE, TRACK_PROPERTIES, ("Album", trackAlbums))
+            relatedIds = {propertyName: [] for propertyName in RELATED_PROPERTIES}
+            versionTracks = {}
+            for trackId, trackProperties in trackPages.items():
+                for propertyName in RELATED_PROPERTIES:
+                    relatedId = FirstRelationId(trackProperties, propertyName)
+                    if relatedId:
+                        relatedIds[propertyName].append(relatedId)
+                for version in trackProperties["Song Versions"]["relation"]:
+                    versionTracks[version["id"]] = trackId
+            # Relations pointing to the same database (Composer 1 and 2) are read together
+            relatedDatabases = {}
+            for propertyName, pageIds in relatedIds.items():
+                if pageIds:
+                    database_id = await asyncio.to_thread(RelatedDatabase, propertyName)
+                    databasePageIds, databaseProperties = relatedDatabases.setdefault(database_id, ([], []))
+                    databasePageIds.extend(pageIds)
+                    databaseProperties.append(RELATED_PROPERTIES[propertyName])
+            fetched = await asyncio.gather(
+                FetchPages(notion, list(versionTracks), VERSIONS_DATABASE, VERSION_PROPERTIES, ("Track Title", versionTracks)),
+                *(FetchPages(notion, pageIds, database_id, list(dict.fromkeys(properties))) for database_id, (pageIds, properties) in relatedDatabases.items())
+            )
+            relatedPages = {pageId: properties for pages in fetched for pageId, properties in pages.items()}
+        console.Log(f"Resolved {len(trackPages)} tracks and {len(relatedPages)} related pages for {len(albums)} albums")
+        return albumPages, tracksToWrite, trackPages, relatedPages
+
+    async def PlanBatches(export: ExportWriter):
+        """Plan the selected albums PLAN_ALBUMS at a time, on one AsyncNotionClient."""
+        async with AsyncNotionClient() as notion:
+            for start in range(0, len(selectedAlums), PLAN_ALBUMS):
+                yield await Plan(notion, export, selectedAlums[start:start + PLAN_ALBUMS])
+
+    try:
+        with ExportWriter(dirPath, incremental, [albumData["id"] for _, albumData in selectedAlums]) as export, \
+                closing(RunAhead(PlanBatches(export), PLANS_AHEAD)) as plans:
+            if export.resumed:
+                console.Log(f"Resuming the interrupted export: {len(export.journal.tracks)} tracks already written")
+            if incremental:
+                since = export.delta.watermark
+                console.Log(f"Exporting changes since {since}" if since else "No previous export found, exporting every row")
+
+            # Rows are written from the resolved pages in album/track/version order,
+            # while the next batches are planned on the event loop thread
+            tracksWritten = 0
+            for position, (name, albumData) in enumerate(selectedAlums):
+                if position % PLAN_ALBUMS == 0:
+                    albumPages, tracksToWrite, trackPages, relatedPages = next(plans)
+                albumSpan = metrics.Span("album", album=name).Start()
+                albumId = albumData["id"]
+                albumProperties = albumPages[albumId]["properties"]
+                albumInfo = [
+                    name,
+                    albumProperties["AlbumID"]["rich_text"][0]["plain_text"] if albumProperties["AlbumID"]["rich_text"] else "",
+                    albumProperties["Release"]["rich_text"][0]["plain_text"] if albumProperties["Release"]["rich_text"] else ""
+                ]
+                console.Log(f"Processing album: {albumInfo[0]}")
+                if not export.IsAlbumStarted(albumId):
+                    export.Write("albums", albumInfo)
+                    export.Checkpoint(albumId)
+
+                for track in tracksToWrite[albumId]:
+                    CheckCancelled()
+                    span = metrics.Span("write track", track=track["id"]).Start()
+                    trackProperties = trackPages[track["id"]]
+                    trackId = trackProperties["Unique Title Id"]["unique_id"]["prefix"] + str(trackProperties["Unique Title Id"]["unique_id"]["number"])
+
+                    if len(trackProperties["Content Provider 1"]["relation"]) > 0:
+                        export.Write("contentProviders", [relatedPages[FirstRelationId(trackProperties, "Content Provider 1")]["CPID"]["rich_text"][0]["plain_text"], trackId])
+                    if len(trackProperties["Content Provider 2"]["relation"]) > 0:
+                        export.Write("contentProviders", [relatedPages[FirstRelationId(trackProperties, "Content Provider 2")]["CPID"]["rich_text"][0]["plain_text"], trackId])
+                    if len(trackProperties["Composer 1"]["relation"]) > 0:
+                        composerPage = relatedPages[FirstRelationId(trackProperties, "Composer 1")]
+                        if(len(composerPage["ComposerID"]["rich_text"]) <= 0):
+                            console.Error(f"Composer 1 ID not found for track: {trackProperties['TrackTitle']['title'][0]['text']['content']}")
+                        else:
+                            export.Write("composers", [composerPage["ComposerID"]["rich_text"][0]["plain_text"], trackId])
+                    if len(trackProperties["Composer 2"]["relation"]) > 0:
+                        composerPage = relatedPages[FirstRelationId(trackProperties, "Composer 2")]
+                        if(len(composerPage["ComposerID"]["rich_text"]) <= 0):
+                            console.Error(f"Composer 2 ID not found for track: {trackProperties['TrackTitle']['title'][0]['text']['content']}")
+                        else:
+                            export.Write("composers", [composerPage["ComposerID"]["rich_text"][0]["plain_text"], trackId])
+
+                    track_info = [
+                        trackProperties["TrackTitle"]["title"][0]["text"]["content"],
+                        trackId,
+                        albumInfo[1],
+                        trackProperties["Track Description"]["rich_text"][0]["plain_text"] if trackProperties["Track Description"]["rich_text"] else "",
+                        trackProperties["key"]["rich_text"][0]["plain_text"] if trackProperties["key"]["rich_text"] else "",
+                        trackProperties["Tempo"]["rich_text"][0]["plain_text"] if trackProperties["Tempo"]["rich_text"] else "",
+                        GetListValue(trackProperties, "InstGroup Rhythm"),
+                        GetListValue(trackProperties, "InstGroup Bass"),
+                        GetListValue(trackProperties, "InstGroup Guitar"),
+                        GetListValue(trackProperties, "InstGroup Keys"),
+                        GetListValue(trackProperties, "InstGroup Strings"),
+                        GetListValue(trackProperties, "InstGroup Woodwinds"),
+                        GetListValue(trackProperties, "InstGroup Brass"),
+                        GetListValue(trackProperties, "InstGroup Misc"),
+                    ]
+
+                    export.Write("moods", [track_info[1], GetListValue(trackProperties, "Moods")])
+                    export.Write("genres", [track_info[1], GetListValue(trackProperties, "TrackGenre")])
+                    export.Write("misc", [track_info[1], GetListValue(trackProperties, "Misc")])
+
+                    export.Write("tracks", track_info)
+                    trackLength = trackProperties["Track Duration"]["rich_text"][0]["plain_text"] if trackProperties["Track Duration"]["rich_text"] else ""
+
+                    console.Log(f"Processing track: {track_info[0]}")
+                    full = [
+                        track_info[1],
+                        "Main Mix",
+                        "Full",
+                        trackLength
+                    ]
+                    sec60 = [
+                        track_info[1],
+                        "60 Sec Edit",
+                        "60",
+                        "1:00"
+                    ]
+                    sec30 = [
+                        track_info[1],
+                        "30 Sec Edit",
+                        "30",
+                        "0:30"
+                    ]
+                    short = [
+                        track_info[1],
+                        "Bumper Edit",
+                        "Short",
+                        "0:15"
+                    ]
+                    export.Write("versions", full)
+                    export.Write("versions", sec60)
+                    export.Write("versions", sec30)
+                    export.Write("versions", short)
+                    for version in trackProperties["Song Versions"]["relation"]:
+                        version_properties = relatedPages[version["id"]]
+                        version_info = [
+                            track_info[1],
+                            version_properties["Mixout"]["rich_text"][0]["plain_text"] if version_properties["Mixout"]["rich_text"] else "",
+                            version_properties["Version"]["select"]["name"],
+                            trackLength
+                        ]
+                        export.Write("versions", version_info)
+                        console.Log(f"Processing version: {version_info[2]} for track: {track_info[0]}")
+                    export.Checkpoint(trackId=f"{albumId}/{track['id']}")
+                    span.End()
+                    tracksWritten += 1
+                albumSpan.End()
+                ReportProgress(position + 1, len(selectedAlums), "albums", f"{tracksWritten} tracks")
+    except ExportInProgress as e:
+        console.Error(f"Export failed: {e}. Wait for it to finish, or choose another folder.")
+        return False
+    except JobCancelled:
+        console.Log("Export cancelled. Run it again with the same albums and folder to resume from the last checkpoint.")
+        Report()
+        return False
+    except Exception as e:
+        console.Error(f"Export failed: {e}")
+        console.Error("Run the export again with the same albums and folder to resume from the last checkpoint.")
+        Report()
+        return False
+
+    Report()
+    if incremental:
+        console.Log("Changed rows: " + ", ".join(f"{kind} {count}" for kind, count in export.counts.items()))
+    console.Log("Done!")
+    return True
@@ -0,0 +1,134 @@
+from AppLog import Logger
+from Jobs import IsCancelled, ReportProgress
+from concurrent.futures import ThreadPoolExecutor
+import csv
+import os
+
+FILENAME_HEADERS = ("TRACK: Audio Filename", "HARVEST TRACK: Audio Filename")
+# Renames on network shares are slow but light, so run many at once
+RENAME_WORKERS = 16
+
+def OldFileName(newName: str):
+    """
+    The name Harvest delivered a file under: the 3rd and 4th "_" separated
+    parts of its final name. None if the name has fewer parts.
+    """
+    splitName = newName.split("_")
+    if len(splitName) < 4:
+        return None
+    return f"{splitName[2]}_{splitName[3]}"
+
+def ReadHarvestCsv(filePath: str) -> tuple:
+    """Read a Harvest CSV. Returns (rows, index of the filename column or None if it has none)."""
+    with open(filePath, newline='', encoding='utf-8') as csvfile:
+        rows = list(csv.reader(csvfile))
+    header = rows[0] if rows else []
+    column = next((header.index(name) for name in FILENAME_HEADERS if name in header), None)
+    return rows, column
+
+def FileNames(rows: list, column: int) -> list:
+    """The final file names listed in a Harvest CSV."""
+    return [row[column] for row in rows[1:] if len(row) > column and row[column]]
+
+def PlanRenames(dir: str, newNames: list) -> tuple:
+    """
+    Build the renames for the given final file names against a single scan
+    of dir. Returns (renames, skipped, problems): renames is a list of
+    (oldName, newName) that are safe to run, skipped lists files already
+    renamed by an earlier run, problems lists (newName, reason) for rows
+    that cannot be renamed.
+    """
+    files = [entry.name for entry in os.scandir(dir or ".") if entry.is_file()]
+    existing = set(files)
+    # Shares are often case-insensitive, so also find files by their folded name
+    folded = {}
+    for name in files:
+        folded.setdefault(name.casefold(), name)
+
+    def Find(name: str):
+        return name if name in existing else folded.get(name.casefold())
+
+    targets = {}
+    sources = {}
+    for newName in newNames:
+        targets[newName] = targets.get(newName, 0) + 1
+        oldName = OldFileName(newName)
+        if oldName:
+            sources[oldName.casefold()] = sources.get(oldName.casefold(), 0) + 1
+
+    renames = []
+    skipped = []
+    problems = []
+    for newName in newNames:
+        oldName = OldFileName(newName)
+        if oldName is None:
+            problems.append((newName, "malformed name, expected at least 4 \"_\" separated parts"))
+        elif targets[newName] > 1:
+            if (newName, f"listed {targets[newName]} times") not in problems:
+                problems.append((newName, f"listed {targets[newName]} times"))
+        elif sources[oldName.casefold()] > 1:
+            problems.append((newName, f"{oldName} is the source of {sources[oldName.casefold()]} rows"))
+        elif Find(oldName) is None:
+            if Find(newName) is not None:
+                skipped.append(newName)
+            else:
+                problems.append((newName, f"{oldName} not found"))
+        elif Find(newName) is not None and Find(newName) != Find(oldName):
+            problems.append((newName, f"{newName} already exists"))
+        else:
+            renames.append((Find(oldName), newName))
+    return renames, skipped, problems
+
+def ProcessHarvest(filePath: str, console: Logger, dryRun: bool = False) -> dict:
+    """Process the CSV file: rename files and export as TSV. Returns {"rows", "renamed", "skipped", "problems", "failed"}."""
+    dir = os.path.dirname(filePath)
+    rows, column = ReadHarvestCsv(filePath)
+    if column is None:
+        console.Error("Filename header not found in CSV file.")
+        return {"rows": 0, "renamed": 0, "skipped": 0, "problems": 0, "failed": 0}
+    renames, skipped, problems = PlanRenames(dir, FileNames(rows, column))
+    stats = {"rows": len(rows) - 1, "renamed": 0, "skipped": len(skipped), "problems": len(problems), "failed": 0}
+    for newName, reason in problems:
+        console.Error(f"Cannot rename to {newName}: {reason}")
+    if skipped:
+        console.Log(f"{len(skipped)} files already renamed")
+    if dryRun:
+        for oldName, newName in renames:
+            console.Log(f"Would rename {oldName} to {newName}")
+        console.Log(f"Dry run: {len(renames)} files would be renamed, {len(problems)} problems")
+        return stats
+
+    base, _ = os.path.splitext(filePath)
+    outputPath = base + ".txt"
+    with ThreadPoolExecutor(max_workers=RENAME_WORKERS, thread_name_prefix="harvest") as pool:
+        futures = [
+            (oldName, newName, pool.submit(os.rename, os.path.join(dir, oldName), os.path.join(dir, newName)))
+            for oldName, newName in renames
+        ]
+        # Write the CSV as TSV while the renames run
+        tmpPath = outputPath + ".tmp"
+        with open(tmpPath, 'w', newline='', encoding='utf-8') as tsvfile:
+            writer = csv.writer(tsvfile, delimiter='\t')
+            writer.writerows(rows)
+        os.replace(tmpPath, outputPath)
+
+        cancelled = False
+        for position, (oldName, newName, future) in enumerate(futures):
+            if not cancelled and IsCancelled():
+                cancelled = True
+                notStarted = sum(pending.cancel() for _, _, pending in futures[position:])
+                if notStarted:
+                    console.Log(f"Cancelled: {notStarted} files left to rename")
+            if future.cancelled():
+                continue
+            try:
+                future.result()
+                stats["renamed"] += 1
+                console.Log(f"Renamed {oldName} to {newName}")
+            except Exception as e:
+                stats["failed"] += 1
+                console.Error(f"Error renaming {oldName} to {newName}: {e}")
+            ReportProgress(position + 1, len(futures), "files")
+
+    console.Log(f"TSV file written to: {outputPath}")
+    return stats
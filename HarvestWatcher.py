@@ -0,0 +1,157 @@
+from AppLog import Logger
+from AppPaths import DataPath
+from HarvestProcessor import ProcessHarvest, ReadHarvestCsv, FileNames, OldFileName
+from Jobs import IsCancelled
+from datetime import datetime, timezone
+import threading
+import time
+import json
+import os
+
+# Seconds before a CSV whose processing failed is tried again, doubled per
+# failure up to RETRY_MAX; a CSV that changes is tried again at once
+RETRY_DELAY = 60
+RETRY_MAX = 3600
+
+class HarvestLedger:
+    """
+    Record of the Harvest CSVs already processed, by path, size and
+    modification time, so a watched folder never processes a CSV twice
+    while a CSV replaced by a new delivery is processed again.
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path if path else DataPath("harvest_ledger.json")
+        self.entries = {}
+        if os.path.exists(self.path):
+            with open(self.path, encoding='utf-8') as ledgerFile:
+                self.entries = json.load(ledgerFile)
+
+    @staticmethod
+    def Key(filePath: str) -> str:
+        return os.path.normcase(os.path.abspath(filePath))
+
+    def IsProcessed(self, filePath: str, stat: os.stat_result) -> bool:
+        entry = self.entries.get(self.Key(filePath))
+        return entry is not None and entry["size"] == stat.st_size and entry["mtime"] == stat.st_mtime
+
+    def Record(self, filePath: str, stat: os.stat_result, stats: dict) -> None:
+        self.entries[self.Key(filePath)] = {
+            "size": stat.st_size,
+            "mtime": stat.st_mtime,
+            "processedAt": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "stats": stats,
+        }
+        tmpPath = self.path + ".tmp"
+        with open(tmpPath, "w", encoding='utf-8') as ledgerFile:
+            json.dump(self.entries, ledgerFile, indent=1)
+        os.replace(tmpPath, self.path)
+
+class HarvestWatcher:
+    """
+    Processes the Harvest CSVs dropped into a folder without anyone clicking.
+    Each Check() looks for CSVs not in the ledger and processes those whose
+    audio files have all arrived and that did not change since the previous
+    Check(), so files still being copied are left for a later round.
+    Check() is driven by a QFileSystemWatcher in the GUI, or by Run() polling
+    on the command line. A CSV whose processing fails is not recorded and is
+    tried again later.
+    """
+
+    def __init__(self, directory: str, console: Logger, ledger: HarvestLedger = None):
+        self.directory = directory
+        self.console = console
+        self.ledger = ledger if ledger else HarvestLedger()
+        # CSV path -> snapshot of it and its audio files at the previous Check
+        self.snapshots = {}
+        self.waiting = {}
+        # CSV path -> (size and mtime, failures so far, time.monotonic() of the next attempt)
+        self.failures = {}
+        self.lock = threading.Lock()
+
+    def Snapshot(self, filePath: str, stat: os.stat_result, sizes: dict):
+        """
+        Return (sizes of the CSV and its audio files, number of audio files
+        still missing), or (None, None) if the CSV is not complete yet.
+        """
+        try:
+            rows, column = ReadHarvestCsv(filePath)
+        except (OSError, UnicodeDecodeError):
+            return None, None
+        if column is None:
+            return None, None
+        snapshot = [(None, stat.st_size, stat.st_mtime)]
+        missing = 0
+        for newName in FileNames(rows, column):
+            oldName = OldFileName(newName)
+            present = [name for name in (oldName, newName) if name and name.casefold() in sizes]
+            if not present:
+                missing += 1
+            for name in present:
+                snapshot.append((name, sizes[name.casefold()]))
+        return snapshot, missing
+
+    def Check(self) -> list:
+        """Process every CSV in the folder that is ready. Returns the paths processed."""
+        with self.lock:
+            sizes = {}
+            csvFiles = []
+            for entry in os.scandir(self.directory):
+                if not entry.is_file():
+                    continue
+                sizes[entry.name.casefold()] = entry.stat().st_size
+                if entry.name.lower().endswith(".csv"):
+                    csvFiles.append(entry.path)
+
+            processed = []
+            for filePath in sorted(csvFiles):
+                stat = os.stat(filePath)
+                if self.ledger.IsProcessed(filePath, stat):
+                    continue
+                failure = self.failures.get(filePath)
+                if failure and failure[0] == (stat.st_size, stat.st_mtime) and time.monotonic() < failure[2]:
+                    continue
+                snapshot, missing = self.Snapshot(filePath, stat, sizes)
+                previous = self.snapshots.get(filePath)
+                self.snapshots[filePath] = snapshot
+                if snapshot is None:
+                    continue
+                if missing:
+                    if self.waiting.get(filePath) != missing:
+                        self.console.Log(f"{os.path.basename(filePath)}: waiting for {missing} audio files")
+                    self.waiting[filePath] = missing
+                    continue
+                if snapshot != previous:
+                    # Still being copied, or seen for the first time; look again next round
+                    continue
+                self.console.Log(f"Processing: {filePath}")
+                try:
+                    stats = ProcessHarvest(filePath, self.console)
+                except Exception as e:
+                    if IsCancelled():
+                        break
+                    failures = failure[1] + 1 if failure and failure[0] == (stat.st_size, stat.st_mtime) else 1
+                    delay = min(RETRY_DELAY * 2 ** (failures - 1), RETRY_MAX)
+                    self.failures[filePath] = ((stat.st_size, stat.st_mtime), failures, time.monotonic() + delay)
+                    self.console.Error(f"Error processing {filePath}: {e}. Trying again in {delay // 60} min.")
+                    continue
+                if IsCancelled():
+                    # Not recorded, so the rest of its renames run next time
+                    break
+                self.ledger.Record(filePath, stat, stats)
+                self.failures.pop(filePath, None)
+                self.snapshots.pop(filePath, None)
+                self.waiting.pop(filePath, None)
+                processed.append(filePath)
+            return processed
+
+    def Run(self, interval: float = 30, stopEvent: threading.Event = None) -> None:
+        """Poll the folder every interval seconds until stopEvent is set."""
+        stopEvent = stopEvent if stopEvent else threading.Event()
+        self.console.Log(f"Watching {self.directory} for Harvest CSVs")
+        while not stopEvent.is_set():
+            try:
+                self.Check()
+            except OSError as e:
+                self.console.Error(f"Could not scan {self.directory}: {e}")
+            stopEvent.wait(interval)
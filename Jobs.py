@@ -0,0 +1,123 @@
+import contextvars
+import threading
+import time
+
+class JobCancelled(Exception):
+    """Raised by CheckCancelled in a job that was asked to stop."""
+
+class Job:
+    """
+    A piece of background work with its progress, shared between the thread
+    running it and the GUI. The function runs with the job as the current
+    job, so the code it calls reports progress with ReportProgress and
+    stops at the next CheckCancelled once Cancel() was called. Every Notion
+    request checks, so cancelling takes effect between API calls.
+    status: Queued, Running, Done, Failed or Cancelled.
+
+    Run as jobs, ProcessImport reports albums and stops between tracks
+    (running it again resumes from the last checkpoint), ProcessHarvest
+    reports files and drops the renames not started yet, and AddVersions
+    and AddVersionsBulk report versions and leave out those not sent yet.
+    """
+
+    def __init__(self, kind: str, name: str, func, args: tuple = (), onDone=None):
+        """kind: the job's group, for limits. onDone: called with the job when it ends."""
+        self.kind = kind
+        self.name = name
+        self.func = func
+        self.args = args
+        self.onDone = onDone
+        self.status = "Queued"
+        self.result = None
+        self.error = None
+        self.done = 0
+        self.total = None
+        self.unit = ""
+        self.detail = ""
+        self.started = None
+        self.ended = None
+        self.cancelEvent = threading.Event()
+        # Called by Cancel(), e.g. to stop waiting for the rate limit
+        self.onCancel = []
+        self.lock = threading.Lock()
+
+    def Run(self) -> None:
+        """Run the job's function on the calling thread. Failures are kept in error, not raised."""
+        with self.lock:
+            if self.status != "Queued":
+                return
+            self.status = "Running"
+            self.started = time.monotonic()
+        token = currentJob.set(self)
+        try:
+            self.result = self.func(*self.args)
+            # Functions returning True/False report success that way
+            status = "Failed" if self.result is False else "Done"
+        except JobCancelled:
+            status = "Cancelled"
+        except Exception as e:
+            self.error = e
+            status = "Failed"
+        finally:
+            currentJob.reset(token)
+        with self.lock:
+            self.status = "Cancelled" if self.cancelEvent.is_set() else status
+            self.ended = time.monotonic()
+
+    def Cancel(self) -> bool:
+        """
+        Ask the job to stop at its next check. A job that has not started
+        never will. Returns True if this dropped it before it started.
+        """
+        self.cancelEvent.set()
+        with self.lock:
+            dropped = self.status == "Queued"
+            if dropped:
+                self.status = "Cancelled"
+        for callback in list(self.onCancel):
+            callback()
+        return dropped
+
+    def IsFinished(self) -> bool:
+        return self.status in ("Done", "Failed", "Cancelled")
+
+    def Progress(self, done: int, total: int = None, unit: str = "", detail: str = "") -> None:
+        with self.lock:
+            self.done = done
+            self.total = total
+            self.unit = unit
+            self.detail = detail
+
+    def Snapshot(self) -> dict:
+        """
+        The job's state for display: name, status, done, total, unit, detail,
+        elapsed seconds, throughput in units per second and ETA in seconds
+        (None until it can be estimated).
+        """
+        with self.lock:
+            elapsed = ((self.ended or time.monotonic()) - self.started) if self.started else 0.0
+            rate = self.done / elapsed if elapsed and self.done else None
+            eta = (self.total - self.done) / rate if rate and self.total and self.status == "Running" else None
+            return {
+                "name": self.name, "status": self.status, "done": self.done, "total": self.total,
+                "unit": self.unit, "detail": self.detail, "elapsed": elapsed, "rate": rate, "eta": eta,
+                "error": self.error,
+            }
+
+# The job the current thread or task is running, if any
+currentJob = contextvars.ContextVar("currentJob", default=None)
+
+def IsCancelled() -> bool:
+    job = currentJob.get()
+    return job is not None and job.cancelEvent.is_set()
+
+def CheckCancelled() -> None:
+    """Raise JobCancelled if the current job was asked to stop. Does nothing outside of jobs."""
+    if IsCancelled():
+        raise JobCancelled(f"{currentJob.get().name} was cancelled")
+
+def ReportProgress(done: int, total: int = None, unit: str = "", detail: str = "") -> None:
+    """Report the current job's progress, e.g. ReportProgress(3, 10, "albums"). Does nothing outside of jobs."""
+    job = currentJob.get()
+    if job is not None:
+        job.Progress(done, total, unit, detail)
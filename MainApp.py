@@ -1,33 +1,304 @@
 from PyQt6.QtWidgets import *
 from PyQt6.QtCore import *
 from PyQt6.QtGui import *
-from NotionHelper import *
+from Catalog import *
+from AppLog import LogChannel, LOG_FILE
+from HarvestProcessor import ProcessHarvest
+from HarvestWatcher import HarvestWatcher
+from VersionAdder import AddVersions, AddVersionsBulk
+from FilemakerImporter import ProcessImport
+from Jobs import Job
+from datetime import datetime
 import requests
 import webbrowser
+import unicodedata
+import threading
+import bisect
 import sys
-import csv
 import os
+import re
 
 APP_VERSION = "1.0.15" 
 GITHUB_REPO = "da-penguin-guy/Filemaker-Notion-Helper"
 
 threads = {}
+# Background jobs run at once, in all and per kind; the others wait their turn
+MAX_JOBS = 4
+JOB_LIMITS = {"export": 2, "bulk versions": 1, "harvest": 2}
+
+class JobManager(QObject):
+    """
+    Runs the long work of every tab as jobs (see Jobs.Job) on a QThreadPool:
+    at most maxJobs at once and at most limits[kind] of a kind, the others
+    waiting their turn in the order they were submitted.
+    added and finished are emitted on the GUI thread, where each job's
+    onDone is also called.
+    """
+    added = pyqtSignal(object)
+    finished = pyqtSignal(object)
+    # Emitted on the pool thread that ran the job
+    ended = pyqtSignal(object)
+
+    def __init__(self, maxJobs: int = 4, limits: dict = None, parent=None):
+        super().__init__(parent)
+        self.maxJobs = maxJobs
+        self.limits = limits if limits else {}
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(maxJobs)
+        # Every job submitted, oldest first, and those handed to the pool
+        self.jobs = []
+        self.running = []
+        self.ended.connect(self.OnEnded, Qt.ConnectionType.QueuedConnection)
+
+    def Submit(self, kind: str, name: str, func, args: tuple = (), onDone=None) -> Job:
+        """Queue func(*args) as a job and start it if the limits allow."""
+        job = Job(kind, name, func, args, onDone)
+        self.jobs.append(job)
+        self.added.emit(job)
+        self.StartQueued()
+        return job
+
+    def Pending(self, kind: str) -> list:
+        """The jobs of a kind that are queued or running."""
+        return [job for job in self.jobs if job.kind == kind and not job.IsFinished()]
+
+    def StartQueued(self) -> None:
+        for job in self.jobs:
+            if len(self.running) >= self.maxJobs:
+                return
+            if job.status != "Queued" or job in self.running:
+                continue
+            if sum(running.kind == job.kind for running in self.running) >= self.limits.get(job.kind, self.maxJobs):
+                continue
+            self.running.append(job)
+            self.pool.start(lambda job=job: self.RunJob(job))
+
+    def RunJob(self, job: Job) -> None:
+        job.Run()
+        self.ended.emit(job)
+
+    def OnEnded(self, job: Job) -> None:
+        if job in self.running:
+            self.running.remove(job)
+        if job.onDone:
+            job.onDone(job)
+        self.finished.emit(job)
+        self.StartQueued()
+
+    def Cancel(self, job: Job) -> None:
+        """Stop a job at its next check, or drop it if it has not started. Finished jobs are left alone."""
+        if job.IsFinished():
+            return
+        # A job dropped from the queue never reaches the pool, so it ends here
+        if job.Cancel() and job not in self.running:
+            self.OnEnded(job)
+
+    def ClearFinished(self) -> None:
+        self.jobs = [job for job in self.jobs if not job.IsFinished()]
+
+    def Shutdown(self, timeout: float = 5) -> None:
+        """Cancel every job and wait up to timeout seconds for the running ones to stop."""
+        for job in self.jobs:
+            job.Cancel()
+        self.pool.waitForDone(int(timeout * 1000))
+
+def FormatDuration(seconds: float) -> str:
+    seconds = int(seconds)
+    return f"{seconds // 3600}:{seconds // 60 % 60:02d}:{seconds % 60:02d}" if seconds >= 3600 else f"{seconds // 60}:{seconds % 60:02d}"
 
-class Worker(QObject):
-    finished = pyqtSignal()
-    result = pyqtSignal(object)
+class JobsPanel(QWidget):
+    """Table of the JobManager's jobs with their progress, throughput and ETA, and a Cancel button each."""
 
-    def __init__(self, func, *args, **kwargs):
+    COLUMNS = ["Job", "Status", "Progress", "Speed", "ETA", ""]
+    REFRESH_INTERVAL_MS = 500
+
+    def __init__(self, manager: JobManager, parent=None):
+        super().__init__(parent)
+        self.manager = manager
+        self.table = QTableWidget(0, len(self.COLUMNS))
+        self.table.setHorizontalHeaderLabels(self.COLUMNS)
+        self.table.verticalHeader().setVisible(False)
+        self.table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.table.setSelectionMode(QAbstractItemView.SelectionMode.NoSelection)
+        header = self.table.horizontalHeader()
+        header.setSectionResizeMode(QHeaderView.ResizeMode.ResizeToContents)
+        header.setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        header.setSectionResizeMode(2, QHeaderView.ResizeMode.Stretch)
+        clearBtn = QPushButton("Clear finished")
+        clearBtn.clicked.connect(self.ClearFinished)
+        titleLayout = QHBoxLayout()
+        titleLabel = QLabel("Jobs")
+        titleLabel.setStyleSheet("font-size: 16px; font-weight: bold;")
+        titleLayout.addWidget(titleLabel)
+        titleLayout.addStretch(1)
+        titleLayout.addWidget(clearBtn)
+        panelLayout = QVBoxLayout()
+        panelLayout.setContentsMargins(0, 0, 0, 0)
+        panelLayout.addLayout(titleLayout)
+        panelLayout.addWidget(self.table)
+        self.setLayout(panelLayout)
+        # Job -> (progress bar, cancel button) of its row
+        self.rows = {}
+        self.refreshTimer = QTimer(self)
+        self.refreshTimer.setInterval(self.REFRESH_INTERVAL_MS)
+        self.refreshTimer.timeout.connect(self.Refresh)
+        manager.added.connect(self.AddJob)
+        manager.finished.connect(lambda job: self.Refresh())
+
+    def AddJob(self, job: Job) -> None:
+        row = self.table.rowCount()
+        self.table.insertRow(row)
+        self.table.setItem(row, 0, QTableWidgetItem(job.name))
+        for column in (1, 3, 4):
+            self.table.setItem(row, column, QTableWidgetItem(""))
+        bar = QProgressBar()
+        bar.setMaximumHeight(18)
+        self.table.setCellWidget(row, 2, bar)
+        cancelBtn = QPushButton("Cancel")
+        cancelBtn.clicked.connect(lambda: self.manager.Cancel(job))
+        self.table.setCellWidget(row, 5, cancelBtn)
+        self.rows[job] = (bar, cancelBtn)
+        self.Refresh()
+        self.refreshTimer.start()
+
+    def Refresh(self) -> None:
+        """Show the current state of every job; stops polling once none is left running."""
+        for row, job in enumerate(self.rows):
+            bar, cancelBtn = self.rows[job]
+            state = job.Snapshot()
+            statusItem = self.table.item(row, 1)
+            statusItem.setText("Cancelling" if state["status"] == "Running" and job.cancelEvent.is_set() else state["status"])
+            statusItem.setToolTip(str(state["error"]) if state["error"] else "")
+            statusItem.setForeground(QColor(Qt.GlobalColor.red) if state["status"] == "Failed" else self.palette().color(QPalette.ColorRole.Text))
+            if state["total"]:
+                bar.setRange(0, state["total"])
+                bar.setValue(min(state["done"], state["total"]))
+                bar.setFormat(f"{state['done']}/{state['total']} {state['unit']}" + (f", {state['detail']}" if state["detail"] else ""))
+            elif state["status"] == "Running":
+                # Nothing reported yet: show it as busy
+                bar.setRange(0, 0)
+            else:
+                bar.setRange(0, 1)
+                bar.setValue(1 if state["status"] == "Done" else 0)
+            self.table.item(row, 3).setText(f"{state['rate']:.1f} {state['unit']}/s" if state["rate"] else "")
+            self.table.item(row, 4).setText(FormatDuration(state["eta"]) if state["eta"] is not None else FormatDuration(state["elapsed"]) if job.IsFinished() and state["elapsed"] else "")
+            cancelBtn.setEnabled(not job.IsFinished())
+        if all(job.IsFinished() for job in self.rows):
+            self.refreshTimer.stop()
+
+    def ClearFinished(self) -> None:
+        self.manager.ClearFinished()
+        for row in reversed(range(self.table.rowCount())):
+            job = list(self.rows)[row]
+            if job.IsFinished():
+                self.table.removeRow(row)
+                del self.rows[job]
+
+class CatalogLoader(QObject):
+    """
+    Loads a mirrored database for a tab without blocking the GUI: emits the
+    local copy first, then the pages the sync pulls from Notion as they
+    arrive, then finished with the sync error or None.
+    """
+    snapshot = pyqtSignal(object)
+    pages = pyqtSignal(object)
+    finished = pyqtSignal(object)
+
+    def __init__(self, database_id: str):
         super().__init__()
-        self.func = func
-        self.args = args
-        self.kwargs = kwargs
+        self.database_id = database_id
 
     @pyqtSlot()
     def run(self):
-        result = self.func(*self.args, **self.kwargs)
-        self.result.emit(result)
-        self.finished.emit()
+        error = None
+        try:
+            self.snapshot.emit(replica.Pages(self.database_id))
+            for results in replica.SyncPages(self.database_id):
+                self.pages.emit(results)
+        except Exception as e:
+            # Not only network errors: a tab waiting for finished would keep loading forever
+            error = e
+        self.finished.emit(error)
+
+def LoadCatalog(name: str, database_id: str, onSnapshot, onPages, onFinished) -> None:
+    """Run a CatalogLoader on its own thread, delivering its signals to the GUI thread."""
+    thread = QThread()
+    loader = CatalogLoader(database_id)
+    loader.moveToThread(thread)
+    loader.snapshot.connect(onSnapshot)
+    loader.pages.connect(onPages)
+    loader.finished.connect(onFinished)
+    thread.started.connect(loader.run)
+    loader.finished.connect(thread.quit)
+    loader.finished.connect(loader.deleteLater)
+    thread.finished.connect(thread.deleteLater)
+    # Store references so they are not garbage collected
+    threads[name] = (thread, loader)
+    thread.start()
+
+class AlbumResolver(QObject):
+    """Reads album pages missing from the local lookup on a background thread and emits their titles."""
+    resolved = pyqtSignal(str, str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.pending = set()
+
+    def Resolve(self, albumId: str) -> None:
+        if albumId in self.pending:
+            return
+        self.pending.add(albumId)
+        threading.Thread(target=self.Run, args=(albumId,), name="album-resolver", daemon=True).start()
+
+    def Run(self, albumId: str) -> None:
+        try:
+            title = GetPageTitle(replica.ReadPage(albumId), "Working Title")
+        except (NotionError, requests.RequestException):
+            title = "(Album not available)"
+        self.pending.discard(albumId)
+        # Queued to the GUI thread, since this object lives there
+        self.resolved.emit(albumId, title)
+
+class CatalogStatus(QWidget):
+    """Loading indicator and freshness of the list a tab shows."""
+
+    def __init__(self, database_id: str, parent=None):
+        super().__init__(parent)
+        self.database_id = database_id
+        self.label = QLabel()
+        self.label.setWordWrap(True)
+        self.bar = QProgressBar()
+        self.bar.setRange(0, 0)
+        self.bar.setMaximumHeight(8)
+        self.bar.setTextVisible(False)
+        statusLayout = QVBoxLayout()
+        statusLayout.setContentsMargins(0, 0, 0, 0)
+        statusLayout.addWidget(self.label)
+        statusLayout.addWidget(self.bar)
+        self.setLayout(statusLayout)
+        self.updated = 0
+        self.Loading()
+
+    def SyncedAt(self) -> str:
+        syncedAt = replica.LastSynced(self.database_id)
+        return datetime.fromtimestamp(syncedAt).strftime("%Y-%m-%d %H:%M") if syncedAt else None
+
+    def Loading(self, updated: int = 0) -> None:
+        """Show that the list is loading, counting the pages updated so far."""
+        self.updated += updated
+        syncedAt = self.SyncedAt()
+        stale = f"Stale as of {syncedAt}. " if syncedAt else ""
+        self.label.setText(f"{stale}Loading from Notion... ({self.updated} updated)")
+        self.bar.show()
+
+    def Done(self, error) -> None:
+        self.bar.hide()
+        syncedAt = self.SyncedAt()
+        if error:
+            self.label.setText(f"Could not refresh from Notion. Stale as of {syncedAt}." if syncedAt else "Could not load from Notion.")
+            self.label.setStyleSheet("color: red;")
+        else:
+            self.label.setText(f"Up to date as of {syncedAt}")
 
 class FileDropLabel(QLabel):
     """Custom QLabel that accepts file drag-and-drop for specific file extensions."""
@@ -70,15 +341,152 @@ class FileDropLabel(QLabel):
             else:
                 ShowError(f"Please drop a valid file: {', '.join(self.accepted_extensions)}")
 
+def FoldText(text: str) -> str:
+    """Lowercase text and strip its accents, for searching."""
+    text = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in text if not unicodedata.combining(c)).casefold()
+
+class SearchIndexModel(QAbstractListModel):
+    """
+    List model over a fixed set of (text, data) items that shows the items
+    matching a search, best matches first: exact, prefix, start of a word,
+    anywhere, then the letters in order (fuzzy).
+    The folded text of every item is computed once and kept joined into one
+    string, so every search is a few regex scans instead of a Python loop.
+    """
+
+    # Nobody scrolls further; stopping here keeps broad searches fast
+    MAX_RESULTS = 500
+    WORD_SEPARATORS = " -_(/"
+    # Text found fewer times than this is ranked in one scan
+    SINGLE_SCAN_BELOW = 5000
+    # Only look for fuzzy matches of 3+ letters, and when the text itself matches fewer items
+    FUZZY_BELOW = 50
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.items = []
+        self.keys = []
+        self.exact = {}
+        self.joined = ""
+        self.lineStarts = []
+        self.rows = []
+        self.query = ""
+
+    def SetItems(self, items: list) -> None:
+        """items: strings or (text, data) pairs."""
+        self.beginResetModel()
+        self.items = [item if isinstance(item, tuple) and len(item) == 2 else (str(item), None) for item in items]
+        self.keys = [FoldText(text) for text, _ in self.items]
+        self.exact = {}
+        for row, key in enumerate(self.keys):
+            self.exact.setdefault(key, []).append(row)
+        # Every key between newlines, so "\n" marks the start and end of an item
+        self.joined = "\n" + "\n".join(self.keys) + "\n"
+        self.lineStarts = []
+        position = 1
+        for key in self.keys:
+            self.lineStarts.append(position)
+            position += len(key) + 1
+        self.rows = list(range(len(self.items)))
+        self.query = ""
+        self.endResetModel()
+
+    def RowAt(self, position: int) -> int:
+        """Index of the item at a position in the joined keys."""
+        return bisect.bisect_right(self.lineStarts, position) - 1
+
+    def Search(self, text: str) -> list:
+        """
+        Return the indexes of the items matching text, best first and in item
+        order within a rank, up to MAX_RESULTS.
+        Text found in few items is ranked in a single scan of the joined keys.
+        Text found in many is searched rank by rank, stopping as soon as
+        enough items are found, which happens early because matches are
+        plentiful.
+        """
+        query = FoldText(text.strip()).replace("\n", " ")
+        if not query:
+            return list(range(len(self.items)))
+        literal = re.escape(query)
+        rows = self.exact.get(query, [])[:self.MAX_RESULTS]
+        seen = set(rows)
+        if self.joined.count(query) <= self.SINGLE_SCAN_BELOW:
+            # Best rank per item: 0 at the start of the item, 1 at the start of a word, 2 anywhere
+            ranks = {}
+            for match in re.finditer(literal, self.joined):
+                row = self.RowAt(match.start())
+                before = self.joined[match.start() - 1]
+                rank = 0 if before == "\n" else 1 if before in self.WORD_SEPARATORS else 2
+                if rank < ranks.get(row, 3):
+                    ranks[row] = rank
+            for wanted in range(3):
+                rows += [row for row, rank in ranks.items() if rank == wanted and row not in seen]
+            rows = rows[:self.MAX_RESULTS]
+            seen.update(rows)
+        else:
+            # Patterns may start on the newline or separator before the match
+            patterns = [f"\n{literal}"] + [re.escape(separator) + literal for separator in self.WORD_SEPARATORS] + [literal]
+            for pattern in patterns:
+                for match in re.finditer(pattern, self.joined):
+                    row = self.RowAt(match.start() + 1)
+                    if row not in seen:
+                        seen.add(row)
+                        rows.append(row)
+                        if len(rows) >= self.MAX_RESULTS:
+                            return rows
+        if len(query) >= 3 and len(rows) < self.FUZZY_BELOW:
+            # Letters in order with anything between them, within one item; each gap
+            # excludes the next letter, so a failed match never backtracks
+            fuzzy = re.escape(query[0]) + "".join(f"[^\\n{re.escape(c)}]*{re.escape(c)}" for c in query[1:])
+            for match in re.finditer(fuzzy, self.joined):
+                row = self.RowAt(match.start())
+                if row not in seen:
+                    seen.add(row)
+                    rows.append(row)
+                    if len(rows) >= self.MAX_RESULTS:
+                        break
+        return rows
+
+    def Filter(self, text: str) -> None:
+        self.query = text
+        self.beginResetModel()
+        self.rows = self.Search(text)
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self.rows)
+
+    def data(self, index: QModelIndex, role: int = Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or index.row() >= len(self.rows):
+            return None
+        text, data = self.items[self.rows[index.row()]]
+        if role in (Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.EditRole):
+            return text
+        if role == Qt.ItemDataRole.UserRole:
+            return data
+        return None
+
 class SearchableComboBox(QComboBox):
     """A QComboBox with live search/filtering capability."""
 
+    # Wait this long after the last keystroke before filtering
+    SEARCH_DELAY_MS = 120
+
     def __init__(self, parent=None):
         """Set up editable combo box and connect search logic."""
         super().__init__(parent)
         self.setEditable(True)
         self.setInsertPolicy(QComboBox.InsertPolicy.NoInsert)
-        self.lineEdit().textEdited.connect(self.filter_items)
+        self.searchModel = SearchIndexModel(self)
+        self.setModel(self.searchModel)
+        # The search replaces the default completer, which would scan every item per keystroke
+        self.setCompleter(None)
+        self.searchTimer = QTimer(self)
+        self.searchTimer.setSingleShot(True)
+        self.searchTimer.setInterval(self.SEARCH_DELAY_MS)
+        self.searchTimer.timeout.connect(lambda: self.filter_items(self.lineEdit().text()))
+        self.lineEdit().textEdited.connect(lambda _: self.searchTimer.start())
         self.all_items = []
 
     def showPopup(self) -> None:
@@ -87,32 +495,44 @@ class SearchableComboBox(QComboBox):
         self.lineEdit().setFocus()
 
     def addItems(self, items: list) -> None:
-        """Add items to the combo box and store all for filtering."""
-        super().clear()
+        """
+        Set the items of the combo box: strings or (text, data) pairs.
+        The current search and selection are kept, so the list can be
+        refreshed while someone is using it.
+        """
+        self.blockSignals(True)
+        current_text = self.lineEdit().text()
+        current_data = self.currentData()
         self.all_items = items
-        for item in items:
-            if isinstance(item, tuple) and len(item) == 2:
-                self.addItem(item[0], item[1])
-            else:
-                self.addItem(item)
+        self.searchModel.SetItems(items)
+        if self.searchModel.query:
+            self.searchModel.Filter(self.searchModel.query)
+        # Only an earlier selection is selected again; nothing is picked on its own
+        self.setCurrentIndex(self.findData(current_data) if current_data is not None else -1)
+        self.setEditText(current_text)
+        self.blockSignals(False)
 
     def filter_items(self, text: str) -> None:
         """Filter items based on the search text."""
         self.blockSignals(True)
         current_text = self.lineEdit().text()
-        self.clear()
-        for item in self.all_items:
-            if text.lower() in str(item).lower():
-                if isinstance(item, tuple) and len(item) == 2:
-                    self.addItem(item[0], item[1])
-                else:
-                    self.addItem(item)
+        self.searchModel.Filter(text)
+        self.setCurrentIndex(0 if self.searchModel.rowCount() else -1)
         self.setEditText(current_text)
         self.blockSignals(False)
         # Do NOT call self.showPopup() here!
 
 class Console(QTextEdit):
-    """A read-only text console for logging output and errors."""
+    """
+    A read-only text console for logging output and errors.
+    Log and Error may be called from any thread: records are buffered in a
+    LogChannel and appended in batches on the GUI thread, at most every
+    FLUSH_INTERVAL_MS. Only the last MAX_LINES lines are kept.
+    """
+    pending = pyqtSignal()
+
+    MAX_LINES = 5000
+    FLUSH_INTERVAL_MS = 100
 
     def __init__(self, parent=None):
         """Set up the console appearance and make it read-only."""
@@ -120,17 +540,45 @@ class Console(QTextEdit):
         self.setReadOnly(True)
         self.setStyleSheet("font-family: monospace; font-size: 14px; padding: 10px;")
         self.setMinimumHeight(200)
+        self.document().setMaximumBlockCount(self.MAX_LINES)
+        self.errorFormat = QTextCharFormat()
+        self.errorFormat.setForeground(QColor(Qt.GlobalColor.red))
+        self.flushTimer = QTimer(self)
+        self.flushTimer.setSingleShot(True)
+        self.flushTimer.setInterval(self.FLUSH_INTERVAL_MS)
+        self.flushTimer.timeout.connect(self.Flush)
+        # Emitted on whichever thread logs; queued so the flush is scheduled on the GUI thread
+        self.pending.connect(self.ScheduleFlush, Qt.ConnectionType.QueuedConnection)
+        self.channel = LogChannel(maxPending=self.MAX_LINES, onPending=self.pending.emit)
 
     def Log(self, text: str) -> None:
         """Append normal log text to the console."""
-        super().append(text)
-        self.moveCursor(QTextCursor.MoveOperation.End)
+        self.channel.Log(text)
 
     def Error(self, text: str) -> None:
         """Append error text in red to the console."""
-        self.setTextColor(Qt.GlobalColor.red)
-        self.Log(text)
-        self.setTextColor(Qt.GlobalColor.white)
+        self.channel.Error(text)
+
+    def ScheduleFlush(self) -> None:
+        if not self.flushTimer.isActive():
+            self.flushTimer.start()
+
+    def Flush(self) -> None:
+        """Append everything buffered since the last flush as one edit."""
+        records, dropped = self.channel.Drain()
+        if not records:
+            return
+        cursor = QTextCursor(self.document())
+        cursor.movePosition(QTextCursor.MoveOperation.End)
+        cursor.beginEditBlock()
+        if dropped:
+            records.insert(0, (True, f"... {dropped} lines skipped, see {LOG_FILE} for the full log"))
+        for isError, text in records:
+            if not self.document().isEmpty():
+                cursor.insertBlock(QTextBlockFormat(), QTextCharFormat())
+            cursor.insertText(text, self.errorFormat if isError else QTextCharFormat())
+        cursor.endEditBlock()
+        self.verticalScrollBar().setValue(self.verticalScrollBar().maximum())
 
 
 def CreateHarevestLayout(layout: QVBoxLayout) -> None:
@@ -141,6 +589,11 @@ def CreateHarevestLayout(layout: QVBoxLayout) -> None:
     btn = QPushButton("Process Harvest")
     btn.setMinimumSize(150, 50)
     btn.setStyleSheet("font-size: 18px; font-weight: bold; padding: 12px;")
+    dryRunBox = QCheckBox("Dry run (only list the renames)")
+    watchBtn = QPushButton("Watch a folder...")
+    watchBtn.setToolTip("Process CSVs dropped into a folder automatically once their audio files have arrived")
+    watchLabel = QLabel("Not watching")
+    watchLabel.setWordWrap(True)
 
     # Create the console for output
     console = Console()
@@ -150,7 +603,10 @@ def CreateHarevestLayout(layout: QVBoxLayout) -> None:
     leftLayout = QVBoxLayout()
     # Add file drop and button to the left side
     leftLayout.addWidget(fileDrop)
+    leftLayout.addWidget(dryRunBox)
     leftLayout.addWidget(btn)
+    leftLayout.addWidget(watchBtn)
+    leftLayout.addWidget(watchLabel)
     leftLayout.addStretch(1)  # Push widgets to the top
     # Assign the left layout with 1/3 of the width
     hLayout.addLayout(leftLayout, 1)
@@ -159,53 +615,75 @@ def CreateHarevestLayout(layout: QVBoxLayout) -> None:
     layout.addLayout(hLayout)
 
     def OnButtonClicked() -> None:
-        """Handle the process button click event."""
+        """Process the dropped CSV as a background job."""
         if fileDrop.dropped_file_path:
             console.Log(f"Processing: {fileDrop.dropped_file_path}")
-            try:
-                ProcessHarvest(fileDrop.dropped_file_path, console)
-                console.Log("Done!")
-            except Exception as e:
-                console.Error(f"Error: {e}")
+            jobs.Submit("harvest", f"Harvest {os.path.basename(fileDrop.dropped_file_path)}", ProcessHarvest,
+                        (fileDrop.dropped_file_path, console, dryRunBox.isChecked()), OnHarvestDone)
         else:
             ShowError("No file selected.")
-    btn.clicked.connect(OnButtonClicked)
 
-def ProcessHarvest(filePath: str, console: Console) -> None:
-    """Process the CSV file: rename files and export as TSV."""
-    dir = os.path.dirname(filePath)
-    with open(filePath, newline='', encoding='utf-8') as csvfile:
-        reader = csv.DictReader(csvfile)
-        for row in reader:
-            newName = ""
-            try:
-                newName = row["TRACK: Audio Filename"]
-            except Exception as e:
-                try:
-                    newName = row["HARVEST TRACK: Audio Filename"]
-                except Exception as e:
-                    console.Error("Filename header not found in CSV file.")
-                    return
-            splitName = newName.split("_")
-            oldName = f"{splitName[2]}_{splitName[3]}"
-            try:
-                os.rename(os.path.join(dir,oldName), os.path.join(dir,newName))
-                console.Log(f"Renamed {oldName} to {newName}")
-            except Exception as e:
-                console.Error(f"Error renaming {oldName} to {newName}: {e}")
-    base, _ = os.path.splitext(filePath)
-    outputPath = base + ".txt"
-
-    # Write the CSV as TSV
-    with open(filePath, newline='', encoding='utf-8') as csvfile, \
-        open(outputPath, 'w', newline='', encoding='utf-8') as tsvfile:
-        reader = csv.reader(csvfile)
-        writer = csv.writer(tsvfile, delimiter='\t')
-        for row in reader:
-            writer.writerow(row)
-
-    console.Log(f"TSV file written to: {outputPath}")
+    def OnHarvestDone(job: Job) -> None:
+        if job.status == "Done":
+            console.Log("Done!")
+        elif job.status == "Cancelled":
+            console.Log("Cancelled.")
+        else:
+            console.Error(f"Error: {job.error}")
+    btn.clicked.connect(OnButtonClicked)
 
+    # Watch mode: the folder watcher reacts to new files, the timer re-checks
+    # CSVs whose audio was still being copied
+    fileWatcher = QFileSystemWatcher(console)
+    pollTimer = QTimer(console)
+    pollTimer.setInterval(30 * 1000)
+    settleTimer = QTimer(console)
+    settleTimer.setSingleShot(True)
+    settleTimer.setInterval(5 * 1000)
+    harvestWatcher = {}
+
+    def CheckWatchedFolder() -> None:
+        """Scan the watched folder as a background job, unless the previous scan is still running."""
+        if "watcher" not in harvestWatcher:
+            return
+        previous = harvestWatcher.get("job")
+        if previous and not previous.IsFinished():
+            return
+        watcher = harvestWatcher["watcher"]
+        harvestWatcher["job"] = jobs.Submit("harvest", f"Watch {watcher.directory}", watcher.Check, (),
+                                            lambda job: OnWatchDone(job, watcher.directory))
+
+    def OnWatchDone(job: Job, directory: str) -> None:
+        if job.status == "Failed":
+            console.Error(f"Could not scan {directory}: {job.error}")
+
+    def OnWatchClicked() -> None:
+        if "watcher" in harvestWatcher:
+            fileWatcher.removePaths(fileWatcher.directories())
+            pollTimer.stop()
+            settleTimer.stop()
+            if harvestWatcher.get("job"):
+                jobs.Cancel(harvestWatcher.pop("job"))
+            del harvestWatcher["watcher"]
+            watchBtn.setText("Watch a folder...")
+            watchLabel.setText("Not watching")
+            return
+        directory = QFileDialog.getExistingDirectory(None, "Select the Harvest drop folder")
+        if not directory:
+            return
+        harvestWatcher["watcher"] = HarvestWatcher(directory, console)
+        fileWatcher.addPath(directory)
+        pollTimer.start()
+        watchBtn.setText("Stop watching")
+        watchLabel.setText(f"Watching {directory}")
+        console.Log(f"Watching {directory} for Harvest CSVs")
+        CheckWatchedFolder()
+
+    # Wait for a burst of new files to settle before scanning
+    fileWatcher.directoryChanged.connect(lambda _: settleTimer.start())
+    settleTimer.timeout.connect(CheckWatchedFolder)
+    pollTimer.timeout.connect(CheckWatchedFolder)
+    watchBtn.clicked.connect(OnWatchClicked)
 
 def CreateVersionsLayout(layout: QVBoxLayout) -> None:
     """Create the layout for the Version Adder tab."""
@@ -215,32 +693,49 @@ def CreateVersionsLayout(layout: QVBoxLayout) -> None:
     SelectBox.setPlaceholderText("Search for a track")
 
     # --- Notion integration ---
-    tracksDatabase = "12bcc95908f4804b8486cb3c4272fa17"
-    notionData = ReadNotionDatabase(tracksDatabase)
-
-    # Build a list of (page_title, page_id) pairs for the dropdown
-    items = []
-    if notionData and "results" in notionData:
-        for page in notionData["results"]:
-            props = page.get("properties", {})
-            pageId = page.get("id", "")
-            trackTitleProp = props.get("TrackTitle", {})
-            if trackTitleProp.get("type") == "title":
-                titleItems = trackTitleProp.get("title", [])
-                if titleItems and "plain_text" in titleItems[0]:
-                    pageTitle = titleItems[0]["plain_text"]
-                elif titleItems:
-                    pageTitle = titleItems[0].get("text", {}).get("content", "")
-                else:
-                    pageTitle = "(No Title)"
-            else:
-                pageTitle = "(No Title)"
-            items.append((pageTitle, pageId))
-    else:
-        ShowError("Failed to load tracks from Notion. Please check your connection or database ID.")
-        return
-    
-    SelectBox.addItems(items)
+    # Show the tracks in the local mirror at once, then merge in the changes
+    # pulled from Notion on a background thread
+    trackStatus = CatalogStatus(TRACKS_DATABASE)
+    trackTitles = {}
+    # Album of every track and title of every album, so showing the album of
+    # the selected track is a lookup instead of two page reads
+    trackAlbums = {}
+    albumTitles = {}
+    mergeTimer = QTimer(SelectBox)
+    mergeTimer.setSingleShot(True)
+    # Re-indexing the dropdown is the slow part, so merge batches at most this often
+    mergeTimer.setInterval(500)
+
+    def ShowTracks() -> None:
+        items = sorted(((title, pageId) for pageId, title in trackTitles.items()), key=lambda item: item[0].lower())
+        SelectBox.addItems(items)
+        UpdateRelationField()
+
+    def AddTracks(pages: list) -> None:
+        for page in pages:
+            trackTitles[page["id"]] = GetPageTitle(page, "TrackTitle")
+            relation = page["properties"].get("Album", {}).get("relation", [])
+            trackAlbums[page["id"]] = relation[0]["id"] if relation else None
+
+    def OnTrackPages(pages: list) -> None:
+        AddTracks(pages)
+        trackStatus.Loading(len(pages))
+        if not mergeTimer.isActive():
+            mergeTimer.start()
+
+    def OnTracksSnapshot(pages: list) -> None:
+        AddTracks(pages)
+        ShowTracks()
+
+    def OnTracksLoaded(error) -> None:
+        mergeTimer.stop()
+        if trackStatus.updated:
+            ShowTracks()
+        trackStatus.Done(error)
+        if error:
+            console.Error(f"Could not refresh tracks from Notion, showing the local copy: {error}")
+
+    mergeTimer.timeout.connect(ShowTracks)
 
     # Create the upload button
     btn = QPushButton("Upload Mixouts")
@@ -262,6 +757,13 @@ def CreateVersionsLayout(layout: QVBoxLayout) -> None:
         textBoxes.append((tb, altSuffix))
     leftSideInputs.addStretch(1)
 
+    # Bulk upload: a CSV/TSV with track, alt suffix and mixout columns
+    bulkDrop = FileDropLabel("Drag a versions CSV/TSV here", ['.csv', '.tsv', '.txt'])
+    bulkDrop.setToolTip("Columns: Track (title or Unique Title Id), Alt, Mixout")
+    bulkBtn = QPushButton("Bulk Upload")
+    bulkBtn.setMinimumSize(150, 50)
+    bulkBtn.setStyleSheet("font-size: 18px; font-weight: bold; padding: 12px;")
+
     # Add a vertical spacer before the album layout
     spacer = QSpacerItem(20, 20, QSizePolicy.Policy.Minimum, QSizePolicy.Policy.Fixed)
 
@@ -279,26 +781,45 @@ def CreateVersionsLayout(layout: QVBoxLayout) -> None:
     albumLayout.addWidget(albumLabel)
     albumLayout.addWidget(albumDisplay, stretch=1)
 
+    albumResolver = AlbumResolver(albumDisplay)
+
     def UpdateRelationField() -> None:
-        if not SelectBox.currentData():
+        albumId = trackAlbums.get(SelectBox.currentData())
+        if not albumId:
             albumDisplay.setText("")
-            return
-        pageId = SelectBox.currentData()
-        pageProperties = ReadPageProperties(pageId)
-        albumId = pageProperties["Album"]["relation"][0]["id"]
-        albumProperties = ReadPageProperties(albumId)
-        albumName = albumProperties["Working Title"]["title"][0]["text"]["content"]
-        albumDisplay.setText(albumName)
-
+        elif albumId in albumTitles:
+            albumDisplay.setText(albumTitles[albumId])
+        else:
+            # Not loaded yet or outside the mirror: read it in the background
+            albumDisplay.setText("Loading...")
+            albumResolver.Resolve(albumId)
+
+    def OnAlbumResolved(albumId: str, title: str) -> None:
+        albumTitles[albumId] = title
+        # Only show it if that album's track is still the one selected
+        if trackAlbums.get(SelectBox.currentData()) == albumId:
+            albumDisplay.setText(title)
+
+    def OnAlbumPages(pages: list) -> None:
+        for page in pages:
+            albumTitles[page["id"]] = GetPageTitle(page, "Working Title")
+        if albumDisplay.text() == "Loading...":
+            UpdateRelationField()
+
+    albumResolver.resolved.connect(OnAlbumResolved)
     SelectBox.currentIndexChanged.connect(UpdateRelationField)
 
     # Main left layout (inputs + dropdown + button)
     leftLayout = QVBoxLayout()
     leftLayout.addWidget(SelectBox)
+    leftLayout.addWidget(trackStatus)
     leftLayout.addLayout(leftSideInputs)
     leftLayout.addWidget(btn)
     leftLayout.addItem(spacer)           # <-- Add vertical space before album layout
     leftLayout.addLayout(albumLayout)    # <-- Add the album label + display here
+    leftLayout.addItem(QSpacerItem(20, 20, QSizePolicy.Policy.Minimum, QSizePolicy.Policy.Fixed))
+    leftLayout.addWidget(bulkDrop)
+    leftLayout.addWidget(bulkBtn)
     leftLayout.addStretch(1)
 
     # Horizontal layout: left (inputs, dropdown, button) | right (console)
@@ -307,6 +828,8 @@ def CreateVersionsLayout(layout: QVBoxLayout) -> None:
     hLayout.addWidget(console, 2)
 
     layout.addLayout(hLayout)
+    LoadCatalog("tracks", TRACKS_DATABASE, OnTracksSnapshot, OnTrackPages, OnTracksLoaded)
+    LoadCatalog("versionAlbums", ALBUMS_DATABASE, OnAlbumPages, OnAlbumPages, lambda error: None)
 
     def OnUploadClicked() -> None:
         """Handle the upload button click event."""
@@ -315,83 +838,98 @@ def CreateVersionsLayout(layout: QVBoxLayout) -> None:
             if box.text() or box.text() != "":
                 versions.append((box.text(), suffix))
         selectedPageId = SelectBox.currentData()
-        if selectedPageId:
-            AddVersions(selectedPageId, SelectBox.currentText(), versions, console)
-        else:
+        if not selectedPageId:
             ShowError("Please select a track.")
-
-        console.Log(f"Uploaded versions for {SelectBox.currentText()}")
+            return
+        trackTitle = SelectBox.currentText()
+        jobs.Submit("versions", f"Add versions to {trackTitle}", AddVersions,
+                    (selectedPageId, trackTitle, versions, console), lambda job: OnUploaded(job, trackTitle))
         for box, suffix in textBoxes:
             box.clear()
 
+    def OnUploaded(job: Job, trackTitle: str) -> None:
+        if job.status == "Done":
+            console.Log(f"Uploaded versions for {trackTitle}")
+        elif job.status == "Failed":
+            console.Error(f"Could not upload versions for {trackTitle}: {job.error}")
+
     btn.clicked.connect(OnUploadClicked)
 
-def AddVersions(pageID: str, pageName: str, versions: list, console: Console) -> None:
-    """Add mixout versions to the Notion database for the selected track."""
-    versionDatabase = "200cc95908f480429e51d92a661a9102"
-    for mixout, alt in versions:
-        newProperties = {
-            "Name": {
-                "title": [
-                    {
-                        "text": {
-                            "content": f"{pageName}_{alt}"
-                        }
-                    }
-                ]
-            },
-            "Mixout": {
-                "rich_text": [
-                    {
-                        "text": {
-                            "content": mixout
-                        }
-                    }
-                ]
-            },
-            "Version": {
-                "select": {
-                    "name": alt
-                }
-            },
-            "Track Title": {
-                "relation": [
-                    {"id": pageID}
-                ]
-            }
-        }
-        CreateNotionPage(versionDatabase, newProperties)
-        console.Log(f"Uploaded versions {alt} for {pageName}: {mixout}")
+    def OnBulkUploadClicked() -> None:
+        """Upload every version listed in the dropped sheet as a background job."""
+        if not bulkDrop.dropped_file_path:
+            ShowError("No file selected.")
+            return
+        if jobs.Pending("bulk versions"):
+            ShowError("A bulk upload is already running.")
+            return
+        jobs.Submit("bulk versions", f"Upload versions from {os.path.basename(bulkDrop.dropped_file_path)}", AddVersionsBulk,
+                    (bulkDrop.dropped_file_path, console), OnBulkUploaded)
 
+    def OnBulkUploaded(job: Job) -> None:
+        if job.status == "Failed":
+            console.Error(f"Bulk upload failed: {job.error}")
+        elif job.status == "Cancelled":
+            console.Log("Bulk upload cancelled.")
+
+    bulkBtn.clicked.connect(OnBulkUploadClicked)
 
 def CreateImportLayout(layout: QVBoxLayout) -> None:
     albumList = QListWidget()
     albumList.setSelectionMode(QAbstractItemView.SelectionMode.MultiSelection)
 
-    DATABASE_ID = "4ce7b4cefa8d4478b197dd9e50e69421"
-    notionData = ReadNotionDatabase(DATABASE_ID)
-
-    if notionData and "results" in notionData:
-        for page in notionData["results"]:
-            props = page.get("properties", {})
-            trackTitleProp = props.get("Working Title", {})
-            if trackTitleProp.get("type") == "title":
-                titleItems = trackTitleProp.get("title", [])
-                if titleItems and "plain_text" in titleItems[0]:
-                    pageTitle = titleItems[0]["plain_text"]
-                elif titleItems:
-                    pageTitle = titleItems[0].get("text", {}).get("content", "")
-                else:
-                    pageTitle = "(No Title)"
+    # Show the albums in the local mirror at once, then merge in the changes
+    # pulled from Notion on a background thread
+    albumStatus = CatalogStatus(ALBUMS_DATABASE)
+    albumItems = {}
+    # Lowercase title of every row of albumList, in order, to find insert rows by bisection
+    albumKeys = []
+
+    def MergeAlbums(pages: list) -> None:
+        for page in pages:
+            title = GetPageTitle(page, "Working Title")
+            item = albumItems.get(page["id"])
+            if item is not None:
+                item.setText(title)
+                item.setData(Qt.ItemDataRole.UserRole, page)
+                if title.lower() == (item.data(Qt.ItemDataRole.UserRole + 1) or ""):
+                    continue
+                # Retitled: move it to its new place
+                row = albumList.row(item)
+                albumList.takeItem(row)
+                del albumKeys[row]
             else:
-                pageTitle = "(No Title)"
-            # Create QListWidgetItem and store pageId in UserRole
-            item = QListWidgetItem(pageTitle)
+                # Create QListWidgetItem and store the page in UserRole
+                item = QListWidgetItem(title)
+                item.setData(Qt.ItemDataRole.UserRole, page)
+                albumItems[page["id"]] = item
+            item.setData(Qt.ItemDataRole.UserRole + 1, title.lower())
+            row = bisect.bisect_right(albumKeys, title.lower())
+            albumKeys.insert(row, title.lower())
+            albumList.insertItem(row, item)
+
+    def OnAlbumsSnapshot(pages: list) -> None:
+        albumList.setUpdatesEnabled(False)
+        for page in sorted(pages, key=lambda page: GetPageTitle(page, "Working Title").lower()):
+            item = QListWidgetItem(GetPageTitle(page, "Working Title"))
             item.setData(Qt.ItemDataRole.UserRole, page)
+            item.setData(Qt.ItemDataRole.UserRole + 1, GetPageTitle(page, "Working Title").lower())
+            albumItems[page["id"]] = item
+            albumKeys.append(GetPageTitle(page, "Working Title").lower())
             albumList.addItem(item)
-    else:
-        ShowError("Failed to load tracks from Notion. Please check your connection or database ID.")
-        return
+        albumList.setUpdatesEnabled(True)
+
+    def OnAlbumPages(pages: list) -> None:
+        MergeAlbums(pages)
+        albumStatus.Loading(len(pages))
+
+    def OnAlbumsLoaded(error) -> None:
+        albumStatus.Done(error)
+        if error:
+            console.Error(f"Could not refresh albums from Notion, showing the local copy: {error}")
+
+    incrementalBox = QCheckBox("Only export changes since the last export")
+    incrementalBox.setToolTip("Writes albums_update.csv, tracks_update.csv, ... with rows added or changed since the last export to the chosen folder")
 
     btn = QPushButton("Process Albums")
     btn.setMinimumSize(150, 50)
@@ -401,11 +939,14 @@ def CreateImportLayout(layout: QVBoxLayout) -> None:
     leftLayout = QVBoxLayout()
     leftLayout.addWidget(QLabel("Select Albums to Export:"))
     leftLayout.addWidget(albumList)
+    leftLayout.addWidget(albumStatus)
+    leftLayout.addWidget(incrementalBox)
     leftLayout.addWidget(btn)
     leftLayout.addStretch(1)
     hLayout.addLayout(leftLayout, 1)
     hLayout.addWidget(console, 2)
     layout.addLayout(hLayout)
+    LoadCatalog("albums", ALBUMS_DATABASE, OnAlbumsSnapshot, OnAlbumPages, OnAlbumsLoaded)
 
     def OnButtonClicked():
         dirPath = QFileDialog.getExistingDirectory(None, "Select Output Directory")
@@ -417,168 +958,17 @@ def CreateImportLayout(layout: QVBoxLayout) -> None:
         if not dirPath:
             console.Log("Export cancelled by user.")
             return
+        # Exports to one folder share its staging files; ExportWriter would refuse the second
+        if any(os.path.samefile(job.args[0], dirPath) for job in jobs.Pending("export") if os.path.isdir(job.args[0])):
+            ShowError(f"An export to {dirPath} is already queued or running.")
+            return
         console.Log(f"Saving output to: {dirPath}")
-        thread = QThread()
-        worker = Worker(ProcessImport, dirPath, console, selectedAlbums)
-        worker.moveToThread(thread)
-        thread.started.connect(worker.run)
-        worker.finished.connect(thread.quit)
-        worker.finished.connect(worker.deleteLater)
-        thread.finished.connect(thread.deleteLater)
-        # Store references so they are not garbage collected
-        threads["import"] = (thread, worker)
-        thread.start()
+        # ProcessImport reports its own errors to the console
+        jobs.Submit("export", f"Export {len(selectedAlbums)} albums to {os.path.basename(dirPath) or dirPath}", ProcessImport,
+                    (dirPath, console, selectedAlbums, incrementalBox.isChecked()))
 
     btn.clicked.connect(OnButtonClicked)
 
-def ProcessImport(dirPath: str, console: Console, selectedAlums : list[tuple]) -> None:
-    """Gets data from Notion and exports it to CSV files."""
-
-    def GetListValue(properties, propertyName):
-        values = [v["name"] for v in properties[propertyName]["multi_select"]]
-        return "\n".join(values) if values else ""
-
-    DATABASE_ID = "4ce7b4cefa8d4478b197dd9e50e69421"
-    data = ReadNotionDatabase(DATABASE_ID)
-
-    albumsFile = open(os.path.join(dirPath, "albums.csv"), "w", newline='', encoding='utf-8')
-    tracksFile = open(os.path.join(dirPath, "tracks.csv"), "w", newline='', encoding='utf-8')
-    versionsFile = open(os.path.join(dirPath, "versions.csv"), "w", newline='', encoding='utf-8')
-    moodsFile = open(os.path.join(dirPath, "moods.csv"), "w", newline='', encoding='utf-8')
-    genresFile = open(os.path.join(dirPath, "genres.csv"), "w", newline='', encoding='utf-8')
-    miscFile = open(os.path.join(dirPath, "misc.csv"), "w", newline='', encoding='utf-8')
-    composersFile = open(os.path.join(dirPath, "composers.csv"), "w", newline='', encoding='utf-8')
-    contentProvidersFile = open(os.path.join(dirPath, "contentProviders.csv"), "w", newline='', encoding='utf-8')
-
-    albumWriter = csv.writer(albumsFile)
-    albumWriter.writerow(["AlbumTitle", "AlbumID", "UpdateID"])
-    trackWriter = csv.writer(tracksFile)
-    trackWriter.writerow([
-        "TrackTitle", "UniqueTitleID", "AlbumID", "Track Description",
-        "Key", "BPM",
-        "Composer 1", "Composer 2", "Content Provider 1", "Content Provider 2",
-        "InstGroup Rhythm", "InstGroup Bass", "InstGroup Guitar",
-        "InstGroup Keys", "InstGroup Strings", "InstGroup Woodwinds",
-        "InstGroup Brass", "InstGroup Misc"
-    ])
-    versionWriter = csv.writer(versionsFile)
-    versionWriter.writerow(["UniqueTitleID", "Mixout", "Version", "Duration"])
-    moodWriter = csv.writer(moodsFile)
-    moodWriter.writerow(["UniqueTitleID", "Moods"])
-    genreWriter = csv.writer(genresFile)
-    genreWriter.writerow(["UniqueTitleID", "TrackGenre"])
-    miscWriter = csv.writer(miscFile)
-    miscWriter.writerow(["UniqueTitleID", "Misc"])
-    composerWriter = csv.writer(composersFile)
-    composerWriter.writerow(["ComposerID", "UniqueTitleID"])
-    contentProviderWriter = csv.writer(contentProvidersFile)
-    contentProviderWriter.writerow(["CPID", "UniqueTitleID"])
-
-    for name, albumData in selectedAlums:
-        albumProperties = albumData["properties"]
-        albumInfo = [
-            name,
-            albumProperties["AlbumID"]["rich_text"][0]["plain_text"] if albumProperties["AlbumID"]["rich_text"] else "",
-            albumProperties["Release"]["rich_text"][0]["plain_text"] if albumProperties["Release"]["rich_text"] else ""
-        ]
-        albumWriter.writerow(albumInfo)
-        console.Log(f"Processing album: {albumInfo[0]}")
-
-        for track in albumProperties["Track Submission Form"]["relation"]:
-            trackProperties = ReadPageProperties(track["id"])
-            trackId = trackProperties["Unique Title Id"]["unique_id"]["prefix"] + str(trackProperties["Unique Title Id"]["unique_id"]["number"])
-
-            if len(trackProperties["Content Provider 1"]["relation"]) > 0:
-                contentProviderWriter.writerow([ReadPageProperties(trackProperties["Content Provider 1"]["relation"][0]["id"])["CPID"]["rich_text"][0]["plain_text"], trackId])
-            if len(trackProperties["Content Provider 2"]["relation"]) > 0:
-                contentProviderWriter.writerow([ReadPageProperties(trackProperties["Content Provider 2"]["relation"][0]["id"])["CPID"]["rich_text"][0]["plain_text"], trackId])
-            if len(trackProperties["Composer 1"]["relation"]) > 0:
-                composerPage = ReadPageProperties(trackProperties["Composer 1"]["relation"][0]["id"])
-                if(len(composerPage["ComposerID"]["rich_text"]) <= 0):
-                    console.Error(f"Composer 1 ID not found for track: {trackProperties['TrackTitle']['title'][0]['text']['content']}")
-                else:
-                    composerWriter.writerow([composerPage["ComposerID"]["rich_text"][0]["plain_text"], trackId])
-            if len(trackProperties["Composer 2"]["relation"]) > 0:
-                composerPage = ReadPageProperties(trackProperties["Composer 2"]["relation"][0]["id"])
-                if(len(composerPage["ComposerID"]["rich_text"]) <= 0):
-                    console.Error(f"Composer 2 ID not found for track: {trackProperties['TrackTitle']['title'][0]['text']['content']}")
-                else:
-                    composerWriter.writerow([composerPage["ComposerID"]["rich_text"][0]["plain_text"], trackId])
-
-            track_info = [
-                trackProperties["TrackTitle"]["title"][0]["text"]["content"],
-                trackId,
-                albumInfo[1],
-                trackProperties["Track Description"]["rich_text"][0]["plain_text"] if trackProperties["Track Description"]["rich_text"] else "",
-                trackProperties["key"]["rich_text"][0]["plain_text"] if trackProperties["key"]["rich_text"] else "",
-                trackProperties["Tempo"]["rich_text"][0]["plain_text"] if trackProperties["Tempo"]["rich_text"] else "",
-                GetListValue(trackProperties, "InstGroup Rhythm"),
-                GetListValue(trackProperties, "InstGroup Bass"),
-                GetListValue(trackProperties, "InstGroup Guitar"),
-                GetListValue(trackProperties, "InstGroup Keys"),
-                GetListValue(trackProperties, "InstGroup Strings"),
-                GetListValue(trackProperties, "InstGroup Woodwinds"),
-                GetListValue(trackProperties, "InstGroup Brass"),
-                GetListValue(trackProperties, "InstGroup Misc"),
-            ]
-
-            moodWriter.writerow([track_info[1], GetListValue(trackProperties, "Moods")])
-            genreWriter.writerow([track_info[1], GetListValue(trackProperties, "TrackGenre")])
-            miscWriter.writerow([track_info[1], GetListValue(trackProperties, "Misc")])
-
-            trackWriter.writerow(track_info)
-            trackLength = trackProperties["Track Duration"]["rich_text"][0]["plain_text"] if trackProperties["Track Duration"]["rich_text"] else ""
-
-            console.Log(f"Processing track: {track_info[0]}")
-            full = [
-                track_info[1],
-                "Main Mix",
-                "Full",
-                trackLength
-            ]
-            sec60 = [
-                track_info[1],
-                "60 Sec Edit",
-                "60",
-                "1:00"
-            ]
-            sec30 = [
-                track_info[1],
-                "30 Sec Edit",
-                "30",
-                "0:30"
-            ]
-            short = [
-                track_info[1],
-                "Bumper Edit",
-                "Short",
-                "0:15"
-            ]
-            versionWriter.writerow(full)
-            versionWriter.writerow(sec60)
-            versionWriter.writerow(sec30)
-            versionWriter.writerow(short)
-            for version in trackProperties["Song Versions"]["relation"]:
-                version_properties = ReadPageProperties(version["id"])
-                version_info = [
-                    track_info[1],
-                    version_properties["Mixout"]["rich_text"][0]["plain_text"] if version_properties["Mixout"]["rich_text"] else "",
-                    version_properties["Version"]["select"]["name"],
-                    trackLength
-                ]
-                versionWriter.writerow(version_info)
-                console.Log(f"Processing version: {version_info[2]} for track: {track_info[0]}")
-    albumsFile.close()
-    tracksFile.close()
-    versionsFile.close()
-    moodsFile.close()
-    genresFile.close()
-    miscFile.close()
-    composersFile.close()
-    contentProvidersFile.close()
-    console.Log("Done!")
-
-
 def ShowError(message: str, parent=None) -> None:
     """Show an error message box with the given message."""
     msg = QMessageBox(parent)
@@ -638,7 +1028,7 @@ def CreateLauncherButton(text: str, gridLayout: QGridLayout, row: int, col: int,
     return btn
 
 
-if __name__ == "__main__":
+def main() -> int:
     """Main entry point for the FNB Helper application."""
     app = QApplication(sys.argv)
     window = QWidget()
@@ -648,6 +1038,9 @@ if __name__ == "__main__":
     layout = QVBoxLayout()
     global tabs
     tabs = QTabWidget()
+    global jobs
+    jobs = JobManager(MAX_JOBS, JOB_LIMITS, app)
+    app.aboutToQuit.connect(jobs.Shutdown)
     tab1, tab1Layout = AddNewTab("Launcher")
 
     gridLayout = QGridLayout()
@@ -657,11 +1050,20 @@ if __name__ == "__main__":
     btn3 = CreateLauncherButton("Filemaker Importer", gridLayout, 0, 2, lambda: AddNewTab("Filemaker Importer", CreateImportLayout))
 
     tab1Layout.addLayout(gridLayout)
+    tab1Layout.addWidget(JobsPanel(jobs))
+    # Messages from background work that no tab started, e.g. the catalog sync
+    appConsole = Console()
+    tab1Layout.addWidget(appConsole)
 
     layout.addWidget(tabs)
     window.setLayout(layout)
     window.show()
 
     CheckForUpdates(window)
+    replica.StartBackgroundSync(lambda: CatalogDatabases(appConsole), onError=appConsole.Error)
+
+    return app.exec()
 
-    sys.exit(app.exec())
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,197 @@
+from AppPaths import DataPath
+from collections import deque
+from datetime import datetime
+import threading
+import json
+import time
+import os
+import re
+
+# Page, database and block ids in request paths, replaced to group requests by endpoint
+ID_PATTERN = re.compile(r"[0-9a-f]{8}-?[0-9a-f]{4}-?[0-9a-f]{4}-?[0-9a-f]{4}-?[0-9a-f]{12}", re.IGNORECASE)
+
+def Endpoint(method: str, path: str) -> str:
+    """Request name without ids, e.g. GET pages/{id}, to group requests by."""
+    return f"{method} {ID_PATTERN.sub('{id}', path.split('?')[0].strip('/'))}"
+
+def Percentile(values: list, fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+class Metrics:
+    """
+    Thread-safe record of Notion requests and timed phases (spans).
+    Every record is numbered, so a run takes a Mark() when it starts and
+    summarizes or traces only what happened after it, even while other
+    work records in parallel. The newest max_records of each kind are kept.
+    """
+
+    def __init__(self, max_records: int = 200000):
+        self.requests = deque(maxlen=max_records)
+        self.spans = deque(maxlen=max_records)
+        self.sequence = 0
+        self.lock = threading.Lock()
+        # time.perf_counter() at this wall-clock time, to put timestamps in traces
+        self.origin = (time.perf_counter(), time.time())
+
+    def Mark(self) -> int:
+        """Sequence number to pass to Summary/WriteTrace to cover only what happens from now on."""
+        with self.lock:
+            return self.sequence
+
+    def Add(self, records: deque, record: dict) -> None:
+        with self.lock:
+            self.sequence += 1
+            record["seq"] = self.sequence
+            record["thread"] = threading.get_ident()
+            records.append(record)
+
+    def RecordRequest(self, method: str, path: str, status, start: float, latency: float,
+                      sent: int, received: int, retries: int, rateLimited: int, blocked: float) -> None:
+        """
+        One logical request. start: perf_counter at the first attempt.
+        latency: seconds spent in HTTP round trips, all attempts included.
+        blocked: seconds spent waiting on the rate limiter and retry backoff.
+        """
+        self.Add(self.requests, {
+            "endpoint": Endpoint(method, path), "status": status, "start": start, "latency": latency,
+            "sent": sent, "received": received, "retries": retries, "rateLimited": rateLimited, "blocked": blocked,
+        })
+
+    def Span(self, name: str, **args):
+        """Context manager timing a phase: with metrics.Span("album", title=...): ..."""
+        return Span(self, name, args)
+
+    def Since(self, records: deque, mark: int) -> list:
+        with self.lock:
+            return [record for record in records if record["seq"] > mark]
+
+    def Summary(self, mark: int = 0, cacheStats: dict = None) -> dict:
+        """cacheStats: {name: CacheDelta(...)} of the caches the run used."""
+        requests = self.Since(self.requests, mark)
+        spans = self.Since(self.spans, mark)
+        starts = [r["start"] for r in requests] + [s["start"] for s in spans]
+        ends = [r["start"] + r["latency"] + r["blocked"] for r in requests] + [s["start"] + s["duration"] for s in spans]
+        elapsed = max(ends) - min(starts) if starts else 0.0
+        latencies = [r["latency"] for r in requests]
+        endpoints = {}
+        for r in requests:
+            stats = endpoints.setdefault(r["endpoint"], {"requests": 0, "latency": 0.0, "errors": 0})
+            stats["requests"] += 1
+            stats["latency"] += r["latency"]
+            stats["errors"] += r["status"] != 200
+        phases = {}
+        for s in spans:
+            stats = phases.setdefault(s["name"], {"count": 0, "seconds": 0.0})
+            stats["count"] += 1
+            stats["seconds"] += s["duration"]
+        summary = {
+            "elapsed": elapsed,
+            "requests": len(requests),
+            "requestsPerSecond": len(requests) / elapsed if elapsed else 0.0,
+            "p50": Percentile(latencies, 0.5),
+            "p95": Percentile(latencies, 0.95),
+            "retries": sum(r["retries"] for r in requests),
+            "rateLimited": sum(r["rateLimited"] for r in requests),
+            "blockedSeconds": sum(r["blocked"] for r in requests),
+            "bytesSent": sum(r["sent"] for r in requests),
+            "bytesReceived": sum(r["received"] for r in requests),
+            "errors": sum(r["status"] != 200 for r in requests),
+            "endpoints": endpoints,
+            "phases": phases,
+        }
+        if cacheStats is not None:
+            summary["cache"] = cacheStats
+        return summary
+
+    def SummaryLines(self, summary: dict) -> list:
+        """The summary as console lines."""
+        lines = [
+            f"{summary['requests']} Notion requests in {summary['elapsed']:.1f}s ({summary['requestsPerSecond']:.1f}/s), "
+            f"latency p50 {summary['p50'] * 1000:.0f} ms, p95 {summary['p95'] * 1000:.0f} ms",
+            f"Rate limited {summary['rateLimited']} times, {summary['retries']} retries, "
+            f"{summary['blockedSeconds']:.1f}s waiting on the rate limit, {summary['errors']} failed, "
+            f"{summary['bytesReceived'] / 1024:.0f} KB received",
+        ]
+        for name, stats in summary.get("cache", {}).items():
+            if stats["hits"] + stats["misses"]:
+                lines.append(f"{name} hit rate {stats['hit_rate']:.0%} ({stats['hits']} hits, {stats['misses']} misses)")
+        for name, stats in summary["phases"].items():
+            lines.append(f"  {name}: {stats['count']} x, {stats['seconds']:.2f}s")
+        return lines
+
+    def WriteTrace(self, path: str, mark: int = 0, summary: dict = None) -> None:
+        """
+        Write the requests and spans since mark as a Chrome trace (open it in
+        chrome://tracing or Perfetto), with the summary under "otherData".
+        """
+        startPerf, startWall = self.origin
+        events = []
+        for r in self.Since(self.requests, mark):
+            events.append({
+                "name": r["endpoint"], "cat": "request", "ph": "X", "pid": 1, "tid": r["thread"],
+                "ts": (startWall + r["start"] - startPerf) * 1e6, "dur": (r["latency"] + r["blocked"]) * 1e6,
+                "args": {key: r[key] for key in ("status", "latency", "sent", "received", "retries", "rateLimited", "blocked")},
+            })
+        for s in self.Since(self.spans, mark):
+            events.append({
+                "name": s["name"], "cat": "phase", "ph": "X", "pid": 1, "tid": s["thread"],
+                "ts": (startWall + s["start"] - startPerf) * 1e6, "dur": s["duration"] * 1e6, "args": s["args"],
+            })
+        events.sort(key=lambda event: event["ts"])
+        tmpPath = path + ".tmp"
+        with open(tmpPath, "w", encoding='utf-8') as traceFile:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms", "otherData": summary or self.Summary(mark)}, traceFile)
+        os.replace(tmpPath, path)
+
+    def Report(self, name: str, mark: int, console, cacheStats: dict = None) -> str:
+        """Log the summary of a run and write its trace to the data directory. Returns the trace path."""
+        summary = self.Summary(mark, cacheStats)
+        for line in self.SummaryLines(summary):
+            console.Log(line)
+        path = DataPath("traces", f"{name}-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+        try:
+            os.makedirs(DataPath("traces"), exist_ok=True)
+            self.WriteTrace(path, mark, summary)
+            console.Log(f"Trace written to {path}")
+        except OSError as e:
+            console.Error(f"Could not write the trace: {e}")
+        return path
+
+class Span:
+    """
+    A timed phase, recorded when it ends. Use it as a context manager, or
+    call Start() and End() where a with block does not fit.
+    """
+
+    def __init__(self, metrics: Metrics, name: str, args: dict):
+        self.metrics = metrics
+        self.name = name
+        self.args = args
+
+    def Start(self):
+        self.start = time.perf_counter()
+        return self
+
+    def End(self, failed: bool = False) -> None:
+        self.metrics.Add(self.metrics.spans, {
+            "name": self.name, "start": self.start, "duration": time.perf_counter() - self.start,
+            "args": dict(self.args, failed=True) if failed else self.args,
+        })
+
+    def __enter__(self):
+        return self.Start()
+
+    def __exit__(self, excType, excValue, traceback) -> None:
+        self.End(failed=excType is not None)
+
+def CacheDelta(before: dict, after: dict) -> dict:
+    """Hits and misses between two Stats() of a cache, with the hit rate."""
+    hits = after["hits"] - before["hits"] + after.get("coalesced", 0) - before.get("coalesced", 0)
+    misses = after["misses"] - before["misses"]
+    return {"hits": hits, "misses": misses, "hit_rate": hits / (hits + misses) if hits + misses else 0.0}
+
+# Shared by the Notion client and the processing code
+metrics = Metrics()
@@ -1,5 +1,15 @@
 import requests
+from requests.adapters import HTTPAdapter
+from Metrics import metrics
+from Jobs import CheckCancelled, currentJob
 from dotenv import load_dotenv
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+from contextlib import contextmanager
+import contextvars
+import threading
+import asyncio
+import time
 import os
 
 load_dotenv()
@@ -8,42 +18,644 @@ notionToken = os.getenv("NOTION_API_KEY")
 if notionToken is None:
     raise ValueError("Notion API key not found. Please get the .env file provided")
 
-
+NOTION_API_URL = os.getenv("NOTION_API_URL", "https://api.notion.com/v1")
+NOTION_VERSION = "2022-06-28"
 
 headers = {
     "Authorization": f"Bearer {notionToken}",
-    "Notion-Version": "2022-06-28",
+    "Notion-Version": NOTION_VERSION,
     "Content-Type": "application/json"
 }
 
-def CreateNotionPage(database_id, properties):
-    url = "https://api.notion.com/v1/pages"
-    headers = {
-        "Authorization": f"Bearer {notionToken}",
-        "Notion-Version": "2022-06-28",
-        "Content-Type": "application/json"
-    }
-    payload = {
-        "parent": {"database_id": database_id},
-        "properties": properties
-    }
-    response = requests.post(url, headers=headers, json=payload)
-    if response.status_code == 200:
+class NotionError(Exception):
+    """Raised when the Notion API answers with a non-200 response."""
+
+    def __init__(self, message: str, status_code: int = None, body: str = ""):
+        super().__init__(f"{message}: {body}" if body else message)
+        self.status_code = status_code
+        self.body = body
+
+class TokenBucket:
+    """Thread-safe token bucket used to stay under Notion's request rate limit."""
+
+    def __init__(self, rate: float, capacity: float = None):
+        """rate: tokens added per second. capacity: burst size (defaults to rate)."""
+        self.rate = rate
+        self.capacity = capacity if capacity else rate
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def Acquire(self) -> float:
+        """Block until a token is available. Returns the number of seconds spent waiting."""
+        waited = 0.0
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+    def TryAcquire(self) -> float:
+        """Take a token if one is available. Returns 0 if it was taken, else the seconds until one is."""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            return (1 - self.tokens) / self.rate
+
+# Request priorities, highest first: GUI lookups go before exports and uploads
+INTERACTIVE = 0
+BULK = 1
+# Priority of the Notion requests made in the current thread or task
+requestPriority = contextvars.ContextVar("requestPriority", default=INTERACTIVE)
+
+@contextmanager
+def Priority(priority: int):
+    """
+    Send the Notion requests made inside in the given lane. Works as a
+    context manager (with Priority(BULK): ...) or as a function decorator.
+    New threads start INTERACTIVE unless they are given a copy of the context.
+    """
+    token = requestPriority.set(priority)
+    try:
+        yield
+    finally:
+        requestPriority.reset(token)
+
+class RequestScheduler:
+    """
+    Admits Notion requests in priority order: a waiting INTERACTIVE request
+    always goes before any BULK one. A request is admitted when the token
+    bucket has a token and fewer than limit requests are in flight.
+    The limit adapts AIMD-style: it grows by about one for every limit
+    successful responses and halves on a 429, once per round of requests
+    admitted before the cut, so bulk work runs as wide as Notion allows.
+    Threads wait in Acquire, coroutines in AcquireAsync; both call Release
+    with the response status when the request is done.
+    """
+
+    def __init__(self, bucket: TokenBucket, limit: int = 4, min_limit: int = 1, max_limit: int = 32):
+        self.bucket = bucket
+        self.limit = float(limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.inFlight = 0
+        # Waiting requests per priority, highest first, as [waiter, job, admitted]:
+        # the waiter is a Future, concurrent for threads or asyncio for coroutines
+        self.lanes = {INTERACTIVE: deque(), BULK: deque()}
+        self.lock = threading.Lock()
+        self.lastDecrease = 0.0
+        # Admits the next request once the token bucket refills
+        self.timer = None
+
+    def Enqueue(self, waiter, priority: int = None) -> tuple:
+        """Queue a waiter with the current job in its lane and admit what can be. Returns (lane, entry)."""
+        job = currentJob.get()
+        entry = [waiter, job, None]
+        with self.lock:
+            lane = self.lanes[requestPriority.get() if priority is None else priority]
+            lane.append(entry)
+            # Cancelling the job drops its waiting requests at once
+            if job is not None and self.Wake not in job.onCancel:
+                job.onCancel.append(self.Wake)
+            self.Dispatch()
+        return lane, entry
+
+    def Acquire(self, priority: int = None) -> float:
+        """
+        Block until a request may be sent, with the current priority unless
+        one is given. Returns the number of seconds spent waiting.
+        Raises JobCancelled if the current job is cancelled while it waits.
+        """
+        start = time.monotonic()
+        waiter = Future()
+        self.Enqueue(waiter, priority)
+        if not waiter.result():
+            CheckCancelled()
+        return time.monotonic() - start
+
+    async def AcquireAsync(self, priority: int = None) -> float:
+        """Acquire for coroutines: wait without blocking the event loop."""
+        start = time.monotonic()
+        waiter = asyncio.get_running_loop().create_future()
+        lane, entry = self.Enqueue(waiter, priority)
+        try:
+            admitted = await waiter
+        except asyncio.CancelledError:
+            with self.lock:
+                if entry in lane:
+                    lane.remove(entry)
+                elif entry[2]:
+                    # Admitted as it was cancelled: give the slot back
+                    self.inFlight -= 1
+                    self.Dispatch()
+            raise
+        if not admitted:
+            CheckCancelled()
+        return time.monotonic() - start
+
+    def Release(self, admitted: float, status: int = None) -> None:
+        """
+        Free the slot of a request admitted at admitted (time.monotonic()).
+        status: the response's status, or None if there was no response.
+        A 429 halves the limit unless it was already cut after the request
+        was admitted; only a successful (2xx) response grows it, so other
+        client errors such as 400 or 404 leave the limit unchanged.
+        """
+        with self.lock:
+            self.inFlight -= 1
+            if status == 429:
+                if admitted > self.lastDecrease:
+                    self.limit = max(self.min_limit, self.limit / 2)
+                    self.lastDecrease = time.monotonic()
+            elif status is not None and 200 <= status < 300:
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            self.Dispatch()
+
+    def Dispatch(self) -> None:
+        """
+        Turn away the waiting requests of cancelled jobs, then admit waiting
+        requests, highest priority first, while slots and tokens last.
+        Call with the lock held.
+        """
+        for lane in self.lanes.values():
+            for entry in [entry for entry in lane if entry[1] is not None and entry[1].cancelEvent.is_set()]:
+                lane.remove(entry)
+                self.Resolve(entry, False)
+        while self.inFlight < int(self.limit):
+            lane = next((lane for lane in self.lanes.values() if lane), None)
+            if lane is None:
+                return
+            delay = self.bucket.TryAcquire()
+            if delay:
+                if self.timer is None:
+                    self.timer = threading.Timer(delay, self.OnTimer)
+                    self.timer.daemon = True
+                    self.timer.start()
+                return
+            self.inFlight += 1
+            self.Resolve(lane.popleft(), True)
+
+    @staticmethod
+    def Resolve(entry: list, admitted: bool) -> None:
+        entry[2] = admitted
+        waiter = entry[0]
+        if isinstance(waiter, Future):
+            waiter.set_result(admitted)
+        else:
+            waiter.get_loop().call_soon_threadsafe(RequestScheduler.Admit, waiter, admitted)
+
+    @staticmethod
+    def Admit(waiter: asyncio.Future, admitted: bool) -> None:
+        if not waiter.done():
+            waiter.set_result(admitted)
+
+    def Wake(self) -> None:
+        with self.lock:
+            self.Dispatch()
+
+    def OnTimer(self) -> None:
+        with self.lock:
+            self.timer = None
+            self.Dispatch()
+
+    def Stats(self) -> dict:
+        """Return the current concurrency limit, requests in flight and requests waiting per lane."""
+        with self.lock:
+            return {
+                "limit": self.limit,
+                "inFlight": self.inFlight,
+                "waiting": {priority: len(lane) for priority, lane in self.lanes.items()},
+            }
+
+class PageCache:
+    """
+    LRU/TTL cache of page objects keyed by page id, and by the properties
+    kept for pages read with a projection (filter_properties).
+    An entry is only served while it is younger than ttl seconds and, when the
+    caller knows the page's last_edited_time, only if it matches that time.
+    A full page also serves any projection of it.
+    Concurrent misses for the same key share a single in-flight fetch.
+    """
+
+    def __init__(self, max_entries: int = 5000, ttl: float = 300):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.inflight = {}
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    @staticmethod
+    def Key(page_id: str, filter_properties: list = None):
+        return (page_id, tuple(sorted(filter_properties))) if filter_properties else page_id
+
+    def Get(self, page_id: str, fetch, last_edited_time: str = None, filter_properties: list = None) -> dict:
+        """
+        Return the cached page, or call fetch(page_id) once and cache its result.
+        filter_properties: ids of the only properties the caller needs, passed
+        on to fetch as fetch(page_id, filter_properties).
+        """
+        key = self.Key(page_id, filter_properties)
+        with self.lock:
+            for candidate in dict.fromkeys((page_id, key)):
+                entry = self.entries.get(candidate)
+                if entry and self.IsValid(entry, last_edited_time):
+                    self.hits += 1
+                    self.entries.move_to_end(candidate)
+                    return entry[0]
+            future = self.inflight.get(key)
+            owner = future is None
+            if owner:
+                self.misses += 1
+                future = self.inflight[key] = Future()
+            else:
+                self.coalesced += 1
+        if not owner:
+            return future.result()
+        try:
+            page = fetch(page_id, filter_properties) if filter_properties else fetch(page_id)
+            self.Put(page, filter_properties)
+            future.set_result(page)
+            return page
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self.lock:
+                self.inflight.pop(key, None)
+
+    def IsValid(self, entry: tuple, last_edited_time: str = None) -> bool:
+        page, storedAt = entry
+        if time.monotonic() - storedAt > self.ttl:
+            return False
+        return last_edited_time is None or page.get("last_edited_time") == last_edited_time
+
+    def Put(self, page: dict, filter_properties: list = None) -> None:
+        """Store a page, or the projection of it read with filter_properties, unless a newer edit of it is already cached."""
+        page_id = page.get("id")
+        if not page_id:
+            return
+        key = self.Key(page_id, filter_properties)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry and entry[0].get("last_edited_time", "") > page.get("last_edited_time", ""):
+                return
+            self.entries[key] = (page, time.monotonic())
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def Invalidate(self, page_id: str) -> None:
+        """Drop a page and every projection of it."""
+        with self.lock:
+            for key in [key for key in self.entries if key == page_id or (isinstance(key, tuple) and key[0] == page_id)]:
+                del self.entries[key]
+
+    def Clear(self) -> None:
+        with self.lock:
+            self.entries.clear()
+
+    def Stats(self) -> dict:
+        """Return hit/miss counters and the current size."""
+        with self.lock:
+            lookups = self.hits + self.misses + self.coalesced
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "entries": len(self.entries),
+                "hit_rate": (self.hits + self.coalesced) / lookups if lookups else 0.0
+            }
+
+class RequestAttempts:
+    """
+    Bookkeeping of one request across its attempts, shared by NotionClient
+    and AsyncNotionClient: the scheduler slot of each attempt, whether and
+    when to retry, and the Metrics record.
+    """
+
+    def __init__(self, client):
+        """client: the NotionClient or AsyncNotionClient sending the request."""
+        self.client = client
+        self.attempt = 0
+        self.rateLimited = 0
+        self.latency = 0.0
+        self.blocked = 0.0
+        self.start = time.perf_counter()
+        self.status = None
+        self.response = None
+        self.admitted = None
+        self.sent = None
+
+    def Admitted(self, blocked: float) -> None:
+        """Call once the scheduler admitted an attempt, with the seconds it waited."""
+        self.blocked += blocked
+        self.admitted = time.monotonic()
+        self.sent = time.perf_counter()
+
+    def Failed(self):
+        """The attempt got no response. Returns the seconds to wait before retrying, or None to give up."""
+        self.latency += time.perf_counter() - self.sent
+        self.client.scheduler.Release(self.admitted)
+        return self.Retry()
+
+    def Aborted(self) -> None:
+        """The attempt was interrupted, e.g. by a cancellation."""
+        self.client.scheduler.Release(self.admitted)
+
+    def Received(self, response):
+        """The attempt got a response. Returns the seconds to wait before retrying, or None to return it."""
+        self.latency += time.perf_counter() - self.sent
+        self.response = response
+        self.status = response.status_code
+        self.client.scheduler.Release(self.admitted, self.status)
+        if self.status == 429:
+            self.rateLimited += 1
+        if self.status not in self.client.RETRY_STATUSES:
+            return None
+        return self.Retry(response.headers.get("Retry-After"))
+
+    def Retry(self, retryAfter: str = None):
+        if self.attempt >= self.client.max_retries:
+            return None
+        delay = NotionClient.Backoff(self.attempt, retryAfter)
+        self.blocked += delay
+        self.attempt += 1
+        return delay
+
+    def Record(self, method: str, path: str, requestBytes: int) -> None:
+        metrics.RecordRequest(
+            method, path, self.status, self.start, self.latency, requestBytes,
+            len(self.response.content) if self.response is not None else 0,
+            self.attempt, self.rateLimited, self.blocked
+        )
+
+class NotionClient:
+    """
+    Notion API client sharing one keep-alive session across all calls.
+    Every request is admitted by a RequestScheduler, which paces it with a
+    token bucket and puts interactive requests ahead of bulk ones, and is
+    retried with backoff on 429/502/503, honouring Retry-After when Notion
+    sends it.
+    """
+
+    RETRY_STATUSES = (429, 502, 503)
+
+    def __init__(self, token: str, base_url: str = NOTION_API_URL, timeout: tuple = (5, 30),
+                 requests_per_second: float = 3, max_retries: int = 5, pool_size: int = 16):
+        """
+        timeout: (connect, read) seconds passed to every request.
+        requests_per_second: sustained request rate; Notion allows an average of 3.
+        max_retries: attempts made after the first one for retryable responses.
+        """
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.scheduler = RequestScheduler(TokenBucket(requests_per_second))
+        self.session = requests.Session()
+        self.session.headers.update({
+            "Authorization": f"Bearer {token}",
+            "Notion-Version": NOTION_VERSION,
+            "Content-Type": "application/json"
+        })
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    @property
+    def bucket(self) -> TokenBucket:
+        """The token bucket pacing every request, shared with AsyncNotionClient."""
+        return self.scheduler.bucket
+
+    @bucket.setter
+    def bucket(self, bucket: TokenBucket) -> None:
+        self.scheduler.bucket = bucket
+
+    def Request(self, method: str, path: str, **kwargs) -> requests.Response:
+        """
+        Send a request, retrying rate-limited and transient failures. Returns the final response.
+        Every call is recorded in Metrics: endpoint, status, latency, bytes,
+        retries, 429s and time spent waiting on the rate limit.
+        Raises JobCancelled before any attempt if the current job was cancelled.
+        """
+        url = f"{self.base_url}/{path.lstrip('/')}"
+        kwargs.setdefault("timeout", self.timeout)
+        attempts = RequestAttempts(self)
+        try:
+            while True:
+                CheckCancelled()
+                attempts.Admitted(self.scheduler.Acquire())
+                try:
+                    response = self.session.request(method, url, **kwargs)
+                except (requests.ConnectionError, requests.Timeout):
+                    delay = attempts.Failed()
+                    if delay is None:
+                        raise
+                    time.sleep(delay)
+                    continue
+                except BaseException:
+                    attempts.Aborted()
+                    raise
+                delay = attempts.Received(response)
+                if delay is None:
+                    return response
+                time.sleep(delay)
+        finally:
+            attempts.Record(method, path, len(attempts.response.request.body or b"") if attempts.response is not None else 0)
+
+    @staticmethod
+    def Backoff(attempt: int, retryAfter: str = None) -> float:
+        """Seconds to wait before the next attempt: Retry-After if given, else exponential."""
+        if retryAfter:
+            try:
+                return max(float(retryAfter), 0)
+            except ValueError:
+                pass
+        return min(0.5 * (2 ** attempt), 30)
+
+    def CreatePage(self, database_id: str, properties: dict) -> dict:
+        """Create a page in a database. Raises NotionError on failure."""
+        payload = {
+            "parent": {"database_id": database_id},
+            "properties": properties
+        }
+        response = self.Request("POST", "pages", json=payload)
+        if response.status_code != 200:
+            raise NotionError("Failed to create page", response.status_code, response.text)
         return response.json()
-    else:
-        print("Failed to create page:", response.text)
-        return None
-    
-def ReadNotionDatabase(database_id):
-    url = f"https://api.notion.com/v1/databases/{database_id}/query"
-    response = requests.post(url, headers=headers)
-    if response.status_code == 200:
+
+    @staticmethod
+    def Projection(filter_properties: list = None) -> dict:
+        """Query string limiting a page or query response to the given property ids."""
+        return {"filter_properties": list(filter_properties)} if filter_properties else None
+
+    def QueryDatabase(self, database_id: str, filter: dict = None, sorts: list = None, page_size: int = 100,
+                      filter_properties: list = None):
+        """
+        Query a database and yield its results one response page at a time.
+        Follows has_more/next_cursor until the whole result set has been read.
+        filter_properties: ids of the only properties to return for each page.
+        Raises NotionError if any page of the query fails.
+        """
+        payload = {"page_size": min(max(page_size, 1), 100)}
+        if filter:
+            payload["filter"] = filter
+        if sorts:
+            payload["sorts"] = sorts
+        while True:
+            response = self.Request("POST", f"databases/{database_id}/query", json=payload,
+                                    params=self.Projection(filter_properties))
+            if response.status_code != 200:
+                raise NotionError("Failed to read database", response.status_code, response.text)
+            data = response.json()
+            yield data.get("results", [])
+            if not data.get("has_more") or not data.get("next_cursor"):
+                return
+            payload["start_cursor"] = data["next_cursor"]
+
+    def ReadDatabase(self, database_id: str) -> dict:
+        """Read a database object, including its property schema. Raises NotionError on failure."""
+        response = self.Request("GET", f"databases/{database_id}")
+        if response.status_code != 200:
+            raise NotionError("Failed to read database", response.status_code, response.text)
         return response.json()
-    else:
-        print("Failed to read database:", response.text)
+
+    def ReadPage(self, page_id: str, filter_properties: list = None) -> dict:
+        """Read a page object, only with the given property ids if any. Raises NotionError on failure."""
+        response = self.Request("GET", f"pages/{page_id}", params=self.Projection(filter_properties))
+        if response.status_code != 200:
+            raise NotionError("Failed to read page", response.status_code, response.text)
+        return response.json()
+
+    def ReadPropertyItems(self, page_id: str, property_id: str) -> list:
+        """
+        Read every item of a page property through the paginated property
+        item endpoint, e.g. the related pages of a relation as
+        [{"object": "property_item", "type": "relation", "relation": {"id": ...}}].
+        Raises NotionError on failure.
+        """
+        items = []
+        params = {"page_size": 100}
+        while True:
+            response = self.Request("GET", f"pages/{page_id}/properties/{property_id}", params=params)
+            if response.status_code != 200:
+                raise NotionError("Failed to read page property", response.status_code, response.text)
+            data = response.json()
+            if data.get("object") != "list":
+                # Properties with a single value are not paginated
+                return [data]
+            items.extend(data.get("results", []))
+            if not data.get("has_more") or not data.get("next_cursor"):
+                return items
+            params["start_cursor"] = data["next_cursor"]
+
+    def Close(self) -> None:
+        """Close the pooled connections."""
+        self.session.close()
+
+client = NotionClient(notionToken)
+pageCache = PageCache()
+# Database id -> {property name: property id}, read from the schema for filter_properties
+propertyIds = {}
+propertyIdsLock = threading.Lock()
+
+def PropertyIds(database_id: str, names: list) -> list:
+    """
+    Ids of the named properties of a database, to pass as filter_properties.
+    The schema is read once per database. Raises NotionError if a property
+    does not exist.
+    """
+    database_id = database_id.replace("-", "")
+    with propertyIdsLock:
+        known = propertyIds.get(database_id, {})
+    if any(name not in known for name in names):
+        known = {name: schema["id"] for name, schema in client.ReadDatabase(database_id)["properties"].items()}
+        with propertyIdsLock:
+            propertyIds[database_id] = known
+    unknown = [name for name in names if name not in known]
+    if unknown:
+        raise NotionError(f"Database {database_id} has no properties {', '.join(unknown)}")
+    return [known[name] for name in names]
+
+def CompleteRelations(page: dict) -> dict:
+    """
+    Page objects list at most 25 related pages per relation and set has_more
+    on relations cut short. Read those in full through the property item
+    endpoint, so the page lists every related page. Returns the page.
+    """
+    for value in TruncatedRelations(page):
+        SetRelation(value, client.ReadPropertyItems(page["id"], value["id"]))
+    return page
+
+def TruncatedRelations(page: dict) -> list:
+    """The relation values of a page that were cut short at 25 items."""
+    return [value for value in page.get("properties", {}).values() if value.get("type") == "relation" and value.get("has_more")]
+
+def SetRelation(value: dict, items: list) -> None:
+    """Replace a relation value with every item read from the property item endpoint."""
+    value["relation"] = [item["relation"] for item in items]
+    value["has_more"] = False
+
+def CreateNotionPage(database_id, properties):
+    try:
+        page = client.CreatePage(database_id, properties)
+        pageCache.Put(page)
+        return page
+    except (NotionError, requests.RequestException) as e:
+        print("Failed to create page:", e)
+        return None
+
+def QueryNotionDatabase(database_id, filter: dict = None, sorts: list = None, page_size: int = 100,
+                        filter_properties: list = None):
+    """
+    Yield a database's results one response page at a time, with complete
+    relations. See NotionClient.QueryDatabase and CompleteRelations.
+    Every returned page also primes the page cache.
+    """
+    for results in client.QueryDatabase(database_id, filter, sorts, page_size, filter_properties):
+        for page in results:
+            pageCache.Put(CompleteRelations(page), filter_properties)
+        yield results
+
+def ReadNotionDatabase(database_id, filter: dict = None, sorts: list = None, properties: list = None):
+    """
+    Read every row of a database. Returns {"results": [...]} or None on failure.
+    properties: names of the only properties the caller needs; the others are left out of the responses.
+    """
+    results = []
+    try:
+        filter_properties = PropertyIds(database_id, properties) if properties else None
+        for page in QueryNotionDatabase(database_id, filter, sorts, filter_properties=filter_properties):
+            results.extend(page)
+    except (NotionError, requests.RequestException) as e:
+        print("Failed to read database:", e)
         return None
-    
-def ReadPageProperties(page_id):
-    page_url = f"https://api.notion.com/v1/pages/{page_id}"
-    response = requests.get(page_url, headers=headers)
-    return response.json()["properties"]
\ No newline at end of file
+    return {"object": "list", "results": results, "has_more": False, "next_cursor": None}
+
+def FetchPage(page_id: str, filter_properties: list = None) -> dict:
+    return CompleteRelations(client.ReadPage(page_id, filter_properties))
+
+def ReadPage(page_id, last_edited_time: str = None, filter_properties: list = None):
+    """
+    Return a page object with complete relations through the page cache.
+    Pass the page's last_edited_time when it is known (e.g. from a query
+    result) to bypass a cached copy that is older than that edit.
+    filter_properties: ids of the only properties the caller needs (see PropertyIds).
+    """
+    return pageCache.Get(page_id, FetchPage, last_edited_time, filter_properties)
+
+def ReadPageProperties(page_id, last_edited_time: str = None, filter_properties: list = None):
+    """Return a page's properties through the page cache. See ReadPage."""
+    return ReadPage(page_id, last_edited_time, filter_properties)["properties"]
@@ -0,0 +1,337 @@
+from NotionHelper import *
+from AppPaths import DataPath
+import threading
+import asyncio
+import sqlite3
+import json
+import time
+
+# Ids per relation-filtered query; Notion allows at most 100 conditions in a compound filter
+RELATION_FILTER_SIZE = 100
+
+class NotionReplica:
+    """
+    Local SQLite mirror of Notion databases.
+    Each Sync pulls only the pages edited since the newest last_edited_time
+    already stored, so reads can be served from disk with just the delta
+    fetched from Notion.
+    """
+
+    # Ids per SELECT ... IN, under SQLite's limit on query parameters
+    BATCH_SIZE = 900
+
+    def __init__(self, path: str = None):
+        self.path = path if path else DataPath("catalog.sqlite3")
+        self.lock = threading.RLock()
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS pages (
+                id TEXT PRIMARY KEY,
+                database_id TEXT NOT NULL,
+                last_edited_time TEXT NOT NULL,
+                data TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS pages_database ON pages (database_id);
+            CREATE TABLE IF NOT EXISTS sync_state (
+                database_id TEXT PRIMARY KEY,
+                last_edited_time TEXT,
+                synced_at REAL,
+                full_synced_at REAL
+            );
+            CREATE TABLE IF NOT EXISTS related_databases (
+                database_id TEXT NOT NULL,
+                property TEXT NOT NULL,
+                related_id TEXT NOT NULL,
+                PRIMARY KEY (database_id, property)
+            );
+        """)
+        self.conn.commit()
+        self.syncThread = None
+        self.stopEvent = threading.Event()
+        # Page reads served from the mirror, and those that fell back to Notion
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def NormalizeId(database_id: str) -> str:
+        """Notion returns dashed ids in parent fields; store them undashed like the ids in the code."""
+        return database_id.replace("-", "")
+
+    def Store(self, database_id: str, pages: list) -> None:
+        """Insert or update pages belonging to a database."""
+        database_id = self.NormalizeId(database_id)
+        with self.lock:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO pages (id, database_id, last_edited_time, data) VALUES (?, ?, ?, ?)",
+                [(page["id"], database_id, page.get("last_edited_time", ""), json.dumps(page)) for page in pages]
+            )
+            self.conn.commit()
+
+    def SyncPages(self, database_id: str, full: bool = False):
+        """
+        Pull pages edited since the last sync into the mirror, yielding each
+        batch as it is stored. A full sync re-reads the whole database and
+        drops pages that no longer exist (archived or deleted in Notion).
+        """
+        database_id = self.NormalizeId(database_id)
+        with self.lock:
+            row = self.conn.execute("SELECT last_edited_time FROM sync_state WHERE database_id = ?", (database_id,)).fetchone()
+        since = row[0] if row and not full else None
+        # The first sync of a database reads all of it, which is a full sync
+        full = full or since is None
+        # last_edited_time is rounded to the minute, so re-read the boundary minute
+        filter = {"timestamp": "last_edited_time", "last_edited_time": {"on_or_after": since}} if since else None
+        newest = since or ""
+        seen = set()
+        for results in QueryNotionDatabase(database_id, filter=filter):
+            self.Store(database_id, results)
+            for page in results:
+                seen.add(page["id"])
+                newest = max(newest, page.get("last_edited_time", ""))
+            yield results
+        now = time.time()
+        with self.lock:
+            if full:
+                stored = [r[0] for r in self.conn.execute("SELECT id FROM pages WHERE database_id = ?", (database_id,))]
+                self.conn.executemany("DELETE FROM pages WHERE id = ?", [(pageId,) for pageId in stored if pageId not in seen])
+            self.conn.execute("""
+                INSERT INTO sync_state (database_id, last_edited_time, synced_at, full_synced_at) VALUES (?, ?, ?, ?)
+                ON CONFLICT (database_id) DO UPDATE SET
+                    last_edited_time = excluded.last_edited_time,
+                    synced_at = excluded.synced_at,
+                    full_synced_at = COALESCE(excluded.full_synced_at, sync_state.full_synced_at)
+            """, (database_id, newest or None, now, now if full else None))
+            self.conn.commit()
+
+    def Sync(self, database_id: str, full: bool = False) -> int:
+        """Pull the delta for a database. Returns the number of pages updated."""
+        return sum(len(results) for results in self.SyncPages(database_id, full))
+
+    def SyncAll(self, database_ids: list, full: bool = False) -> int:
+        return sum(self.Sync(database_id, full) for database_id in database_ids)
+
+    def Pages(self, database_id: str) -> list:
+        """Return every mirrored page of a database."""
+        with self.lock:
+            rows = self.conn.execute("SELECT data FROM pages WHERE database_id = ?", (self.NormalizeId(database_id),)).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def GetPage(self, page_id: str):
+        """Return a mirrored page, or None if it is not in the mirror."""
+        with self.lock:
+            row = self.conn.execute("SELECT data FROM pages WHERE id = ?", (page_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def ReadPage(self, page_id: str) -> dict:
+        """Return a page from the mirror, falling back to Notion for pages outside the mirrored databases."""
+        page = self.GetPage(page_id)
+        if page is not None:
+            self.hits += 1
+        else:
+            self.misses += 1
+            page = self.StoreFetched(ReadPage(page_id))
+        return page
+
+    def ReadPageProperties(self, page_id: str) -> dict:
+        return self.ReadPage(page_id)["properties"]
+
+    def GetPages(self, page_ids: list) -> dict:
+        """Return the mirrored pages among page_ids as {id: page}, read in batches."""
+        pages = {}
+        with self.lock:
+            for start in range(0, len(page_ids), self.BATCH_SIZE):
+                chunk = page_ids[start:start + self.BATCH_SIZE]
+                rows = self.conn.execute(f"SELECT id, data FROM pages WHERE id IN ({','.join('?' * len(chunk))})", chunk).fetchall()
+                pages.update((row[0], json.loads(row[1])) for row in rows)
+        return pages
+
+    @staticmethod
+    def RelationFilters(propertyName: str, related_ids: list):
+        """Yield filters matching pages whose relation contains any of related_ids, RELATION_FILTER_SIZE ids each."""
+        for start in range(0, len(related_ids), RELATION_FILTER_SIZE):
+            yield {"or": [
+                {"property": propertyName, "relation": {"contains": relatedId}}
+                for relatedId in related_ids[start:start + RELATION_FILTER_SIZE]
+            ]}
+
+    def QueryRelated(self, database_id: str, propertyName: str, related_ids: list, filter_properties: list = None) -> list:
+        """
+        Read the pages of a database whose relation property contains any of
+        related_ids, with RELATION_FILTER_SIZE ids per query. Whole pages are
+        stored if the database is mirrored; pages read with filter_properties
+        are not, as the mirror holds every property.
+        """
+        pages = []
+        for filter in self.RelationFilters(propertyName, related_ids):
+            for results in QueryNotionDatabase(database_id, filter=filter, filter_properties=filter_properties):
+                pages.extend(results)
+        return self.StoreQueried(database_id, pages, filter_properties)
+
+    async def QueryRelatedAsync(self, notion, database_id: str, propertyName: str, related_ids: list, filter_properties: list = None) -> list:
+        """QueryRelated through an AsyncNotionClient, with every query in flight at once."""
+        async def Query(filter: dict) -> list:
+            return [page async for results in notion.QueryNotionDatabase(database_id, filter=filter, filter_properties=filter_properties) for page in results]
+
+        queried = await asyncio.gather(*(Query(filter) for filter in self.RelationFilters(propertyName, related_ids)))
+        return self.StoreQueried(database_id, [page for results in queried for page in results], filter_properties)
+
+    def StoreQueried(self, database_id: str, pages: list, filter_properties: list = None) -> list:
+        """Store pages queried from Notion if they are whole and their database is mirrored. Returns the pages."""
+        if pages and not filter_properties and self.IsMirrored(database_id):
+            self.Store(database_id, pages)
+        return pages
+
+    def MirroredPages(self, page_ids: list) -> tuple:
+        """The distinct ids of page_ids, {id: page} of those in the mirror, and the ids missing from it."""
+        distinctIds = list(dict.fromkeys(page_ids))
+        pages = self.GetPages(distinctIds)
+        self.hits += len(pages)
+        return distinctIds, pages, [pageId for pageId in distinctIds if pageId not in pages]
+
+    def Projection(self, database_id: str = None, properties: list = None):
+        """Property ids to read pages of a database with, or None to read them whole (see ReadPages)."""
+        if database_id and properties and not self.IsMirrored(database_id):
+            return PropertyIds(database_id, properties)
+        return None
+
+    @staticmethod
+    def RelatedQuery(related: tuple, missing: list) -> tuple:
+        """(relation property, distinct ids to query) for the pages in missing. See ReadPages."""
+        propertyName, relatedIds = related
+        return propertyName, list(dict.fromkeys(relatedIds[pageId] for pageId in missing))
+
+    def AddQueried(self, pages: dict, missing: list, queried: list) -> list:
+        """Add the pages found by relation queries to pages. Returns the ids still missing."""
+        pages.update((page["id"], page) for page in queried)
+        stillMissing = [pageId for pageId in missing if pageId not in pages]
+        # The rest are counted as they are fetched
+        self.misses += len(missing) - len(stillMissing)
+        return stillMissing
+
+    def AddFetched(self, pages: dict, missing: list, fetched, filter_properties: list = None) -> None:
+        """Add the pages fetched one by one for the ids in missing to pages, storing whole ones."""
+        self.misses += len(missing)
+        for pageId, page in zip(missing, fetched):
+            pages[pageId] = page if filter_properties else self.StoreFetched(page)
+
+    def StoreFetched(self, page: dict) -> dict:
+        """Store a whole page read from Notion if its database is mirrored. Returns the page."""
+        database_id = page.get("parent", {}).get("database_id")
+        if database_id and self.IsMirrored(database_id):
+            self.Store(database_id, [page])
+        return page
+
+    def ReadPages(self, page_ids: list, database_id: str = None, properties: list = None, related: tuple = None, pool=None) -> dict:
+        """
+        Return {id: page} for every distinct id, read from the mirror in bulk.
+        Only the pages missing from it are fetched from Notion: first, when
+        related is given, with relation-filtered queries, then one request
+        per page that is still missing, run on pool if one is given.
+        database_id: the database the pages belong to, if known.
+        properties: names of the properties the caller needs. Pages of a
+        database that is not mirrored are read with only those; pages of a
+        mirrored one are read whole and stored.
+        related: (relation property, {page id: id it relates to}), e.g.
+        ("Album", {track id: album id}) queries the tracks of the albums whose
+        tracks are missing.
+        """
+        distinctIds, pages, missing = self.MirroredPages(page_ids)
+        if missing:
+            filter_properties = self.Projection(database_id, properties)
+            if database_id and related:
+                queried = self.QueryRelated(database_id, *self.RelatedQuery(related, missing), filter_properties)
+                missing = self.AddQueried(pages, missing, queried)
+            fetch = lambda pageId: ReadPage(pageId, filter_properties=filter_properties)
+            self.AddFetched(pages, missing, (pool.map if pool else map)(fetch, missing), filter_properties)
+        return {pageId: pages[pageId] for pageId in distinctIds}
+
+    async def ReadPagesAsync(self, notion, page_ids: list, database_id: str = None, properties: list = None, related: tuple = None) -> dict:
+        """
+        ReadPages through an AsyncNotionClient: the pages missing from the
+        mirror are all requested at once, and wait on the client's rate
+        limit rather than on threads.
+        """
+        distinctIds, pages, missing = self.MirroredPages(page_ids)
+        if missing:
+            # The schema is read once per database, off the event loop
+            filter_properties = await asyncio.to_thread(self.Projection, database_id, properties)
+            if database_id and related:
+                queried = await self.QueryRelatedAsync(notion, database_id, *self.RelatedQuery(related, missing), filter_properties)
+                missing = self.AddQueried(pages, missing, queried)
+            fetched = await asyncio.gather(*(notion.FetchPage(pageId, filter_properties) for pageId in missing))
+            self.AddFetched(pages, missing, fetched, filter_properties)
+        return {pageId: pages[pageId] for pageId in distinctIds}
+
+    def Stats(self) -> dict:
+        """Return the mirror's hit/miss counters, in the shape of PageCache.Stats()."""
+        lookups = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hits / lookups if lookups else 0.0}
+
+    def IsMirrored(self, database_id: str) -> bool:
+        with self.lock:
+            return self.conn.execute("SELECT 1 FROM sync_state WHERE database_id = ?", (self.NormalizeId(database_id),)).fetchone() is not None
+
+    def LastSynced(self, database_id: str):
+        """Return the time.time() of the last successful sync of a database, or None."""
+        with self.lock:
+            row = self.conn.execute("SELECT synced_at FROM sync_state WHERE database_id = ?", (self.NormalizeId(database_id),)).fetchone()
+        return row[0] if row else None
+
+    def RelatedDatabases(self, database_id: str, propertyNames: list) -> list:
+        """
+        Return the ids of the databases that the given relation properties point to.
+        Read from the database schema once and remembered, so this also works offline.
+        """
+        database_id = self.NormalizeId(database_id)
+        with self.lock:
+            known = dict(self.conn.execute("SELECT property, related_id FROM related_databases WHERE database_id = ?", (database_id,)).fetchall())
+        if any(name not in known for name in propertyNames):
+            schema = client.ReadDatabase(database_id)["properties"]
+            for name in propertyNames:
+                relation = schema.get(name, {}).get("relation")
+                if relation and relation.get("database_id"):
+                    known[name] = self.NormalizeId(relation["database_id"])
+            with self.lock:
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO related_databases (database_id, property, related_id) VALUES (?, ?, ?)",
+                    [(database_id, name, relatedId) for name, relatedId in known.items()]
+                )
+                self.conn.commit()
+        return list(dict.fromkeys(known[name] for name in propertyNames if name in known))
+
+    def StartBackgroundSync(self, database_ids, interval: float = 60, fullInterval: float = 24 * 3600, onError=None) -> None:
+        """
+        Poll the given databases for changes every interval seconds on a daemon thread.
+        database_ids may be a list or a callable returning one. A full sync is
+        run once every fullInterval seconds to drop deleted pages.
+        Its requests go in the bulk lane.
+        """
+        @Priority(BULK)
+        def Run():
+            while not self.stopEvent.is_set():
+                ids = database_ids() if callable(database_ids) else database_ids
+                for database_id in ids:
+                    try:
+                        with self.lock:
+                            row = self.conn.execute("SELECT full_synced_at FROM sync_state WHERE database_id = ?", (self.NormalizeId(database_id),)).fetchone()
+                        full = not row or not row[0] or time.time() - row[0] > fullInterval
+                        self.Sync(database_id, full)
+                    except Exception as e:
+                        if onError:
+                            onError(f"Background sync of {database_id} failed: {e}")
+                self.stopEvent.wait(interval)
+
+        if self.syncThread and self.syncThread.is_alive():
+            return
+        self.stopEvent.clear()
+        self.syncThread = threading.Thread(target=Run, name="notion-replica-sync", daemon=True)
+        self.syncThread.start()
+
+    def StopBackgroundSync(self) -> None:
+        self.stopEvent.set()
+
+    def Close(self) -> None:
+        self.StopBackgroundSync()
+        with self.lock:
+            self.conn.close()
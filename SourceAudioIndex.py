@@ -0,0 +1,178 @@
+from AppPaths import DataPath
+from difflib import SequenceMatcher
+import unicodedata
+import sqlite3
+import time
+import csv
+import os
+import re
+
+def NormalizeName(name: str) -> str:
+    """
+    Comparison form of a filename: no extension, accents or case, and
+    underscores, dashes, dots and runs of whitespace collapsed to one space.
+    """
+    name = os.path.splitext(name.strip())[0]
+    name = unicodedata.normalize("NFKD", name)
+    name = "".join(c for c in name if not unicodedata.combining(c))
+    return re.sub(r"[\s_\-.]+", " ", name.casefold()).strip()
+
+def Trigrams(normalized: str) -> set:
+    padded = f"  {normalized} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+class SourceAudioIndex:
+    """
+    Persistent filename -> Sourceaudio Id index.
+    SourceAudio exports, full or partial, are merged into it, so matching
+    only needs the rows that changed since the last export instead of a
+    full re-export, and no CSV has to be parsed at startup.
+    Names are also indexed in normalized form and by trigram, for matching
+    filenames that differ in case or punctuation and for near-match
+    suggestions.
+    """
+
+    BATCH_SIZE = 5000
+    # Trigrams looked up per suggestion query; the rarest ones are the most selective
+    QUERY_GRAMS = 8
+    CANDIDATES = 50
+
+    def __init__(self, path: str = None):
+        self.path = path if path else DataPath("sourceaudio.sqlite3")
+        self.conn = sqlite3.connect(self.path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS sourceaudio (
+                name TEXT PRIMARY KEY,
+                sourceaudio_id TEXT NOT NULL,
+                filename TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS trigrams (
+                gram TEXT NOT NULL,
+                name TEXT NOT NULL,
+                PRIMARY KEY (gram, name)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS gram_counts (
+                gram TEXT PRIMARY KEY,
+                names INTEGER NOT NULL
+            ) WITHOUT ROWID;
+        """)
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(sourceaudio)")]
+        if "normalized" not in columns:
+            # Index created before normalized matching: backfill it
+            self.conn.execute("ALTER TABLE sourceaudio ADD COLUMN normalized TEXT")
+            names = [row[0] for row in self.conn.execute("SELECT name FROM sourceaudio")]
+            self.conn.executemany("UPDATE sourceaudio SET normalized = ? WHERE name = ?", [(NormalizeName(name), name) for name in names])
+            self.AddTrigrams(names)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS sourceaudio_normalized ON sourceaudio (normalized)")
+        self.conn.commit()
+
+    @staticmethod
+    def Key(filename: str) -> str:
+        """Index key of a filename: the name without its extension."""
+        return os.path.splitext(filename)[0]
+
+    def Merge(self, sourceaudioPath: str) -> dict:
+        """
+        Merge a SourceAudio export into the index; rows for a filename already
+        indexed replace it. Returns {"rows", "added", "updated"}.
+        """
+        stats = {"rows": 0, "added": 0, "updated": 0}
+        now = time.time()
+        with open(sourceaudioPath, newline='', encoding='utf-8') as SourceAudioExport:
+            batch = []
+            for row in csv.DictReader(SourceAudioExport):
+                batch.append((self.Key(row["Filename"]), row["Sourceaudio Id"], row["Filename"]))
+                if len(batch) >= self.BATCH_SIZE:
+                    self.MergeBatch(batch, now, stats)
+                    batch = []
+            self.MergeBatch(batch, now, stats)
+        self.conn.commit()
+        return stats
+
+    def MergeBatch(self, batch: list, now: float, stats: dict) -> None:
+        if not batch:
+            return
+        names = [name for name, _, _ in batch]
+        known = {}
+        for start in range(0, len(names), 900):
+            chunk = names[start:start + 900]
+            known.update(self.conn.execute(
+                f"SELECT name, sourceaudio_id FROM sourceaudio WHERE name IN ({','.join('?' * len(chunk))})", chunk
+            ).fetchall())
+        added = []
+        for name, sourceAudioId, _ in batch:
+            stats["rows"] += 1
+            if name not in known:
+                stats["added"] += 1
+                added.append(name)
+            elif known[name] != sourceAudioId:
+                stats["updated"] += 1
+            known[name] = sourceAudioId
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO sourceaudio (name, sourceaudio_id, filename, updated_at, normalized) VALUES (?, ?, ?, ?, ?)",
+            [(name, sourceAudioId, filename, now, NormalizeName(name)) for name, sourceAudioId, filename in batch]
+        )
+        self.AddTrigrams(list(dict.fromkeys(added)))
+
+    def AddTrigrams(self, names: list) -> None:
+        """Index the trigrams of newly added names and count how many names share each trigram."""
+        # Sorted, so the inserts walk the (gram, name) key in order
+        rows = sorted((gram, name) for name in names for gram in Trigrams(NormalizeName(name)))
+        self.conn.executemany("INSERT OR IGNORE INTO trigrams (gram, name) VALUES (?, ?)", rows)
+        counts = {}
+        for gram, _ in rows:
+            counts[gram] = counts.get(gram, 0) + 1
+        self.conn.executemany(
+            "INSERT INTO gram_counts (gram, names) VALUES (?, ?) ON CONFLICT (gram) DO UPDATE SET names = names + excluded.names",
+            list(counts.items())
+        )
+
+    def Lookup(self, name: str):
+        """Return the Sourceaudio Id of a filename without extension, or None."""
+        row = self.conn.execute("SELECT sourceaudio_id FROM sourceaudio WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else None
+
+    def LookupNormalized(self, name: str) -> list:
+        """Return [(name, Sourceaudio Id)] of every indexed name with the same normalized form."""
+        return self.conn.execute(
+            "SELECT name, sourceaudio_id FROM sourceaudio WHERE normalized = ?", (NormalizeName(name),)
+        ).fetchall()
+
+    def Suggest(self, name: str, limit: int = 3) -> list:
+        """
+        Return up to limit near matches as [(name, Sourceaudio Id, score)],
+        best first, score being a 0-1 similarity of the normalized names.
+        Candidates come from the name's rarest trigrams, so the cost depends
+        on how many names share those trigrams, not on the index size.
+        """
+        normalized = NormalizeName(name)
+        grams = list(Trigrams(normalized))
+        if not grams:
+            return []
+        counts = self.conn.execute(
+            f"SELECT gram, names FROM gram_counts WHERE gram IN ({','.join('?' * len(grams))})", grams
+        ).fetchall()
+        rarest = [gram for gram, _ in sorted(counts, key=lambda item: item[1])[:self.QUERY_GRAMS]]
+        if not rarest:
+            return []
+        candidates = self.conn.execute(f"""
+            SELECT s.name, s.sourceaudio_id, s.normalized FROM (
+                SELECT name, COUNT(*) AS shared FROM trigrams
+                WHERE gram IN ({','.join('?' * len(rarest))})
+                GROUP BY name ORDER BY shared DESC LIMIT ?
+            ) AS c JOIN sourceaudio AS s ON s.name = c.name
+        """, rarest + [self.CANDIDATES]).fetchall()
+        scored = [
+            (candidate, sourceAudioId, round(SequenceMatcher(None, normalized, candidateNormalized).ratio(), 3))
+            for candidate, sourceAudioId, candidateNormalized in candidates
+        ]
+        scored.sort(key=lambda item: item[2], reverse=True)
+        return scored[:limit]
+
+    def Count(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM sourceaudio").fetchone()[0]
+
+    def Close(self) -> None:
+        self.conn.close()
@@ -1,40 +1,198 @@
+from AppLog import Logger, PrintLogger
+from SourceAudioIndex import SourceAudioIndex
+from typing import Iterable
+import tempfile
+import shutil
 import csv
 import os
 
-filemakerPath = input("Enter the path to the Filemaker Export: ").strip('\'"')
-sourceaudioPath = input("Enter the path to the SourceAudio Export: ").strip('\'"')
-filemakerDict = []
-SourceAudioDict = {}
-headers = ""
-with open(filemakerPath, newline='', encoding='utf-8') as FilemakerExport:
-    with open(sourceaudioPath, newline='', encoding='utf-8') as SourceAudioExport:
+FILENAME_COLUMN = "SA Filename000000"
+SOURCEAUDIO_ID_COLUMN = "SA SourceAudio ID000000"
+MASTER_ID_COLUMN = "SA Master ID"
+VERSION_COLUMN = "SA Versions Only"
+TITLE_COLUMN = "SA Title Only"
+MATCH_CONFIDENCE_COLUMN = "SA Match Confidence"
+
+# Confidence of a match on the normalized filename (case, accents and punctuation ignored)
+NORMALIZED_CONFIDENCE = 0.95
+SUGGESTIONS = 3
+
+def CleanHeader(header: str) -> str:
+    """Strip FileMaker's "SA " prefix and "000000" repetition suffix from a column name."""
+    return header.replace("SA ", "").replace("000000", "") if header else header
+
+def ResolveColumns(fieldnames: list) -> dict:
+    """
+    Map each column the join uses to its name in this file, which is either
+    the raw FileMaker name or the cleaned one written by a previous run.
+    Missing ID and confidence columns are appended to fieldnames.
+    """
+    columns = {}
+    for column in (FILENAME_COLUMN, TITLE_COLUMN, VERSION_COLUMN, SOURCEAUDIO_ID_COLUMN, MASTER_ID_COLUMN, MATCH_CONFIDENCE_COLUMN):
+        name = next((h for h in fieldnames if h in (column, CleanHeader(column))), None)
+        if name is None:
+            if column not in (SOURCEAUDIO_ID_COLUMN, MASTER_ID_COLUMN, MATCH_CONFIDENCE_COLUMN):
+                raise ValueError(f"Column \"{column}\" not found in the FileMaker export")
+            name = column
+            fieldnames.append(name)
+        columns[column] = name
+    return columns
+
+def MergeSourceAudioExport(sourceaudioPath: str, console: Logger, index: SourceAudioIndex = None) -> dict:
+    """Merge a full or partial SourceAudio export into the persistent index."""
+    index = index if index else SourceAudioIndex()
+    stats = index.Merge(sourceaudioPath)
+    console.Log(f"Merged {stats['rows']} SourceAudio rows: {stats['added']} new, {stats['updated']} changed, {index.Count()} indexed")
+    return stats
+
+def MatchFilename(index: SourceAudioIndex, filename: str):
+    """
+    Match one filename against the index.
+    Returns (Sourceaudio Id or None, confidence, suggestions): an exact match
+    has confidence 1, a match on the normalized name NORMALIZED_CONFIDENCE.
+    Filenames without a single match get ranked suggestions to review,
+    as [(name, Sourceaudio Id, score)].
+    """
+    name = SourceAudioIndex.Key(filename)
+    sourceAudioId = index.Lookup(name)
+    if sourceAudioId is not None:
+        return sourceAudioId, 1.0, []
+    normalized = index.LookupNormalized(name)
+    if len({candidateId for _, candidateId in normalized}) == 1:
+        return normalized[0][1], NORMALIZED_CONFIDENCE, []
+    if normalized:
+        # Several files normalize to this name; let someone pick
+        return None, 0.0, [(candidate, candidateId, NORMALIZED_CONFIDENCE) for candidate, candidateId in normalized[:SUGGESTIONS]]
+    return None, 0.0, index.Suggest(name, SUGGESTIONS)
+
+def ReviewPath(outputPath: str) -> str:
+    """export.csv -> export_review.csv"""
+    base, ext = os.path.splitext(outputPath)
+    return f"{base}_review{ext or '.csv'}"
+
+def WriteReviewFile(reviewPath: str, reviewRows: Iterable[list]) -> int:
+    """Write the review rows as they are produced. Returns the number of rows written."""
+    header = ["Filename", "Title", "Version", "Matched ID", "Confidence"]
+    for n in range(1, SUGGESTIONS + 1):
+        header += [f"Suggestion {n}", f"Suggestion {n} ID", f"Suggestion {n} Score"]
+    count = 0
+    with open(reviewPath, "w", newline='', encoding='utf-8') as reviewFile:
+        writer = csv.writer(reviewFile)
+        writer.writerow(header)
+        for reviewRow in reviewRows:
+            writer.writerow(reviewRow)
+            count += 1
+    return count
+
+def MatchSourceAudio(filemakerPath: str, sourceaudioPath: str, console: Logger, outputPath: str = None,
+                     index: SourceAudioIndex = None, reviewPath: str = None) -> dict:
+    """
+    Fill in the SourceAudio ID and Master ID columns of a FileMaker export,
+    matching rows by filename against the persistent SourceAudio index.
+    sourceaudioPath, if given, is a full or partial SourceAudio export that
+    is merged into the index first. The master of a title is the SourceAudio
+    ID of its "Full" version.
+
+    Filenames are matched exactly first, then ignoring case, accents and
+    punctuation; the Match Confidence column records which. Rows matched on
+    the normalized name, and unmatched rows with their closest SourceAudio
+    filenames, are listed in a review file (reviewPath, by default
+    <output>_review.csv) for someone to check by hand.
+
+    The export is streamed twice: once to find the master of every title,
+    once to write the enriched rows, so only the title index is held in
+    memory. Rows go to a temporary file that atomically replaces outputPath
+    (the FileMaker export itself by default) when complete, with the "SA "
+    and "000000" header decorations removed; review rows likewise go to a
+    temporary file next to reviewPath.
+    Returns the join statistics.
+    """
+    outputPath = outputPath if outputPath else filemakerPath
+    reviewPath = reviewPath if reviewPath else ReviewPath(outputPath)
+    index = index if index else SourceAudioIndex()
+    if sourceaudioPath:
+        MergeSourceAudioExport(sourceaudioPath, console, index)
+    if index.Count() == 0:
+        raise ValueError("The SourceAudio index is empty. Provide a SourceAudio export to build it.")
+
+    # First pass: the master SourceAudio ID of every title
+    masterIds = {}
+    with open(filemakerPath, newline='', encoding='utf-8') as FilemakerExport:
         filemaker = csv.DictReader(FilemakerExport)
-        headers = [h.replace("SA ", "") if h else h for h in filemaker.fieldnames]
-        headers = [h.replace("000000", "") if h else h for h in headers]
+        fieldnames = list(filemaker.fieldnames)
+        columns = ResolveColumns(fieldnames)
 
-        filemakerDict = list(filemaker)
-        SourceAudio = csv.DictReader(SourceAudioExport)
-        for row in SourceAudio:
-            SourceAudioDict[os.path.splitext(row["Filename"])[0]] = row["Sourceaudio Id"]
+        for row in filemaker:
+            if row[columns[VERSION_COLUMN]] == "Full":
+                sourceAudioId, _, _ = MatchFilename(index, row[columns[FILENAME_COLUMN]])
+                if sourceAudioId is not None:
+                    masterIds[row[columns[TITLE_COLUMN]]] = sourceAudioId
 
-nestingLookup = {}
+    # Second pass: stream the enriched rows to a temporary file next to the
+    # output, yielding the rows to review
+    stats = {"rows": 0, "matched": 0, "normalized": 0, "notFound": 0, "masterMissing": 0, "review": 0}
 
-for row in filemakerDict:
-    name = os.path.splitext(row["SA Filename000000"])[0]
-    if name in SourceAudioDict:
-        row["SA SourceAudio ID000000"] = SourceAudioDict[name]
-    else:
-        row["SA SourceAudio ID000000"] = "Not Found"
-        print(f"Sourceaudio Id not found for {name}")
-        continue
-    if row["SA Versions Only"] == "Full":
-        nestingLookup[row["SA Title Only"]] = row["SA SourceAudio ID000000"]
+    def EnrichRows(filemaker: csv.DictReader, writer):
+        for row in filemaker:
+            stats["rows"] += 1
+            filename = row[columns[FILENAME_COLUMN]]
+            sourceAudioId, confidence, suggestions = MatchFilename(index, filename)
+            if sourceAudioId is None:
+                stats["notFound"] += 1
+                row[columns[SOURCEAUDIO_ID_COLUMN]] = "Not Found"
+                console.Error(f"Sourceaudio Id not found for {SourceAudioIndex.Key(filename)}"
+                              + (f" (closest: {suggestions[0][0]})" if suggestions else ""))
+            else:
+                stats["matched"] += 1
+                row[columns[SOURCEAUDIO_ID_COLUMN]] = sourceAudioId
+                if confidence < 1:
+                    stats["normalized"] += 1
+            row[columns[MATCH_CONFIDENCE_COLUMN]] = f"{confidence:.2f}"
+            if confidence < 1:
+                reviewRow = [filename, row[columns[TITLE_COLUMN]], row[columns[VERSION_COLUMN]], sourceAudioId or "", f"{confidence:.2f}"]
+                for name, candidateId, score in suggestions:
+                    reviewRow += [name, candidateId, f"{score:.2f}"]
+                yield reviewRow
+            row[columns[MASTER_ID_COLUMN]] = masterIds.get(row[columns[TITLE_COLUMN]], "Not Found")
+            if row[columns[MASTER_ID_COLUMN]] == "Not Found":
+                stats["masterMissing"] += 1
+            writer.writerow([row.get(h, "") for h in fieldnames])
+
+    outputDir = os.path.dirname(os.path.abspath(outputPath))
+    reviewTmpPath = reviewPath + ".tmp"
+    with open(filemakerPath, newline='', encoding='utf-8') as FilemakerExport, \
+        tempfile.NamedTemporaryFile("w", dir=outputDir, prefix=".sourcehelper-", suffix=".csv",
+                                    newline='', encoding='utf-8', delete=False) as tmpFile:
+        try:
+            writer = csv.writer(tmpFile)
+            writer.writerow([CleanHeader(h) for h in fieldnames])
+            stats["review"] = WriteReviewFile(reviewTmpPath, EnrichRows(csv.DictReader(FilemakerExport), writer))
+        except BaseException:
+            tmpFile.close()
+            os.remove(tmpFile.name)
+            if os.path.exists(reviewTmpPath):
+                os.remove(reviewTmpPath)
+            raise
+    # Temporary files are created private; keep the permissions of the file being replaced
+    if os.path.exists(outputPath):
+        shutil.copymode(outputPath, tmpFile.name)
+    os.replace(tmpFile.name, outputPath)
 
-for row in filemakerDict:
-    row["SA Master ID"] = nestingLookup.get(row["SA Title Only"], "Not Found")
+    if stats["review"]:
+        os.replace(reviewTmpPath, reviewPath)
+    else:
+        os.remove(reviewTmpPath)
+        if os.path.exists(reviewPath):
+            # Everything matched exactly; a review file left by an earlier run no longer applies
+            os.remove(reviewPath)
 
+    console.Log(f"Matched {stats['matched']} of {stats['rows']} rows ({stats['normalized']} on a normalized filename), "
+                f"{stats['notFound']} not found, {stats['masterMissing']} without a master")
+    if stats["review"]:
+        console.Log(f"{stats['review']} rows to review written to {reviewPath}")
+    return stats
 
-with open(filemakerPath, 'w', newline='', encoding='utf-8') as FilemakerExport:
-    writer = csv.DictWriter(FilemakerExport, fieldnames=headers)
-    writer.writeheader()
-    writer.writerows(filemakerDict)
\ No newline at end of file
+if __name__ == "__main__":
+    filemakerPath = input("Enter the path to the Filemaker Export: ").strip('\'"')
+    sourceaudioPath = input("Enter the path to a new SourceAudio Export (leave blank to use the saved index): ").strip('\'"')
+    MatchSourceAudio(filemakerPath, sourceaudioPath or None, PrintLogger())
@@ -0,0 +1,218 @@
+from Catalog import *
+from AppLog import Logger
+from AsyncNotionHelper import AsyncNotionClient
+from Jobs import JobCancelled, ReportProgress
+import asyncio
+import httpx
+import csv
+
+# Created pages waiting to be stored in the mirror
+STORE_QUEUE = 100
+
+def VersionProperties(pageID: str, pageName: str, mixout: str, alt: str) -> dict:
+    """Build the Notion properties of a version page for a track."""
+    return {
+        "Name": {
+            "title": [
+                {
+                    "text": {
+                        "content": f"{pageName}_{alt}"
+                    }
+                }
+            ]
+        },
+        "Mixout": {
+            "rich_text": [
+                {
+                    "text": {
+                        "content": mixout
+                    }
+                }
+            ]
+        },
+        "Version": {
+            "select": {
+                "name": alt
+            }
+        },
+        "Track Title": {
+            "relation": [
+                {"id": pageID}
+            ]
+        }
+    }
+
+def AddVersions(pageID: str, pageName: str, versions: list, console: Logger) -> None:
+    """Add mixout versions to the Notion database for the selected track."""
+    for position, (mixout, alt) in enumerate(versions):
+        page = CreateNotionPage(VERSIONS_DATABASE, VersionProperties(pageID, pageName, mixout, alt))
+        if page:
+            replica.Store(VERSIONS_DATABASE, [page])
+        console.Log(f"Uploaded versions {alt} for {pageName}: {mixout}")
+        ReportProgress(position + 1, len(versions), "versions")
+
+# Accepted header names (lowercase) for each column of a bulk version sheet
+VERSION_SHEET_COLUMNS = {
+    "track": ["track", "track title", "tracktitle", "title", "track id", "unique title id", "uniquetitleid", "id"],
+    "alt": ["alt", "alt suffix", "suffix", "version"],
+    "mixout": ["mixout", "mix"],
+}
+
+def ReadVersionSheet(filePath: str) -> list[dict]:
+    """
+    Read a CSV/TSV of versions to add. Each row has a track (title, Unique
+    Title Id or Notion page id), an alt suffix and a mixout. Columns are
+    found by header name, or taken in that order if there is no header.
+    Returns [{"line", "track", "alt", "mixout"}]. Raises ValueError if the
+    header lacks one of the columns.
+    """
+    with open(filePath, newline='', encoding='utf-8-sig') as sheetFile:
+        sample = sheetFile.read(4096)
+        sheetFile.seek(0)
+        delimiter = "\t" if filePath.lower().endswith((".tsv", ".txt")) or "\t" in sample.split("\n")[0] else ","
+        rows = list(csv.reader(sheetFile, delimiter=delimiter))
+    if not rows:
+        return []
+    header = [cell.strip().lower() for cell in rows[0]]
+    positions = {}
+    for column, names in VERSION_SHEET_COLUMNS.items():
+        positions[column] = next((header.index(name) for name in names if name in header), None)
+    knownNames = {name for names in VERSION_SHEET_COLUMNS.values() for name in names}
+    if not knownNames.intersection(header):
+        positions = {"track": 0, "alt": 1, "mixout": 2}
+        firstLine = 1
+    else:
+        missing = [column for column, position in positions.items() if position is None]
+        if missing:
+            raise ValueError(f"Column \"{missing[0]}\" not found in {filePath}")
+        rows = rows[1:]
+        firstLine = 2
+    versions = []
+    for line, row in enumerate(rows, firstLine):
+        if not any(cell.strip() for cell in row):
+            continue
+        cells = {column: row[position].strip() if position < len(row) else "" for column, position in positions.items()}
+        versions.append({"line": line, **cells})
+    return versions
+
+@Priority(BULK)
+def AddVersionsBulk(filePath: str, console: Logger) -> list[dict]:
+    """Add every version listed in a CSV/TSV (see ReadVersionSheet) that the track lacks. Returns one result per row."""
+    rows = ReadVersionSheet(filePath)
+    console.Log(f"Read {len(rows)} versions from {filePath}")
+    for database_id in (TRACKS_DATABASE, VERSIONS_DATABASE):
+        syncError = SyncDatabase(database_id)
+        if syncError:
+            console.Error(f"Could not refresh from Notion, using the local copy: {syncError}")
+
+    # Index every track by title, Unique Title Id and page id
+    byTitle = {}
+    byId = {}
+    for page in replica.Pages(TRACKS_DATABASE):
+        byTitle.setdefault(GetPageTitle(page, "TrackTitle").strip().lower(), []).append(page)
+        byId[page["id"].replace("-", "")] = page
+        uniqueId = page["properties"].get("Unique Title Id", {}).get("unique_id")
+        if uniqueId:
+            byId[f"{uniqueId.get('prefix') or ''}{uniqueId['number']}".lower()] = page
+
+    # Versions each track already has: from the mirrored versions database,
+    # which includes pages created since the track was last synced, and from
+    # the track's "Song Versions" relation
+    versionsByTrack = {}
+    for page in replica.Pages(VERSIONS_DATABASE):
+        select = page["properties"].get("Version", {}).get("select")
+        for track in page["properties"].get("Track Title", {}).get("relation", []):
+            if select:
+                versionsByTrack.setdefault(track["id"], set()).add(select["name"].lower())
+    existing = {}
+    def ExistingVersions(track: dict) -> set:
+        if track["id"] not in existing:
+            names = versionsByTrack.get(track["id"], set())
+            for version in track["properties"]["Song Versions"]["relation"]:
+                select = replica.ReadPageProperties(version["id"])["Version"]["select"]
+                if select:
+                    names.add(select["name"].lower())
+            existing[track["id"]] = names
+        return existing[track["id"]]
+
+    results = []
+    pending = []
+    for row in rows:
+        result = dict(row)
+        results.append(result)
+        if not row["track"] or not row["alt"] or not row["mixout"]:
+            result["status"] = "Skipped: track, alt and mixout are all required"
+            continue
+        track = byId.get(row["track"].replace("-", "").lower())
+        if track is None:
+            matches = byTitle.get(row["track"].lower(), [])
+            if len(matches) > 1:
+                result["status"] = f"Skipped: {len(matches)} tracks are titled \"{row['track']}\", use its Unique Title Id"
+                continue
+            track = matches[0] if matches else None
+        if track is None:
+            result["status"] = "Skipped: track not found"
+            continue
+        versions = ExistingVersions(track)
+        if row["alt"].lower() in versions:
+            result["status"] = "Skipped: version already exists"
+            continue
+        versions.add(row["alt"].lower())
+        result["trackTitle"] = GetPageTitle(track, "TrackTitle")
+        pending.append((result, track))
+
+    async def Upload() -> None:
+        """
+        Create the pending versions concurrently; created pages go through a
+        bounded queue to a single consumer that stores them in the mirror in
+        batches.
+        """
+        created = asyncio.Queue(maxsize=STORE_QUEUE)
+        finished = 0
+
+        async def Create(result: dict, track: dict) -> None:
+            nonlocal finished
+            try:
+                page = await notion.CreatePage(VERSIONS_DATABASE, VersionProperties(track["id"], result["trackTitle"], result["mixout"], result["alt"]))
+                result["status"] = "Created"
+                await created.put(page)
+            except JobCancelled:
+                result["status"] = "Cancelled"
+            except (NotionError, httpx.HTTPError) as e:
+                result["status"] = f"Failed: {e}"
+            finished += 1
+            ReportProgress(finished, len(pending), "versions")
+
+        async def Store() -> None:
+            while True:
+                pages = [await created.get()]
+                while not created.empty():
+                    pages.append(created.get_nowait())
+                done = pages[-1] is None
+                pages = [page for page in pages if page is not None]
+                for page in pages:
+                    pageCache.Put(page)
+                if pages:
+                    replica.Store(VERSIONS_DATABASE, pages)
+                if done:
+                    return
+
+        async def CreateAll() -> None:
+            await asyncio.gather(*(Create(result, track) for result, track in pending))
+            await created.put(None)
+
+        async with AsyncNotionClient() as notion:
+            await asyncio.gather(Store(), CreateAll())
+
+    console.Log(f"Creating {len(pending)} versions...")
+    asyncio.run(Upload())
+
+    for result in results:
+        message = f"Line {result['line']}: {result['track']} {result['alt']} - {result['status']}"
+        if result["status"] == "Created" or result["status"].startswith("Skipped: version already exists"):
+            console.Log(message)
+        else:
+            console.Error(message)
+    created = sum(result["status"] == "Created" for result in results)
+    console.Log(f"Done! {created} created, {len(results) - created} skipped or failed")
+    return results
@@ -0,0 +1,422 @@
+"""
+Local stand-in for the Notion API, for benchmarking and trying the app offline.
+
+Serves the endpoints the app uses (query a database, read a database's
+schema, read a page or one of its properties, create a page) from recorded
+or synthetic fixtures, with configurable latency and 429 injection.
+Responses follow Notion's: filter_properties limits the properties
+returned, and relations are cut at 25 pages with has_more set.
+
+    python benchmarks/NotionStandIn.py --albums 50 [--port 8765] [--latency 0.2] [--every-429 10]
+    python benchmarks/NotionStandIn.py --fixtures catalog.json
+    python benchmarks/NotionStandIn.py --record catalog.json
+
+then point the app at it with NOTION_API_URL=http://127.0.0.1:<port>.
+--record writes the local mirror of the catalog to a fixtures file.
+"""
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs, unquote
+import threading
+import hashlib
+import json
+import time
+import uuid
+import sys
+import os
+
+# Property value keys, to tell the type of a property written without one
+PROPERTY_TYPES = ("title", "rich_text", "relation", "select", "multi_select", "unique_id", "number", "checkbox", "url", "date")
+# Page objects list at most this many related pages per relation, like Notion's
+RELATION_LIMIT = 25
+
+def Undashed(pageId: str) -> str:
+    return pageId.replace("-", "")
+
+def Dashed(pageId: str) -> str:
+    """Notion returns ids with dashes."""
+    try:
+        return str(uuid.UUID(pageId))
+    except ValueError:
+        return pageId
+
+def PropertyId(name: str) -> str:
+    """Short, stable property id like the ones Notion assigns."""
+    return hashlib.sha1(name.encode("utf-8")).hexdigest()[:4]
+
+def Text(content: str) -> list:
+    return [{"type": "text", "text": {"content": content}, "plain_text": content}] if content else []
+
+def ReadFormat(properties: dict) -> dict:
+    """Page properties as Notion returns them, from the way they are written when creating a page."""
+    result = {}
+    for name, value in properties.items():
+        value = dict(value, id=value.get("id", PropertyId(name)))
+        if "type" not in value:
+            value["type"] = next((key for key in PROPERTY_TYPES if key in value), None)
+            if value["type"] in ("title", "rich_text"):
+                value[value["type"]] = [item for text in value[value["type"]] for item in Text(text.get("text", {}).get("content", ""))]
+            elif value["type"] == "relation":
+                value["has_more"] = False
+        result[name] = value
+    return result
+
+def Matches(page: dict, filter: dict) -> bool:
+    """
+    Whether a page passes a query filter. Supports the filters the app sends:
+    "and"/"or" of up to 100 conditions, last_edited_time on_or_after and
+    relation contains. Raises ValueError for anything else.
+    """
+    for compound, combine in (("or", any), ("and", all)):
+        if compound in filter:
+            if len(filter[compound]) > 100:
+                raise ValueError(f"body.filter.{compound} should have at most 100 items")
+            return combine(Matches(page, condition) for condition in filter[compound])
+    if filter.get("timestamp") == "last_edited_time" and "on_or_after" in filter.get("last_edited_time", {}):
+        return page["last_edited_time"] >= filter["last_edited_time"]["on_or_after"]
+    if "contains" in filter.get("relation", {}):
+        value = page["properties"].get(filter.get("property"), {})
+        return any(Undashed(related["id"]) == Undashed(filter["relation"]["contains"]) for related in value.get("relation", []))
+    raise ValueError(f"Filter not supported by the stand-in: {filter}")
+
+class NotionStandIn:
+    """
+    Threaded HTTP server answering like the Notion API from an in-memory set
+    of pages. Database schemas are derived from the pages themselves.
+    latency: seconds added to every response.
+    every429: answer every n-th request with 429 and Retry-After.
+    rateLimit: answer 429 when more than rateLimit requests per second
+    arrive, the way Notion enforces its average of 3.
+    """
+
+    def __init__(self, pages: list = None, latency: float = 0.0, every429: int = 0, rateLimit: float = 0,
+                 retryAfter: float = 0.5, port: int = 0):
+        self.latency = latency
+        self.every429 = every429
+        self.rateLimit = rateLimit
+        self.retryAfter = retryAfter
+        self.lock = threading.Lock()
+        self.Load(pages or [])
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), StandInHandler)
+        self.server.daemon_threads = True
+        self.server.standIn = self
+        self.thread = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server.server_port}"
+
+    def Load(self, pages: list) -> None:
+        """Replace the served pages and reset the counters."""
+        with self.lock:
+            self.pages = {}
+            self.databases = {}
+            for page in pages:
+                page = dict(page, properties=ReadFormat(page.get("properties", {})))
+                self.pages[Undashed(page["id"])] = page
+                self.databases.setdefault(Undashed(page["parent"]["database_id"]), []).append(Undashed(page["id"]))
+            self.requests = 0
+            self.rateLimited = 0
+            self.tokens = self.rateLimit
+            self.refilled = time.monotonic()
+
+    def Schema(self, database_id: str) -> dict:
+        """A database object whose properties are those of its pages, relations pointing at the database of their targets."""
+        properties = {}
+        for pageId in self.databases.get(database_id, []):
+            for name, value in self.pages[pageId]["properties"].items():
+                schema = properties.setdefault(name, {"id": value["id"], "name": name, "type": value["type"], value["type"]: {}})
+                if value["type"] == "relation" and not schema["relation"] and value["relation"]:
+                    target = self.pages.get(Undashed(value["relation"][0]["id"]))
+                    if target:
+                        schema["relation"] = {"database_id": Dashed(target["parent"]["database_id"])}
+        return {"object": "database", "id": Dashed(database_id), "properties": properties}
+
+    def Served(self, page: dict, filter_properties: list = None) -> dict:
+        """A page as Notion returns it: only the filter_properties if given, relations cut at RELATION_LIMIT."""
+        properties = {}
+        for name, value in page["properties"].items():
+            if filter_properties and unquote(value["id"]) not in filter_properties:
+                continue
+            if value["type"] == "relation" and len(value["relation"]) > RELATION_LIMIT:
+                value = dict(value, relation=value["relation"][:RELATION_LIMIT], has_more=True)
+            properties[name] = value
+        return dict(page, properties=properties)
+
+    def PropertyItems(self, pageId: str, propertyId: str, query: dict):
+        """Returns (status, response body) for a page property item read; relations are paginated."""
+        page = self.pages.get(pageId)
+        value = next((value for value in page["properties"].values() if unquote(value["id"]) == propertyId), None) if page else None
+        if value is None:
+            return 404, {"object": "error", "code": "object_not_found", "message": f"Could not find property {propertyId} of page {pageId}"}
+        if value["type"] != "relation":
+            return 200, {"object": "property_item", "id": value["id"], "type": value["type"], value["type"]: value[value["type"]]}
+        start = int(query.get("start_cursor", ["0"])[0])
+        pageSize = min(int(query.get("page_size", [RELATION_LIMIT])[0]), 100)
+        more = start + pageSize < len(value["relation"])
+        return 200, {
+            "object": "list",
+            "results": [{"object": "property_item", "id": value["id"], "type": "relation", "relation": related}
+                        for related in value["relation"][start:start + pageSize]],
+            "has_more": more,
+            "next_cursor": str(start + pageSize) if more else None,
+            "type": "property_item",
+            "property_item": {"id": value["id"], "type": "relation", "relation": {}},
+        }
+
+    def Query(self, database_id: str, body: dict, filter_properties: list = None):
+        """Returns (status, response body) for a database query."""
+        if database_id not in self.databases:
+            return 404, {"object": "error", "code": "object_not_found", "message": f"Could not find database with ID: {database_id}"}
+        pageIds = self.databases[database_id]
+        filter = body.get("filter")
+        if filter:
+            try:
+                pageIds = [pageId for pageId in pageIds if Matches(self.pages[pageId], filter)]
+            except ValueError as e:
+                return 400, {"object": "error", "code": "validation_error", "message": str(e)}
+        start = int(body.get("start_cursor") or 0)
+        pageSize = min(int(body.get("page_size", 100)), 100)
+        more = start + pageSize < len(pageIds)
+        return 200, {
+            "object": "list",
+            "results": [self.Served(self.pages[pageId], filter_properties) for pageId in pageIds[start:start + pageSize]],
+            "has_more": more,
+            "next_cursor": str(start + pageSize) if more else None,
+        }
+
+    def CreatePage(self, body: dict) -> dict:
+        database_id = Undashed(body["parent"]["database_id"])
+        page = {
+            "object": "page",
+            "id": str(uuid.uuid4()),
+            "parent": {"type": "database_id", "database_id": Dashed(database_id)},
+            "last_edited_time": time.strftime("%Y-%m-%dT%H:%M:00.000Z", time.gmtime()),
+            "properties": ReadFormat(body.get("properties", {})),
+        }
+        with self.lock:
+            self.pages[Undashed(page["id"])] = page
+            self.databases.setdefault(database_id, []).append(Undashed(page["id"]))
+        return self.Served(page)
+
+    def Admit(self) -> bool:
+        """Count a request. Returns False if it is to be answered with 429."""
+        with self.lock:
+            self.requests += 1
+            limited = bool(self.every429) and self.requests % self.every429 == 0
+            if self.rateLimit:
+                now = time.monotonic()
+                self.tokens = min(self.rateLimit, self.tokens + (now - self.refilled) * self.rateLimit)
+                self.refilled = now
+                if self.tokens < 1:
+                    limited = True
+                else:
+                    self.tokens -= 1
+            if limited:
+                self.rateLimited += 1
+            return not limited
+
+    def Stats(self) -> dict:
+        with self.lock:
+            return {"requests": self.requests, "rateLimited": self.rateLimited, "pages": len(self.pages)}
+
+    def Start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, name="notion-stand-in", daemon=True)
+        self.thread.start()
+        return self
+
+    def Stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+class StandInHandler(BaseHTTPRequestHandler):
+    # Keep-alive, as the app's session pools its connections
+    protocol_version = "HTTP/1.1"
+    # Send the headers and body of a response in one go, without waiting on
+    # delayed acknowledgements, so the stand-in adds no latency of its own
+    disable_nagle_algorithm = True
+    wbufsize = 64 * 1024
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+    def Send(self, status: int, body: dict, headers: dict = None) -> None:
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def Route(self, method: str) -> None:
+        standIn = self.server.standIn
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length) or b"{}") if length else {}
+        if standIn.latency:
+            time.sleep(standIn.latency)
+        if not standIn.Admit():
+            self.Send(429, {"object": "error", "code": "rate_limited", "message": "Rate limited"},
+                      {"Retry-After": str(standIn.retryAfter)})
+            return
+        url = urlsplit(self.path)
+        query = parse_qs(url.query)
+        filter_properties = [unquote(propertyId) for propertyId in query.get("filter_properties", [])]
+        parts = [unquote(part) for part in url.path.strip("/").split("/")]
+        # Accept both /v1/... and the bare paths
+        if parts and parts[0] == "v1":
+            parts = parts[1:]
+        if len(parts) >= 2 and parts[0] in ("databases", "pages"):
+            parts[1] = Undashed(parts[1])
+        if method == "POST" and len(parts) == 3 and parts[0] == "databases" and parts[2] == "query":
+            self.Send(*standIn.Query(parts[1], body, filter_properties))
+        elif method == "GET" and len(parts) == 2 and parts[0] == "databases" and parts[1] in standIn.databases:
+            self.Send(200, standIn.Schema(parts[1]))
+        elif method == "GET" and len(parts) == 2 and parts[0] == "pages" and parts[1] in standIn.pages:
+            self.Send(200, standIn.Served(standIn.pages[parts[1]], filter_properties))
+        elif method == "GET" and len(parts) == 4 and parts[0] == "pages" and parts[2] == "properties":
+            self.Send(*standIn.PropertyItems(parts[1], parts[3], query))
+        elif method == "POST" and parts == ["pages"]:
+            self.Send(200, standIn.CreatePage(body))
+        else:
+            self.Send(404, {"object": "error", "code": "object_not_found", "message": f"{method} {self.path} not found"})
+
+    def do_GET(self) -> None:
+        self.Route("GET")
+
+    def do_POST(self) -> None:
+        self.Route("POST")
+
+def SyntheticId(*parts) -> str:
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, "fnb-benchmark/" + "/".join(str(part) for part in parts)))
+
+def SyntheticCatalog(albums: int, albumsDatabase: str, tracksDatabase: str, versionsDatabase: str,
+                     tracksPerAlbum: int = 10, versionsPerTrack: int = 3) -> list:
+    """
+    Pages of a made-up catalog shaped like the real one: albums with their
+    tracks, each track with its versions, composers and content providers.
+    """
+    composersDatabase = SyntheticId("database", "composers")
+    providersDatabase = SyntheticId("database", "content providers")
+    edited = "2024-01-01T00:00:00.000Z"
+
+    def Page(pageId: str, database_id: str, properties: dict) -> dict:
+        return {"object": "page", "id": pageId, "parent": {"type": "database_id", "database_id": Dashed(database_id)},
+                "last_edited_time": edited, "properties": properties}
+
+    def Title(text: str) -> dict:
+        return {"type": "title", "title": Text(text)}
+
+    def RichText(text: str) -> dict:
+        return {"type": "rich_text", "rich_text": Text(text)}
+
+    def Relation(pageIds: list) -> dict:
+        return {"type": "relation", "relation": [{"id": pageId} for pageId in pageIds], "has_more": False}
+
+    def MultiSelect(names: list) -> dict:
+        return {"multi_select": [{"name": name} for name in names]}
+
+    composers = [SyntheticId("composer", n) for n in range(40)]
+    providers = [SyntheticId("content provider", n) for n in range(8)]
+    pages = [Page(pageId, composersDatabase, {"Name": Title(f"Composer {n}"), "ComposerID": RichText(f"C{n:04d}")})
+             for n, pageId in enumerate(composers)]
+    pages += [Page(pageId, providersDatabase, {"Name": Title(f"Provider {n}"), "CPID": RichText(f"CP{n:03d}")})
+              for n, pageId in enumerate(providers)]
+    moods = ["Happy", "Dark", "Epic", "Calm", "Tense"]
+    genres = ["Rock", "Pop", "Hip Hop", "Orchestral", "Electronic", "Jazz"]
+    number = 0
+    for a in range(albums):
+        albumId = SyntheticId("album", a)
+        trackIds = []
+        for t in range(tracksPerAlbum):
+            number += 1
+            trackId = SyntheticId("track", a, t)
+            trackIds.append(trackId)
+            trackTitle = f"Album {a} Track {t + 1}"
+            versionIds = []
+            for v in range(versionsPerTrack):
+                versionId = SyntheticId("version", a, t, v)
+                versionIds.append(versionId)
+                name = "Full" if v == 0 else f"Alt {v}"
+                pages.append(Page(versionId, versionsDatabase, {
+                    "Name": Title(f"{trackTitle}_{name}"),
+                    "Mixout": RichText(f"{trackTitle} {name} Mix"),
+                    "Version": {"select": {"name": name}},
+                    "Track Title": Relation([trackId]),
+                }))
+            properties = {
+                "TrackTitle": Title(trackTitle),
+                "Unique Title Id": {"unique_id": {"prefix": "FNB", "number": number}},
+                "Album": Relation([albumId]),
+                "Track Description": RichText(f"Description of {trackTitle}"),
+                "key": RichText("C minor"),
+                "Tempo": RichText(str(80 + number % 80)),
+                "Track Duration": RichText(f"{2 + number % 3}:{number % 60:02d}"),
+                "Content Provider 1": Relation([providers[number % len(providers)]]),
+                "Content Provider 2": Relation([providers[(number + 3) % len(providers)]] if number % 4 == 0 else []),
+                "Composer 1": Relation([composers[number % len(composers)]]),
+                "Composer 2": Relation([composers[(number + 7) % len(composers)]] if number % 2 == 0 else []),
+                "Song Versions": Relation(versionIds),
+                "Moods": MultiSelect(moods[number % 3:number % 3 + 2]),
+                "TrackGenre": MultiSelect([genres[number % len(genres)]]),
+                "Misc": MultiSelect([]),
+            }
+            for group in ("Rhythm", "Bass", "Guitar", "Keys", "Strings", "Woodwinds", "Brass", "Misc"):
+                properties[f"InstGroup {group}"] = MultiSelect(["Featured"] if (number + len(group)) % 3 == 0 else [])
+            pages.append(Page(trackId, tracksDatabase, properties))
+        pages.append(Page(albumId, albumsDatabase, {
+            "Working Title": Title(f"Album {a}"),
+            "AlbumID": RichText(f"FNB{a:04d}"),
+            "Release": RichText(f"R{a // 10}"),
+            "Track Submission Form": Relation(trackIds),
+        }))
+    return pages
+
+def ReadFixtures(path: str) -> list:
+    """Pages of a fixtures file: a JSON list of page objects, or {"pages": [...]}."""
+    with open(path, encoding='utf-8') as fixturesFile:
+        fixtures = json.load(fixturesFile)
+    return fixtures["pages"] if isinstance(fixtures, dict) else fixtures
+
+def RecordFixtures(path: str) -> int:
+    """Write every page of the local mirror to a fixtures file. Returns the number of pages."""
+    from Catalog import replica
+    with replica.lock:
+        pages = [json.loads(row[0]) for row in replica.conn.execute("SELECT data FROM pages")]
+    tmpPath = path + ".tmp"
+    with open(tmpPath, "w", encoding='utf-8') as fixturesFile:
+        json.dump({"pages": pages}, fixturesFile)
+    os.replace(tmpPath, path)
+    return len(pages)
+
+def main(argv: list = None) -> int:
+    import argparse
+    parser = argparse.ArgumentParser(description="Serve a Notion stand-in on localhost")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--albums", type=int, default=20, help="Serve a synthetic catalog of this many albums (default 20)")
+    source.add_argument("--fixtures", help="Serve the pages of a fixtures file instead")
+    source.add_argument("--record", metavar="PATH", help="Write the local mirror to a fixtures file and exit")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every response")
+    parser.add_argument("--every-429", type=int, default=0, help="Answer every n-th request with 429")
+    parser.add_argument("--rate-limit", type=float, default=0, help="Answer 429 above this many requests per second")
+    args = parser.parse_args(argv)
+
+    # The database ids are the app's own
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    os.environ.setdefault("NOTION_API_KEY", "stand-in")
+    if args.record:
+        print(f"Wrote {RecordFixtures(args.record)} pages to {args.record}")
+        return 0
+    from Catalog import ALBUMS_DATABASE, TRACKS_DATABASE, VERSIONS_DATABASE
+    pages = ReadFixtures(args.fixtures) if args.fixtures else SyntheticCatalog(args.albums, ALBUMS_DATABASE, TRACKS_DATABASE, VERSIONS_DATABASE)
+    standIn = NotionStandIn(pages, args.latency, args.every_429, args.rate_limit, port=args.port).Start()
+    print(f"Serving {len(pages)} pages at {standIn.url}; run the app with NOTION_API_URL={standIn.url}")
+    try:
+        standIn.thread.join()
+    except KeyboardInterrupt:
+        print(standIn.Stats())
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,335 @@
+"""
+Offline benchmarks of the export, SourceHelper and Harvest processing.
+
+    python benchmarks/RunBenchmarks.py [--only export-100 ...] [--latency 0.05] [--every-429 20] [--rate 3]
+    python benchmarks/RunBenchmarks.py --save-baseline
+
+Exports run against a local Notion stand-in (see NotionStandIn.py) serving a
+synthetic catalog; SourceHelper and Harvest run over synthetic 100k-row CSVs.
+Every case runs in its own process with an empty data directory, so its
+peak memory and its cold mirror are its own. Results are compared against
+benchmarks/baseline.json and any case slower or larger than the baseline
+by more than the tolerance is reported as a regression (exit code 1), as is
+a larger case whose time grows much faster than its size over a smaller one.
+The baseline holds the numbers of the machine that recorded it; record
+your own with --save-baseline before comparing changes.
+"""
+from NotionStandIn import NotionStandIn, SyntheticCatalog
+import subprocess
+import tempfile
+import platform
+import argparse
+import shutil
+import json
+import time
+import sys
+import csv
+import os
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+TRACKS_PER_ALBUM = 10
+VERSIONS_PER_TRACK = 3
+
+# Name -> (function run in the case's process, its arguments, albums served by the stand-in)
+CASES = {
+    "export-10": ("Export", {"albums": 10}, 10),
+    "export-100": ("Export", {"albums": 100}, 100),
+    "export-1000": ("Export", {"albums": 1000}, 1000),
+    "read-database-1000": ("ReadDatabase", {"albums": 1000}, 1000),
+    "read-database-projected-1000": ("ReadDatabase", {"albums": 1000, "properties": ["TrackTitle", "Unique Title Id", "Album"]}, 1000),
+    "sourcehelper-100k": ("SourceHelper", {"rows": 100000}, 0),
+    "harvest-100k": ("Harvest", {"rows": 100000}, 0),
+}
+
+# Measurements compared against the baseline; lower is better for all of them.
+# A change is only a regression beyond both the relative tolerance and this much.
+COMPARED = {"seconds": 0.1, "peakMB": 5.0}
+
+# (smaller case, larger case, how many times more data the larger one has):
+# the larger may take at most SCALING_SLACK times that many times as long,
+# which catches work that grows faster than linearly whatever the machine
+SCALING = [("export-100", "export-1000", 10)]
+SCALING_SLACK = 1.5
+
+class QuietLogger:
+    """Logger that only counts what it is given, so console output is not measured."""
+
+    def __init__(self):
+        self.lines = 0
+        self.errors = 0
+
+    def Log(self, text: str) -> None:
+        self.lines += 1
+
+    def Error(self, text: str) -> None:
+        self.errors += 1
+
+def PeakMemoryMB() -> float:
+    """Peak resident memory of this process in MB."""
+    if sys.platform == "win32":
+        import ctypes
+        from ctypes import wintypes
+
+        class ProcessMemoryCounters(ctypes.Structure):
+            _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD),
+                        ("PeakWorkingSetSize", ctypes.c_size_t), ("WorkingSetSize", ctypes.c_size_t),
+                        ("QuotaPeakPagedPoolUsage", ctypes.c_size_t), ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                        ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t), ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                        ("PagefileUsage", ctypes.c_size_t), ("PeakPagefileUsage", ctypes.c_size_t)]
+
+        counters = ProcessMemoryCounters()
+        counters.cb = ctypes.sizeof(counters)
+        ctypes.windll.psapi.GetProcessMemoryInfo(ctypes.windll.kernel32.GetCurrentProcess(), ctypes.byref(counters), counters.cb)
+        return counters.PeakWorkingSetSize / (1024 * 1024)
+    if os.path.exists("/proc/self/status"):
+        # ru_maxrss on Linux carries over the peak of the parent that started the process
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Bytes on macOS, kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+# Cases, run in a process of their own. Each returns its measurements.
+
+def Export(workDir: str, albums: int) -> dict:
+    """fnb import --all from an empty mirror: sync the catalog, then write every album."""
+    import fnb
+    from Metrics import metrics
+    outputDir = os.path.join(workDir, "export")
+    start = time.perf_counter()
+    status = fnb.main(["import", outputDir, "--all"])
+    seconds = time.perf_counter() - start
+    if status != 0:
+        raise RuntimeError(f"fnb import exited with {status}")
+    with open(os.path.join(outputDir, "tracks.csv"), newline='', encoding='utf-8') as tracksFile:
+        tracks = sum(1 for _ in tracksFile) - 1
+    if tracks != albums * TRACKS_PER_ALBUM:
+        raise RuntimeError(f"Exported {tracks} tracks, expected {albums * TRACKS_PER_ALBUM}")
+    summary = metrics.Summary()
+    return {
+        "seconds": seconds,
+        "albumsPerSecond": albums / seconds,
+        "tracksPerSecond": tracks / seconds,
+        "requests": summary["requests"],
+        "rateLimited": summary["rateLimited"],
+        "syncSeconds": summary["phases"].get("sync", {}).get("seconds", 0.0),
+    }
+
+def ReadDatabase(workDir: str, albums: int, properties: list = None) -> dict:
+    """ReadNotionDatabase over every track, with only the given properties if any."""
+    from NotionHelper import ReadNotionDatabase
+    from Catalog import TRACKS_DATABASE
+    from Metrics import metrics
+    start = time.perf_counter()
+    tracks = ReadNotionDatabase(TRACKS_DATABASE, properties=properties)
+    seconds = time.perf_counter() - start
+    if tracks is None or len(tracks["results"]) != albums * TRACKS_PER_ALBUM:
+        raise RuntimeError("ReadNotionDatabase did not return every track")
+    summary = metrics.Summary()
+    return {"seconds": seconds, "pagesPerSecond": len(tracks["results"]) / seconds, "requests": summary["requests"],
+            "receivedMB": summary["bytesReceived"] / (1024 * 1024)}
+
+def SyntheticFilename(n: int) -> str:
+    version = ("Full", "Alt", "30", "60")[n % 4]
+    return f"FNB{n // 40:04d}_{n // 4 % 10 + 1:02d}_Synthetic Title {n // 4}_{version}.wav"
+
+def SourceHelper(workDir: str, rows: int) -> dict:
+    """
+    Merge a SourceAudio export of rows files into an empty index, then match
+    a FileMaker export of rows files against it. One row in 50 differs from
+    its SourceAudio file in case and punctuation, one in 200 has no file.
+    """
+    from SourceHelper import MatchSourceAudio, MergeSourceAudioExport
+    from SourceAudioIndex import SourceAudioIndex
+    sourceaudioPath = os.path.join(workDir, "sourceaudio.csv")
+    filemakerPath = os.path.join(workDir, "filemaker.csv")
+    with open(sourceaudioPath, "w", newline='', encoding='utf-8') as sourceaudioFile:
+        writer = csv.writer(sourceaudioFile)
+        writer.writerow(["Sourceaudio Id", "Filename", "Title"])
+        writer.writerows([str(1000000 + n), SyntheticFilename(n), f"Synthetic Title {n // 4}"] for n in range(rows) if n % 200 != 7)
+    with open(filemakerPath, "w", newline='', encoding='utf-8') as filemakerFile:
+        writer = csv.writer(filemakerFile)
+        writer.writerow(["SA Title Only", "SA Versions Only", "SA Filename000000", "SA Composer000000", "SA SourceAudio ID000000", "SA Master ID"])
+        for n in range(rows):
+            filename = SyntheticFilename(n)
+            if n % 50 == 3:
+                filename = filename.upper().replace(" ", "-")
+            writer.writerow([f"Synthetic Title {n // 4}", ("Full", "Alt", "30", "60")[n % 4], filename, f"Composer {n % 40}", "", ""])
+
+    console = QuietLogger()
+    index = SourceAudioIndex()
+    start = time.perf_counter()
+    MergeSourceAudioExport(sourceaudioPath, console, index)
+    merged = time.perf_counter()
+    stats = MatchSourceAudio(filemakerPath, None, console, index=index)
+    end = time.perf_counter()
+    if stats["rows"] != rows:
+        raise RuntimeError(f"Matched {stats['rows']} rows, expected {rows}")
+    return {
+        "seconds": end - start,
+        "mergeSeconds": merged - start,
+        "matchSeconds": end - merged,
+        "rowsPerSecond": rows / (end - merged),
+        "matched": stats["matched"],
+        "notFound": stats["notFound"],
+    }
+
+def Harvest(workDir: str, rows: int) -> dict:
+    """Process a Harvest CSV of rows files, all of them present under their delivered name."""
+    from HarvestProcessor import ProcessHarvest
+    deliveryDir = os.path.join(workDir, "harvest")
+    os.makedirs(deliveryDir)
+    csvPath = os.path.join(deliveryDir, "harvest.csv")
+    with open(csvPath, "w", newline='', encoding='utf-8') as csvFile:
+        writer = csv.writer(csvFile)
+        writer.writerow(["TRACK: Title", "TRACK: Audio Filename", "TRACK: Composer"])
+        for n in range(rows):
+            newName = f"FNB{n // 40:04d}_{n // 4 % 10 + 1:02d}_HV{n:06d}_Take{n % 4 + 1}.wav"
+            writer.writerow([f"Synthetic Title {n // 4}", newName, f"Composer {n % 40}"])
+            open(os.path.join(deliveryDir, f"HV{n:06d}_Take{n % 4 + 1}.wav"), "wb").close()
+
+    start = time.perf_counter()
+    stats = ProcessHarvest(csvPath, QuietLogger())
+    seconds = time.perf_counter() - start
+    if stats["renamed"] != rows:
+        raise RuntimeError(f"Renamed {stats['renamed']} files, expected {rows}: {stats}")
+    return {"seconds": seconds, "rowsPerSecond": rows / seconds}
+
+def RunCase(name: str, workDir: str, resultPath: str, rate: float) -> None:
+    """Entry point of a case's process: run it and write its measurements to resultPath."""
+    sys.path.insert(0, ROOT)
+    from NotionHelper import client, TokenBucket
+    # Measure the code rather than the client's pacing unless a rate is asked for
+    client.bucket = TokenBucket(rate)
+    function, arguments, _ = CASES[name]
+    result = globals()[function](workDir, **arguments)
+    result["peakMB"] = PeakMemoryMB()
+    with open(resultPath, "w", encoding='utf-8') as resultFile:
+        json.dump(result, resultFile)
+
+def Measure(name: str, standIn: NotionStandIn, settings: dict) -> dict:
+    """Run one case in a fresh process. Returns its measurements, or {"error": ...}."""
+    _, _, albums = CASES[name]
+    if albums:
+        from Catalog import ALBUMS_DATABASE, TRACKS_DATABASE, VERSIONS_DATABASE
+        standIn.Load(SyntheticCatalog(albums, ALBUMS_DATABASE, TRACKS_DATABASE, VERSIONS_DATABASE,
+                                      TRACKS_PER_ALBUM, VERSIONS_PER_TRACK))
+    workDir = tempfile.mkdtemp(prefix=f"fnb-bench-{name}-")
+    try:
+        resultPath = os.path.join(workDir, "result.json")
+        env = dict(os.environ, NOTION_API_KEY="benchmark", NOTION_API_URL=standIn.url,
+                   FNB_DATA_DIR=os.path.join(workDir, "data"))
+        process = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--case", name, "--work-dir", workDir,
+             "--result", resultPath, "--rate", str(settings["rate"])],
+            env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True
+        )
+        if process.returncode != 0:
+            return {"error": process.stderr.strip().splitlines()[-1] if process.stderr.strip() else f"exit code {process.returncode}"}
+        with open(resultPath, encoding='utf-8') as resultFile:
+            return json.load(resultFile)
+    finally:
+        shutil.rmtree(workDir, ignore_errors=True)
+
+def Compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """Return the regressions as (case, measurement, baseline value, value)."""
+    regressions = []
+    for name, result in results.items():
+        before = baseline.get("cases", {}).get(name)
+        if not before or "error" in result:
+            continue
+        for measurement, slack in COMPARED.items():
+            if measurement in before and measurement in result:
+                if result[measurement] > before[measurement] * (1 + tolerance) and result[measurement] - before[measurement] > slack:
+                    regressions.append((name, measurement, before[measurement], result[measurement]))
+    return regressions
+
+def CheckScaling(results: dict) -> list:
+    """Return the cases that scale worse than SCALING allows, as (smaller case, larger case, size ratio, time ratio)."""
+    failures = []
+    for small, large, sizeRatio in SCALING:
+        if small in results and large in results and "error" not in results[small] and "error" not in results[large]:
+            timeRatio = results[large]["seconds"] / results[small]["seconds"]
+            if timeRatio > sizeRatio * SCALING_SLACK:
+                failures.append((small, large, sizeRatio, timeRatio))
+    return failures
+
+def Report(results: dict, baseline: dict) -> None:
+    print(f"{'case':<30}{'seconds':>10}{'baseline':>10}{'peak MB':>10}{'baseline':>10}  throughput")
+    for name, result in results.items():
+        if "error" in result:
+            print(f"{name:<30}failed: {result['error']}")
+            continue
+        before = baseline.get("cases", {}).get(name, {})
+        throughput = ", ".join(f"{result[key]:.0f} {key[:-len('PerSecond')]}/s" for key in result if key.endswith("PerSecond"))
+        print(f"{name:<30}{result['seconds']:>10.2f}{before.get('seconds', float('nan')):>10.2f}"
+              f"{result['peakMB']:>10.0f}{before.get('peakMB', float('nan')):>10.0f}  {throughput}")
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(description="Run the offline benchmarks and compare them with the baseline")
+    parser.add_argument("--only", nargs="+", choices=list(CASES), help="Run only these cases")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds the stand-in adds to every response (default 0)")
+    parser.add_argument("--every-429", type=int, default=0, help="Have the stand-in answer every n-th request with 429")
+    parser.add_argument("--rate", type=float, default=1000000, help="Client requests per second (default: unpaced; Notion allows 3)")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="Baseline file (default benchmarks/baseline.json)")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown or growth over the baseline (default 0.25)")
+    parser.add_argument("--save-baseline", action="store_true", help="Store these results as the new baseline")
+    parser.add_argument("--case", help=argparse.SUPPRESS)
+    parser.add_argument("--work-dir", help=argparse.SUPPRESS)
+    parser.add_argument("--result", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.case:
+        RunCase(args.case, args.work_dir, args.result, args.rate)
+        return 0
+
+    settings = {"latency": args.latency, "every429": args.every_429, "rate": args.rate,
+                "tracksPerAlbum": TRACKS_PER_ALBUM, "versionsPerTrack": VERSIONS_PER_TRACK}
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding='utf-8') as baselineFile:
+            baseline = json.load(baselineFile)
+    if baseline and baseline.get("settings") != settings:
+        print(f"The baseline was recorded with other settings ({baseline.get('settings')}); not comparing")
+        baseline = {}
+
+    # The stand-in serves from this process; the app modules it needs the database ids from stay offline
+    workDir = tempfile.mkdtemp(prefix="fnb-bench-")
+    os.environ.setdefault("NOTION_API_KEY", "benchmark")
+    os.environ["FNB_DATA_DIR"] = workDir
+    sys.path.insert(0, ROOT)
+    standIn = NotionStandIn(latency=args.latency, every429=args.every_429, retryAfter=0.1).Start()
+    results = {}
+    try:
+        for name in args.only or CASES:
+            print(f"Running {name}...", flush=True)
+            results[name] = Measure(name, standIn, settings)
+    finally:
+        standIn.Stop()
+        shutil.rmtree(workDir, ignore_errors=True)
+
+    Report(results, baseline)
+    regressions = Compare(results, baseline, args.tolerance)
+    for name, measurement, before, after in regressions:
+        print(f"REGRESSION {name} {measurement}: {before:.2f} -> {after:.2f} ({after / before - 1:+.0%})")
+    scaling = CheckScaling(results)
+    for small, large, sizeRatio, timeRatio in scaling:
+        print(f"SCALING {small} -> {large}: {timeRatio:.1f}x the time for {sizeRatio}x the data")
+    if args.save_baseline:
+        cases = dict(baseline.get("cases", {}), **{name: result for name, result in results.items() if "error" not in result})
+        tmpPath = args.baseline + ".tmp"
+        with open(tmpPath, "w", encoding='utf-8') as baselineFile:
+            json.dump({"settings": settings, "machine": f"{platform.system()} {platform.machine()}, Python {platform.python_version()}",
+                       "recorded": time.strftime("%Y-%m-%d"), "cases": cases}, baselineFile, indent=1)
+        os.replace(tmpPath, args.baseline)
+        print(f"Baseline written to {args.baseline}")
+    failed = any("error" in result for result in results.values())
+    return 1 if regressions or scaling or failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,141 @@
+"""
+Command line interface for the FNB Helper.
+
+    python fnb.py harvest <harvest.csv> [--dry-run]
+    python fnb.py harvest-watch <drop folder> [--interval <seconds>]
+    python fnb.py import <output dir> (--album <title, AlbumID or page id> ... | --all) [--incremental]
+    python fnb.py versions <versions.csv>
+    python fnb.py source-match <filemaker export> [<sourceaudio export>] [--output <path>] [--review <path>]
+    python fnb.py source-index <sourceaudio export> ...
+    python fnb.py gui
+
+Modules are imported per command, so commands that do not talk to Notion
+start without loading requests, Qt or the Notion credentials.
+"""
+from AppLog import PrintLogger
+import argparse
+import sys
+
+def RunHarvest(args, console) -> int:
+    from HarvestProcessor import ProcessHarvest
+    stats = ProcessHarvest(args.csv, console, args.dry_run)
+    return 0 if stats["failed"] == 0 and stats["problems"] == 0 else 1
+
+def RunHarvestWatch(args, console) -> int:
+    from HarvestWatcher import HarvestWatcher
+    try:
+        HarvestWatcher(args.folder, console).Run(args.interval)
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+def RunImport(args, console) -> int:
+    from FilemakerImporter import ProcessImport
+    from Catalog import replica, ALBUMS_DATABASE, SyncDatabase, GetPageTitle
+    syncError = SyncDatabase(ALBUMS_DATABASE)
+    if syncError:
+        console.Error(f"Could not refresh albums from Notion, using the local copy: {syncError}")
+    albums = replica.Pages(ALBUMS_DATABASE)
+    if args.all:
+        selected = albums
+    else:
+        selected = []
+        for wanted in args.album:
+            key = wanted.strip().lower()
+            matches = [
+                page for page in albums
+                if key in (GetPageTitle(page, "Working Title").strip().lower(), page["id"], page["id"].replace("-", ""))
+                or any(text["plain_text"].strip().lower() == key for text in page["properties"].get("AlbumID", {}).get("rich_text", []))
+            ]
+            if len(matches) != 1:
+                console.Error(f"{'No album' if not matches else 'More than one album'} matches \"{wanted}\"")
+                return 2
+            selected.append(matches[0])
+    if not selected:
+        console.Error("No albums selected.")
+        return 2
+    return 0 if ProcessImport(args.output, console, [(GetPageTitle(page, "Working Title"), page) for page in selected], args.incremental) else 1
+
+def RunVersions(args, console) -> int:
+    from VersionAdder import AddVersionsBulk
+    try:
+        results = AddVersionsBulk(args.sheet, console)
+    except ValueError as e:
+        console.Error(str(e))
+        return 2
+    return 0 if all(not result["status"].startswith("Failed") for result in results) else 1
+
+def RunSourceMatch(args, console) -> int:
+    from SourceHelper import MatchSourceAudio
+    try:
+        stats = MatchSourceAudio(args.filemaker, args.sourceaudio, console, args.output, reviewPath=args.review)
+    except ValueError as e:
+        console.Error(str(e))
+        return 2
+    return 0 if stats["notFound"] == 0 else 3
+
+def RunSourceIndex(args, console) -> int:
+    from SourceHelper import MergeSourceAudioExport
+    from SourceAudioIndex import SourceAudioIndex
+    index = SourceAudioIndex()
+    for export in args.exports:
+        MergeSourceAudioExport(export, console, index)
+    return 0
+
+def RunGui(args, console) -> int:
+    import MainApp
+    return MainApp.main()
+
+def BuildParser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="fnb", description="FNB Helper command line tools")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    harvest = commands.add_parser("harvest", help="Rename the audio files of a Harvest CSV and write it as TSV")
+    harvest.add_argument("csv", help="Harvest CSV, next to its audio files")
+    harvest.add_argument("--dry-run", action="store_true", help="Only report the renames that would be made")
+    harvest.set_defaults(run=RunHarvest)
+
+    harvestWatch = commands.add_parser("harvest-watch", help="Process Harvest CSVs dropped into a folder once their audio has arrived")
+    harvestWatch.add_argument("folder", help="Folder Harvest deliveries are dropped into")
+    harvestWatch.add_argument("--interval", type=float, default=30, help="Seconds between scans of the folder (default 30)")
+    harvestWatch.set_defaults(run=RunHarvestWatch)
+
+    export = commands.add_parser("import", help="Export albums from Notion to the FileMaker import CSVs")
+    export.add_argument("output", help="Directory to write the CSV files to")
+    selection = export.add_mutually_exclusive_group(required=True)
+    selection.add_argument("--album", action="append", help="Album title, AlbumID or Notion page id (repeatable)")
+    selection.add_argument("--all", action="store_true", help="Export every album")
+    export.add_argument("--incremental", action="store_true", help="Only write rows changed since the last export to this directory")
+    export.set_defaults(run=RunImport)
+
+    versions = commands.add_parser("versions", help="Add the versions listed in a CSV/TSV to Notion")
+    versions.add_argument("sheet", help="CSV/TSV with Track, Alt and Mixout columns")
+    versions.set_defaults(run=RunVersions)
+
+    sourceMatch = commands.add_parser("source-match", help="Fill SourceAudio and Master IDs into a FileMaker export")
+    sourceMatch.add_argument("filemaker", help="FileMaker export CSV (rewritten in place unless --output is given)")
+    sourceMatch.add_argument("sourceaudio", nargs="?", help="Full or partial SourceAudio export to merge into the saved index first")
+    sourceMatch.add_argument("--output", help="Write the enriched export here instead")
+    sourceMatch.add_argument("--review", help="Where to write near matches to review (default: <output>_review.csv)")
+    sourceMatch.set_defaults(run=RunSourceMatch)
+
+    sourceIndex = commands.add_parser("source-index", help="Merge SourceAudio exports into the saved SourceAudio ID index")
+    sourceIndex.add_argument("exports", nargs="+", help="Full or partial SourceAudio export CSVs")
+    sourceIndex.set_defaults(run=RunSourceIndex)
+
+    gui = commands.add_parser("gui", help="Start the desktop app")
+    gui.set_defaults(run=RunGui)
+    return parser
+
+def main(argv: list = None) -> int:
+    args = BuildParser().parse_args(argv)
+    console = PrintLogger()
+    try:
+        return args.run(args, console)
+    except OSError as e:
+        console.Error(f"Error: {e}")
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())